@@ -1,19 +1,12 @@
 import requests
 from urllib.parse import quote
-import yfinance as yf
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-import nltk
 import time
-from transformers import pipeline
 from langdetect import detect
+import sentiment
+import relevance
 
-#make sure VADER lexicon is downloaded. Use nltk.download() in Python with/without Jupyter:
-nltk.download('vader_lexicon') 
-#init sentiment analyzer
-sia = SentimentIntensityAnalyzer() 
-
-#Init Hugging Face zero-shot classification model.
-classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+#VADER analyzer (lexicon resolved locally, see `python vendorassets.py`) and the zero-shot BART model (relevance.py,
+#shared with the web app) are both loaded on first use, importing this module no longer downloads anything or loads the model.
 
 #headers so it looks like an agent. Makes sure reddit doesnt block us.
 headers = {
@@ -24,6 +17,7 @@ headers = {
 
 #Checks if stock is a valid ticker from yfinance. 
 def is_valid_ticker(ticker):
+    import yfinance as yf #only needed here, so importing this module doesnt pull in yfinance
     try:
         stock = yf.Ticker(ticker.upper())
         return stock.info.get('symbol', '').upper() == ticker.upper()
@@ -50,12 +44,6 @@ def fetch_reddit_posts(stock, time_filter, subreddit):
     except Exception as e:
         print(e)  
     return []
-#filter posts for relevance using Hugging Face zero-shot classification
-def is_relevant(content, stock):
-    labels = [f"related to {stock} stock analysis", "not related to stock analysis"]
-    result = classifier(content, labels)
-    return result["labels"][0] == f"related to {stock} stock analysis"
-
 #check if content is in English (a constraint)
 def is_english(content):
     try:
@@ -112,13 +100,13 @@ def main():
                 print(f"...")
                 continue
 
-            #skip posts that arent relevant to the stock using Hugging Face model (transformers)
-            if not is_relevant(content, stock):
+            #skip posts that arent relevant to the stock using Hugging Face model (transformers), prefiltered and cached per post
+            if not relevance.is_relevant(content, stock, post_data.get('id')):
                 print(f"...")
                 continue
 
             #analyze content sentiment for post that made it.
-            content_sentiment = sia.polarity_scores(content)
+            content_sentiment = sentiment.get_analyzer().polarity_scores(content)
 
             #append data
             posts_data.append({
@@ -146,7 +134,8 @@ def main():
     else:
         print("\nNo valid posts found.")
 
-main()
+if __name__ == '__main__':
+    main()
 
 
 
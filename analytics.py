@@ -0,0 +1,164 @@
+import time
+import numpy as np
+from marketdata import get_daily_bars, prefetch_daily_bars
+from poststore import daily_post_stats
+from series import period_for_days
+
+#lead/lag analytics between reddit activity and the market: daily post counts and mean sentiment (from the rollups)
+#are aligned to trading days and correlated with daily returns and volume. everything after the two reads is numpy
+#over the aligned arrays, missing values are NaN and every statistic only uses the pairs where both sides exist.
+#
+#lag convention: lag k pairs reddit on day t with the market on day t+k, so a peak at a positive lag means
+#reddit moves first (leads), a negative lag means it follows the market.
+
+SIGNALS = ('posts', 'sentiment')
+TARGETS = ('returns', 'volume')
+WINDOW = 30 #rolling window in trading days
+MAX_LAG = 10
+MIN_PAIRS = 5 #fewer overlapping points than this -> NaN instead of a meaningless correlation
+MAX_WINDOW = 250
+MAX_ANALYTICS_DAYS = 5 * 365
+MAX_TICKERS = 20 #per /api/analytics call
+
+#pearson along the last axis, NaN pairs are dropped (x and y broadcast against each other).
+def masked_pearson(x, y):
+    x, y = np.broadcast_arrays(x, y)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    count = valid.sum(axis=-1)
+    safe_count = np.maximum(count, 1)
+    x0 = np.where(valid, x, 0.0)
+    y0 = np.where(valid, y, 0.0)
+    x_mean = x0.sum(axis=-1, keepdims=True) / safe_count[..., None]
+    y_mean = y0.sum(axis=-1, keepdims=True) / safe_count[..., None]
+    dx = np.where(valid, x0 - x_mean, 0.0)
+    dy = np.where(valid, y0 - y_mean, 0.0)
+    denominator = np.sqrt((dx * dx).sum(axis=-1) * (dy * dy).sum(axis=-1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = (dx * dy).sum(axis=-1) / denominator
+    return np.where((count >= MIN_PAIRS) & (denominator > 0), r, np.nan)
+
+#average ranks along the last axis among the valid (non NaN in both) entries, ties share their mean rank.
+#one argsort per row: invalid entries sort last, every run of equal values gets the mean of its first and last position.
+#memory stays O(rows * n), the rolling windows are ranked as one (windows, window) array.
+def masked_ranks(values, valid):
+    filled = np.where(valid, values, np.inf)
+    order = np.argsort(filled, axis=-1, kind='stable')
+    ordered = np.take_along_axis(filled, order, axis=-1)
+    positions = np.arange(1, filled.shape[-1] + 1)
+    starts = np.ones(ordered.shape, dtype=bool)
+    starts[..., 1:] = ordered[..., 1:] != ordered[..., :-1]
+    ends = np.ones(ordered.shape, dtype=bool)
+    ends[..., :-1] = starts[..., 1:]
+    first = np.maximum.accumulate(np.where(starts, positions, 0), axis=-1)
+    last = np.flip(np.minimum.accumulate(np.flip(np.where(ends, positions, len(positions) + 1), axis=-1), axis=-1), axis=-1)
+    ranks = np.empty(ordered.shape)
+    np.put_along_axis(ranks, order, (first + last) / 2.0, axis=-1)
+    return np.where(valid, ranks, np.nan)
+
+def masked_spearman(x, y):
+    x, y = np.broadcast_arrays(x, y)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    return masked_pearson(masked_ranks(x, valid), masked_ranks(y, valid))
+
+def _windows(values, window):
+    return np.lib.stride_tricks.sliding_window_view(values, window)
+
+#rolling correlations, value i covers days i-window+1..i (NaN before the first full window).
+def rolling_correlations(x, y, window=WINDOW):
+    pearson = np.full(len(x), np.nan)
+    spearman = np.full(len(x), np.nan)
+    if len(x) >= window:
+        x_windows, y_windows = _windows(x, window), _windows(y, window)
+        pearson[window - 1:] = masked_pearson(x_windows, y_windows)
+        spearman[window - 1:] = masked_spearman(x_windows, y_windows)
+    return pearson, spearman
+
+#pearson of x[t] against y[t+lag] for every lag in -max_lag..max_lag, all lags as one (lags, n) matrix.
+def cross_correlation(x, y, max_lag=MAX_LAG):
+    n = len(x)
+    lags = np.arange(-max_lag, max_lag + 1)
+    shifted = np.full((len(lags), n), np.nan)
+    for row, lag in enumerate(lags):
+        if abs(lag) >= n:
+            continue
+        if lag >= 0:
+            shifted[row, :n - lag] = y[lag:]
+        else:
+            shifted[row, -lag:] = y[:n + lag]
+    return lags, masked_pearson(x[None, :], shifted)
+
+#daily reddit stats and bars on one trading day axis. posts made on weekends/holidays count towards the next trading day
+#(that is the first session they can move). returns (dates, {posts, sentiment, returns, volume}) or None without market data.
+def align_daily(ticker, subreddits=None, days=365):
+    bars = get_daily_bars(ticker, period_for_days(days))
+    if bars.empty or len(bars) < 2:
+        return None
+    start = np.datetime64(int(time.time()) - days * 86400, 's').astype('datetime64[D]')
+    trading_days = bars.index.values.astype('datetime64[D]').astype(np.int64) #unix day numbers, same as the rollups' day column
+    keep = trading_days >= start.astype(np.int64)
+    if keep.sum() < 2:
+        return None
+    close = bars['Close'].to_numpy(dtype=float)
+    volume = bars['Volume'].to_numpy(dtype=float)
+    returns = np.full(len(close), np.nan)
+    returns[1:] = close[1:] / close[:-1] - 1.0
+
+    #bucket over every bar then keep the window, posts after the session before the first kept day land on that day
+    posts = np.zeros(len(trading_days))
+    compound_sum = np.zeros(len(trading_days))
+    first = int(np.argmax(keep))
+    since_day = trading_days[first - 1] + 1 if first > 0 else trading_days[first]
+    stats = daily_post_stats(ticker, subreddits, float(since_day) * 86400)
+    if stats:
+        day = np.fromiter((row['day'] for row in stats), dtype=np.int64, count=len(stats))
+        slot = np.searchsorted(trading_days, day, side='left')
+        inside = slot < len(trading_days)
+        np.add.at(posts, slot[inside], np.fromiter((row['posts'] for row in stats), dtype=float, count=len(stats))[inside])
+        np.add.at(compound_sum, slot[inside], np.fromiter((row['compound_sum'] for row in stats), dtype=float, count=len(stats))[inside])
+    posts, compound_sum, returns, volume = posts[keep], compound_sum[keep], returns[keep], volume[keep]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sentiment = np.where(posts > 0, compound_sum / posts, np.nan)
+    with np.errstate(divide='ignore'):
+        log_volume = np.where(volume > 0, np.log(volume), np.nan) #log so a few huge sessions dont dominate
+    return trading_days[keep].astype('datetime64[D]'), {'posts': posts, 'sentiment': sentiment, 'returns': returns, 'volume': log_volume}
+
+#NaN -> None for the JSON
+def _clean(values, digits=4):
+    return [None if np.isnan(value) else round(float(value), digits) for value in np.asarray(values, dtype=float)]
+
+def _scalar(value, digits=4):
+    return None if np.isnan(value) else round(float(value), digits)
+
+#every signal/target pair for one ticker: full period pearson/spearman, rolling series and the lag profile.
+def analyze_ticker(ticker, subreddits=None, days=365, window=WINDOW, max_lag=MAX_LAG):
+    ticker = ticker.upper()
+    days = max(1, min(int(days), MAX_ANALYTICS_DAYS))
+    aligned = align_daily(ticker, subreddits, days)
+    if aligned is None:
+        return {'ticker': ticker, 'days': days, 'observations': 0, 'error': 'No market data.'}
+    dates, columns = aligned
+    pairs = {}
+    for signal in SIGNALS:
+        for target in TARGETS:
+            x, y = columns[signal], columns[target]
+            rolling_pearson, rolling_spearman = rolling_correlations(x, y, window)
+            lags, xcorr = cross_correlation(x, y, max_lag)
+            best = int(np.nanargmax(np.abs(xcorr))) if not np.all(np.isnan(xcorr)) else None
+            pairs[f'{signal}_vs_{target}'] = {
+                'pearson': _scalar(masked_pearson(x, y)),
+                'spearman': _scalar(masked_spearman(x, y)),
+                'rolling_pearson': _clean(rolling_pearson),
+                'rolling_spearman': _clean(rolling_spearman),
+                'lags': lags.tolist(),
+                'cross_correlation': _clean(xcorr),
+                'best_lag': int(lags[best]) if best is not None else None,
+                'best_lag_correlation': _scalar(xcorr[best]) if best is not None else None,
+            }
+    return {'ticker': ticker, 'days': days, 'window': window, 'observations': len(dates),
+            'days_with_posts': int((columns['posts'] > 0).sum()), 'dates': np.datetime_as_string(dates).tolist(), 'pairs': pairs}
+
+#many tickers in one call: market data is one batched download, then each ticker is a couple of ms of numpy.
+def analyze_tickers(tickers, subreddits=None, days=365, window=WINDOW, max_lag=MAX_LAG):
+    tickers = sorted({ticker.strip().upper() for ticker in tickers if ticker.strip()})
+    prefetch_daily_bars(tickers, period_for_days(max(1, min(int(days), MAX_ANALYTICS_DAYS))))
+    return {ticker: analyze_ticker(ticker, subreddits, days, window, max_lag) for ticker in tickers}
@@ -1,48 +1,50 @@
-from flask import Flask, redirect, render_template, url_for, request, flash, session 
+from flask import Flask, redirect, render_template, url_for, request, flash, session, jsonify, Response, stream_with_context, g, abort
+import json
+import time
 import os
-from werkzeug.security import generate_password_hash, check_password_hash
 from dotenv import load_dotenv
-import matplotlib.pyplot as plt
-from datetime import datetime
-from collections import defaultdict
-import yfinance as yf
-import pandas as pd
-#import psycopg2 #working on this, probably best to use mysql instead for this app and call it a day.
 
-from scraper import scrape_posts, is_valid_ticker 
-from priceplot import generate_post_counts_stock_plot
-from volumeplot import generate_post_counts_volume_plot
+from scraper import scrape_windows, iter_scrape, is_valid_ticker, subreddit_sentiment 
+from tickerindex import suggest as suggest_tickers
+from jobs import submit as submit_job, get_job
+from monthlyplot import generate_post_counts_plot
+from plotcache import get_image
+from vendorassets import vendored
+from series import build_series
+from poststore import window_sentiment, search_posts, SENTIMENT_FILTERS
+from postbatch import PostBatch
+from batchscan import scan_watchlist, DEFAULT_SUBREDDITS
+from analytics import analyze_tickers, MAX_LAG, WINDOW, MAX_WINDOW, MAX_ANALYTICS_DAYS, MAX_TICKERS
+import instrument
+import resultcache
+import userstore
 
 #TODO FIX: NotOpenSSLWarning - urllib3 v2 only supports OpenSSL 1.1.1+, currently the 'ssl' module is compiled with 'LibreSSL 2.8.3'. See: https://github.com/urllib3/urllib3/issues/3020 wtf
-#postgre only configured for local.
 
 #load_dotenv() #load .env stuff
 app = Flask(__name__)
 app.secret_key = os.getenv("hidden_from_this_world") #aka  --------> the secret key for sessions. Key is required for flask sessions and security.
 
-'''
-#database stuff.
-database_password = os.getenv('password')  
-database_user = os.getenv('user')              
-the_database = os.getenv('database')           
-the_host = os.getenv('host')                  
-def get_db_connection():
-    connection = psycopg2.connect(
-        host=the_host,
-        database=the_database,
-        user=database_user,
-        password=database_password
-    )
-    return connection
-'''
-
-#TEMPORARY: get_db_connection to allow code to run without actual database operations.
-def get_db_connection():
-    pass
+#the interactive chart (static/vendor/chart.umd.min.js, see vendorassets.py) draws the same monthly posts/close/volume
+#in the browser, the matplotlib monthly plot is only rendered when that file is not deployed.
+SERVER_PLOTS = not vendored('chart.umd.min.js')
 
 #time filter mapping
 TIME_FILTER_MAPPING = {'day': '1d','week': '5d','month': '1mo', 'year': '1y',  'all': 'max'}
 
+#textual label for a yfinance period
+def describe_timeframe(period):
+    if period == '1mo':
+        return "1 Month"
+    elif period == '1d':
+        return "1 Day"
+    elif period == '5d':
+        return "5 Days"
+    elif period == '1y':
+        return "1 Year"
+    else:
+        return "All Time"
+
 #REG
 @app.route('/', methods=['GET', 'POST'])
 def register():
@@ -50,26 +52,16 @@ def register():
         #set the username and password from the form.
         username = request.form['username'].strip()
         password = request.form['password'].strip()
-        """
-        with get_db_connection() as connection:
-            with connection.cursor() as cur:
-                cur.execute("SELECT 1 FROM users WHERE username = %s", (username,))   #cheecks if user already exists
-                user_exists = cur.fetchone()
-                if user_exists:
-                    flash('Username already exists. Please try again.', 'danger')
-                else:
-                    #werkzeug password hash for user registration (security reasons) CHECK HASH.
-                    hashed_password = generate_password_hash(password, method='pbkdf2:sha256') # Insert new user. do not remove hash method or --> warning. 
-                    cur.execute(
-                        "INSERT INTO users (username, password) VALUES (%s, %s)",
-                        (username, hashed_password)
-                    )
-                    connection.commit()
-                    flash('Registration successful!', 'success')
-                    #REDIRECT TO LOGIN
-                    return redirect(url_for('login'))
-        """
-        flash('Registration simulated!', 'success')
+        try:
+            created = userstore.create_user(username, password) #pbkdf2 hash on the hash pool, insert fails if the user exists
+        except userstore.UserStoreBusy:
+            flash('Server busy, please try again.', 'warning')
+            return render_template('register.html')
+        if not created:
+            flash('Username already exists. Please try again.', 'danger')
+            return render_template('register.html')
+        flash('Registration successful!', 'success')
+        #REDIRECT TO LOGIN
         return redirect(url_for('login'))
     return render_template('register.html')
 
@@ -80,73 +72,53 @@ def login():
         #set username and password from post.
         username = request.form['username'].strip()
         password = request.form['password'].strip()
-        """
-        with get_db_connection() as connection:
-            with connection.cursor() as cur:
-                #find user by username in db.
-                cur.execute("SELECT username, password FROM users WHERE username = %s", (username,))
-                result = cur.fetchone()
-                if not result:
-                    flash('User does not exist.', 'danger')
-                    #stay on login
-                    return redirect(url_for('login'))
-                db_username, db_hashed_password = result
-                if check_password_hash(db_hashed_password, password):
-                    session['username'] = db_username                    #store username in session
-                    flash('Logged in successfully!', 'success')
-                    return redirect(url_for('home'))    #REDIRECT TO HOME
-                else:                    #Wrong password
-                    flash('Wrong password.', 'danger')
-        """
-        session['username'] = username  #simulate login
-        flash('Simulated login successful!', 'success')
-        return redirect(url_for('home'))
+        try:
+            ok = userstore.check_password(username, password)
+        except userstore.UserStoreBusy:
+            flash('Server busy, please try again.', 'warning')
+            return redirect(url_for('login'))
+        if ok is None:
+            flash('User does not exist.', 'danger')
+            #stay on login
+            return redirect(url_for('login'))
+        if not ok:                    #Wrong password
+            flash('Wrong password.', 'danger')
+            return redirect(url_for('login'))
+        session['username'] = username                    #store username in session
+        flash('Logged in successfully!', 'success')
+        return redirect(url_for('home'))    #REDIRECT TO HOME
     return render_template('login.html')
 
 #DELETE ACCOUNT
 @app.route('/delete', methods=['GET', 'POST'])
 def delete():
     #REDIRECT TO LOGIN
-    """
     if 'username' not in session:
         flash('You must be logged in to delete your account!', 'danger')
         return redirect(url_for('login'))
-    """
     if request.method == 'POST':
         #find user via username on db.
         username_form = request.form['username'].strip()
         password_form = request.form['password'].strip()
-        #current_session_user = session['username']
-        """
+        current_session_user = session['username']
         if username_form != current_session_user:      #make sure they are logging in before deleting.
-            flash('The username does not match the logged-in account.', 'danger') 
+            flash('The username does not match the logged-in account.', 'danger')
             return render_template('delete.html')
-        with get_db_connection() as connection:
-            with connection.cursor() as cur:
-                #check if user (from session) actually exists
-                cur.execute("SELECT password FROM users WHERE username = %s", (current_session_user,))
-                result = cur.fetchone()
-
-                if not result:
-                    flash('User does not exist.', 'danger')
-                    return redirect(url_for('login'))
-
-                db_hashed_password = result[0]
-                if check_password_hash(db_hashed_password, password_form):
-                    #delete user from database.
-                    cur.execute("DELETE FROM users WHERE username = %s", (current_session_user,))
-                    connection.commit()
-
-                    #log out the user
-                    session.pop('username', None)
-                    flash('Account deleted successfully, sorry to see you go :(', 'success')
-                    #REDIRECT TO LOGIN
-                    return redirect(url_for('login'))
-                else:
-                    flash('Invalid username or password.', 'danger')
-        """
-        flash('Simulated account deletion.', 'success')
+        try:
+            deleted = userstore.delete_user(current_session_user, password_form)
+        except userstore.UserStoreBusy:
+            flash('Server busy, please try again.', 'warning')
+            return render_template('delete.html')
+        if deleted is None:
+            flash('User does not exist.', 'danger')
+            return redirect(url_for('login'))
+        if not deleted:
+            flash('Invalid username or password.', 'danger')
+            return render_template('delete.html')
+        #log out the user
         session.pop('username', None)
+        flash('Account deleted successfully, sorry to see you go :(', 'success')
+        #REDIRECT TO LOGIN
         return redirect(url_for('login'))
     return render_template('delete.html')
 
@@ -154,48 +126,30 @@ def delete():
 @app.route('/update', methods=['GET', 'POST'])
 def update():
     #REDIRECT TO LOGIN
-    """
     if 'username' not in session:
         flash('You must be logged in to update your password.', 'danger')
         return redirect(url_for('login'))
-    """
     if request.method == 'POST':
         old_password = request.form['old_password'].strip()
         new_password = request.form['new_password'].strip()
         confirm_password = request.form['confirm_password'].strip()
-        #username = session['username']
-        """
-        with get_db_connection() as connection:
-            with connection.cursor() as cur:
-                # heck if user exists ELSE redirect
-                cur.execute("SELECT password FROM users WHERE username = %s", (username,))
-                result = cur.fetchone()
-
-                if not result:
-                    flash('User does not exist.', 'danger')
-                    return redirect(url_for('update'))
-
-                db_hashed_password = result[0]
-
-                # Check if the old password is correct
-                if check_password_hash(db_hashed_password, old_password):
-                    # Update the password if confirmation matches
-                    if new_password == confirm_password:
-                        hashed_new_password = generate_password_hash(new_password, method='pbkdf2:sha256')
-                        cur.execute(
-                            "UPDATE users SET password = %s WHERE username = %s",
-                            (hashed_new_password, username)
-                        )
-                        connection.commit()
-                        flash('Password updated!', 'success')
-                        #return to home page on success
-                        return redirect(url_for('home'))
-                    else:
-                        flash('New passwords do not match.', 'danger')
-                else:
-                    flash('Wrong old password.', 'danger')
-        """
-        flash('Simulated password update.', 'success')
+        username = session['username']
+        if new_password != confirm_password:
+            flash('New passwords do not match.', 'danger')
+            return render_template('update.html')
+        try:
+            updated = userstore.change_password(username, old_password, new_password)
+        except userstore.UserStoreBusy:
+            flash('Server busy, please try again.', 'warning')
+            return render_template('update.html')
+        if updated is None:
+            flash('User does not exist.', 'danger')
+            return redirect(url_for('update'))
+        if not updated:
+            flash('Wrong old password.', 'danger')
+            return render_template('update.html')
+        flash('Password updated!', 'success')
+        #return to home page on success
         return redirect(url_for('home'))
     return render_template('update.html')
 
@@ -208,6 +162,146 @@ def signout():
     #redirect to login after signout
     return redirect(url_for('login'))
 
+#INSTRUMENTATION: every request gets a stage trace (sent back as Server-Timing) and a duration histogram sample.
+#with STOCKA_PROFILING=1, ?profile=1 or an X-Stocka-Profile: 1 header samples stacks for that one request and the
+#collapsed stacks are linked from the X-Profile-Url response header.
+@app.before_request
+def start_request_trace():
+    g.request_started = time.perf_counter()
+    g.trace, g.trace_token = instrument.start_trace()
+    g.profiler = None
+    if instrument.PROFILING_ENABLED and (request.args.get('profile') == '1' or request.headers.get('X-Stocka-Profile') == '1'):
+        g.profiler = instrument.SamplingProfiler().start()
+
+#streamed responses (/home/stream) get their headers before the generator runs, so their timings only cover the setup.
+@app.after_request
+def add_server_timing(response):
+    started = g.get('request_started')
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    instrument.REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or 'unknown', method=request.method, status=response.status_code)
+    if g.get('profiler') is not None:
+        profile_id = instrument.save_profile(g.profiler.stop())
+        response.headers['X-Profile-Url'] = url_for('debug_profile', profile_id=profile_id)
+    timing = g.trace.server_timing()
+    response.headers['Server-Timing'] = (timing + ', ' if timing else '') + f'total;dur={elapsed * 1000:.1f}'
+    return response
+
+@app.teardown_request
+def end_request_trace(exc):
+    token = g.pop('trace_token', None)
+    if token is not None:
+        try:
+            instrument.end_trace(token)
+        except ValueError:
+            pass #streamed response finished in another context, nothing left to reset
+
+#PROMETHEUS metrics for this process
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(instrument.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+#collapsed stacks of a profiled request
+@app.route('/debug/profile/<profile_id>')
+def debug_profile(profile_id):
+    profile = instrument.get_profile(profile_id) if instrument.PROFILING_ENABLED else None
+    if profile is None:
+        abort(404)
+    return Response(profile, mimetype='text/plain')
+
+HOME_WAIT_SECONDS = 10 #POST /home waits this long for its job, after that the page polls /jobs/<id> instead of holding the worker
+
+#everything home.html needs for an empty page
+def empty_home_result():
+    return {'stock': None, 'subreddits': [], 'posts_data': PostBatch.empty(), 'metrics': {}, 'overall_label': None, 'plot_monthly': None,
+            'total_posts': 0, 'subreddit_breakdown': {}, 'timeframe_description': "", 'messages': [], 'timings': {}}
+
+#job entry point, the search runs under its own trace (job threads dont see the request's) and keeps the stage timings
+#so the request that waited for it can report them in Server-Timing.
+#results without errors go to the shared result cache.
+def run_home_search(stock, time_filter, selected_subreddits):
+    with instrument.trace() as job_trace:
+        result = home_search(stock, time_filter, selected_subreddits)
+    result['timings'] = job_trace.to_dict()
+    if not any(category == 'danger' for _, category in result['messages']):
+        try:
+            resultcache.put_result(stock, selected_subreddits, time_filter, dict(result, timings={}))
+        except Exception as e:
+            app.logger.warning('result cache write failed: %s', e)
+    return result
+
+#the whole /home search (scrape + plots), runs on the job pool. flash() needs a request so messages are returned instead.
+def home_search(stock, time_filter, selected_subreddits):
+    result = empty_home_result()
+    result['stock'] = stock
+    result['subreddits'] = list(selected_subreddits)
+    messages = result['messages']
+    period = TIME_FILTER_MAPPING.get(time_filter, '1mo')
+
+    #1) SCRAPE once: user-chosen timeframe for the main results + 1 YEAR worth of posts for the plots (ignores the user inputted time_filter)
+    #the widest window is fetched a single time and the other one is filtered out of it locally.
+    try:
+        posts_data, metrics, overall_sentiment_label, window_posts = scrape_windows(stock, time_filter, selected_subreddits, extra_windows=('year',))
+        plot_posts_data = window_posts.get('year', PostBatch.empty())
+    except Exception as e:
+        messages.append((f'ERROR while scraping posts: {e}', 'danger'))
+        posts_data, metrics, overall_sentiment_label = PostBatch.empty(), {}, None
+        plot_posts_data = PostBatch.empty()
+    result.update(posts_data=posts_data, metrics=metrics, overall_label=overall_sentiment_label)
+
+    if not posts_data and not metrics:
+        messages.append(('No valid posts found or invalid inputs.', 'warning'))
+    else:
+        result['total_posts'] = len(posts_data)
+        result['subreddit_breakdown'] = subreddit_sentiment(posts_data)
+
+    #textual label for the timeframe
+    result['timeframe_description'] = describe_timeframe(period)
+
+    #gen plots
+    if SERVER_PLOTS and plot_posts_data:
+        try:
+            result['plot_monthly'] = generate_post_counts_plot(plot_posts_data, stock, selected_subreddits)
+        except Exception as e:
+            messages.append((f'ERROR while generating the plots: {e}', 'danger'))
+    return result
+
+#same search (ticker, subreddits, window) already queued or running -> same job
+def submit_home_search(stock, time_filter, selected_subreddits):
+    key = ('home', stock, tuple(sorted(set(selected_subreddits))), time_filter)
+    return submit_job(key, run_home_search, stock, time_filter, sorted(set(selected_subreddits)))
+
+#cached result for the search or None. a stale one is returned as is and refreshed on the job pool
+#(only by the worker that claims the refresh).
+def cached_home_result(stock, time_filter, selected_subreddits):
+    with instrument.stage('result_cache'):
+        try:
+            cached = resultcache.get_result(stock, selected_subreddits, time_filter)
+        except Exception as e:
+            app.logger.warning('result cache read failed: %s', e)
+            return None
+        if cached is None:
+            return None
+        result, fresh = cached
+        if not fresh and resultcache.claim_refresh(stock, selected_subreddits, time_filter):
+            submit_home_search(stock, time_filter, selected_subreddits)
+    for message, category in result['messages']:
+        flash(message, category)
+    return result
+
+#finished job -> template context (flashes its messages)
+def home_result_from_job(job):
+    if job.status == 'failed':
+        flash(f'ERROR while scraping posts: {job.error}', 'danger')
+        return empty_home_result()
+    for message, category in job.result['messages']:
+        flash(message, category)
+    request_trace = instrument.current_trace()
+    if request_trace is not None:
+        request_trace.merge(job.result.get('timings'))
+    return job.result
+
 @app.route('/home', methods=['GET', 'POST'])
 def home():
     #REDIRECT TO LOGIN
@@ -216,14 +310,8 @@ def home():
         flash('You must be logged in to access this page.', 'danger')
         return redirect(url_for('login'))
     """
-    stock = None
-    posts_data = []
-    metrics = {}
-    overall_sentiment_label = None
-    plot_prices = None
-    plot_volume = None
-    total_posts = 0
-    timeframe_description = ""
+    result = empty_home_result()
+    pending_job = None
 
     if request.method == 'POST':
         stock = request.form.get('stock', '').strip().upper()
@@ -239,65 +327,243 @@ def home():
             if not is_valid_ticker(stock):
                 flash('Ticker not found.', 'warning')
             else:
-                period = TIME_FILTER_MAPPING.get(time_filter, '1mo')
-
-                #1) SCRAPE (user-chosen timeframe) for the main results
-                try:
-                    posts_data, metrics, overall_sentiment_label = scrape_posts(stock, time_filter, selected_subreddits, period)
-                except Exception as e:
-                    flash(f'ERROR while scraping posts: {e}', 'danger')
-                    posts_data, metrics, overall_sentiment_label = [], {}, None
-
-                if not posts_data and not metrics:
-                    flash('No valid posts found or invalid inputs.', 'warning')
-                else:
-                    total_posts = len(posts_data)
-
-                #textual label for the timeframe
-                if period == '1mo':
-                    timeframe_description = "1 Month"
-                elif period == '1d':
-                    timeframe_description = "1 Day"
-                elif period == '5d':
-                    timeframe_description = "5 Days"
-                elif period == '1y':
-                    timeframe_description = "1 Year"
+                cached = cached_home_result(stock, time_filter, selected_subreddits)
+                if cached is not None:
+                    result = cached
                 else:
-                    timeframe_description = "All Time"
-
-                #ALWAYS GET 1 YEAR WORTH OF POSTS FOR PLOTS ignores the user inputted time_filter
-                try:
-                    plot_posts_data, _, _ = scrape_posts(stock, time_filter='year',  subreddits=selected_subreddits, period='1y')
-                except Exception as e:
-                    flash(f'ERROR while scraping data for the 12-month plot: {e}', 'danger')
-                    plot_posts_data = []
-
-                #gen plots
-                if plot_posts_data:
-                    try:
-                        plot_prices = generate_post_counts_stock_plot(plot_posts_data, stock) 
-                    except Exception as e:
-                        flash(f'ERROR while generating the stock plot: {e}', 'danger')
-                        plot_prices = None
-
-                    try:
-                        plot_volume = generate_post_counts_volume_plot(plot_posts_data, stock)
-                    except Exception as e:
-                        flash(f'ERROR while generating the volume plot: {e}', 'danger')
-                        plot_volume = None
+                    job = submit_home_search(stock, time_filter, selected_subreddits)
+                    with instrument.stage('job_wait'):
+                        finished = job.wait(HOME_WAIT_SECONDS)
+                    if finished:
+                        result = home_result_from_job(job)
+                    else:
+                        pending_job = job
+    elif request.args.get('job'):
+        #coming back from the "still working" page
+        job = get_job(request.args['job'])
+        if job is None:
+            flash('That search expired, please search again.', 'warning')
+        elif job.done_event.is_set():
+            result = home_result_from_job(job)
+        else:
+            pending_job = job
 
     return render_template(
         'home.html',
-        stock=stock,
-        posts_data=posts_data,
-        metrics=metrics,
-        overall_label=overall_sentiment_label,
-        plot_prices=plot_prices,
-        plot_volume=plot_volume,
-        total_posts=total_posts,
-        timeframe_description=timeframe_description if timeframe_description else ""
+        stock=result['stock'],
+        subreddits=result['subreddits'],
+        posts_data=result['posts_data'],
+        metrics=result['metrics'],
+        overall_label=result['overall_label'],
+        plot_monthly=result['plot_monthly'],
+        total_posts=result['total_posts'],
+        subreddit_breakdown=result['subreddit_breakdown'],
+        timeframe_description=result['timeframe_description'] if result['timeframe_description'] else "",
+        pending_job=pending_job
     )
 
+#JOBS API: submit a search, then poll its status/result. identical in-flight searches share one job.
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    data = request.get_json(silent=True) or request.form
+    if not hasattr(data, 'get') or not all(isinstance(data.get(field) or '', str) for field in ('stock', 'time_filter')):
+        return jsonify({'error': 'expected a JSON object with string stock and time_filter.'}), 400
+    stock = (data.get('stock') or '').strip().upper()
+    time_filter = (data.get('time_filter') or '').strip().lower()
+    selected_subreddits = data.get('subreddits') if request.is_json else request.form.getlist('subreddits')
+    if not selected_subreddits or not stock:
+        return jsonify({'error': 'stock and at least one subreddit are required.'}), 400
+    if not isinstance(selected_subreddits, list) or not all(isinstance(subreddit, str) for subreddit in selected_subreddits):
+        return jsonify({'error': 'subreddits must be a list of subreddit names.'}), 400
+    if time_filter not in TIME_FILTER_MAPPING:
+        return jsonify({'error': f"time_filter must be one of: {', '.join(TIME_FILTER_MAPPING)}."}), 400
+    if not is_valid_ticker(stock):
+        return jsonify({'error': 'Ticker not found.'}), 400
+    job = submit_home_search(stock, time_filter, selected_subreddits)
+    return jsonify(dict(job.to_dict(), status_url=url_for('job_status', job_id=job.id))), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found.'}), 404
+    payload = job.to_dict()
+    if job.status == 'done' and job.key[0] == 'batch':
+        payload['result'] = job.result #already plain json
+    elif job.status == 'done':
+        result = job.result
+        payload['result'] = {
+            'stock': result['stock'], 'metrics': result['metrics'], 'overall_label': result['overall_label'],
+            'total_posts': result['total_posts'], 'subreddit_breakdown': result['subreddit_breakdown'],
+            'timeframe_description': result['timeframe_description'], 'posts': posts_payload(result['posts_data']),
+            'plot_monthly': url_for('plot_image', key=result['plot_monthly']) if result['plot_monthly'] else None,
+            'messages': [message for message, _ in result['messages']],
+            'timings': {name: round(seconds, 4) for name, (seconds, _) in result.get('timings', {}).items()},
+        }
+        payload['html_url'] = url_for('home', job=job.id)
+    return jsonify(payload)
+
+#one server-sent event, dates are sent as ISO strings.
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+#PostBatch rows -> what the browser needs to draw a row.
+def posts_payload(posts):
+    return [{'subreddit': post['subreddit'], 'title': post['title'], 'url': post['url'], 'compound_score': post['compound_score'],
+             'content_sentiment': post['content_sentiment'], 'date': str(post['date'])} for post in posts]
+
+#STREAMING HOME: same search as /home but results are pushed as server-sent events one subreddit at a time
+#(metrics -> posts per subreddit -> summary -> plots) so the first rows show up before the whole scrape is done.
+@app.route('/home/stream')
+def home_stream():
+    stock = request.args.get('stock', '').strip().upper()
+    time_filter = request.args.get('time_filter', '').strip().lower()
+    selected_subreddits = request.args.getlist('subreddits')
+
+    def generate():
+        if not selected_subreddits:
+            yield sse_event('failed', {'message': 'Please select at least one subreddit.'})
+            return
+        if not stock:
+            yield sse_event('failed', {'message': 'Please enter a stock symbol.'})
+            return
+        if not is_valid_ticker(stock):
+            yield sse_event('failed', {'message': 'Ticker not found.'})
+            return
+        period = TIME_FILTER_MAPPING.get(time_filter, '1mo')
+        yield sse_event('start', {'stock': stock, 'timeframe_description': describe_timeframe(period), 'subreddits': selected_subreddits})
+        plot_posts_data = PostBatch.empty()
+        found = False
+        try:
+            for event, payload in iter_scrape(stock, time_filter, selected_subreddits, extra_windows=('year',)):
+                found = True
+                if event == 'metrics':
+                    yield sse_event('metrics', payload)
+                elif event == 'posts':
+                    subreddit, posts = payload
+                    yield sse_event('posts', {'subreddit': subreddit, 'posts': posts_payload(posts)})
+                else:
+                    posts_data, overall_sentiment_label, window_posts = payload
+                    plot_posts_data = window_posts.get('year', PostBatch.empty())
+                    yield sse_event('summary', {'total_posts': len(posts_data), 'overall_label': overall_sentiment_label,
+                                                'subreddit_breakdown': subreddit_sentiment(posts_data)})
+        except Exception as e:
+            yield sse_event('failed', {'message': f'ERROR while scraping posts: {e}'})
+            return
+        if not found:
+            yield sse_event('failed', {'message': 'No valid posts found or invalid inputs.'})
+            return
+
+        #gen plots
+        plots = {}
+        if SERVER_PLOTS and plot_posts_data:
+            try:
+                plots['monthly'] = url_for('plot_image', key=generate_post_counts_plot(plot_posts_data, stock, selected_subreddits))
+            except Exception as e:
+                yield sse_event('warning', {'message': f'ERROR while generating the plots: {e}'})
+        yield sse_event('plots', plots)
+        yield sse_event('done', {})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}) #no proxy buffering or the events arrive all at once
+
+#PLOT IMAGES straight from the in-memory plot cache. keys are content hashes so the browser can cache them forever.
+@app.route('/plots/<key>.png')
+def plot_image(key):
+    png_bytes = get_image(key)
+    if png_bytes is None:
+        return 'Plot expired, please search again.', 404
+    return Response(png_bytes, mimetype='image/png', headers={'Cache-Control': 'public, max-age=31536000, immutable'})
+
+#TIME SERIES for the client side charts: columnar JSON (dates, post_counts, sentiment_mean, close, volume) from the post store
+#and cached market data, no scraping. ?subreddits=a&subreddits=b (default all stored), ?days=365, ?resolution=daily|weekly|monthly
+@app.route('/api/series/<ticker>')
+def api_series(ticker):
+    ticker = ticker.strip().upper()
+    if not is_valid_ticker(ticker):
+        return jsonify({'error': 'Ticker not found.'}), 404
+    days = request.args.get('days', 365, type=int)
+    resolution = request.args.get('resolution', 'daily').strip().lower()
+    return jsonify(build_series(ticker, request.args.getlist('subreddits') or None, days, resolution))
+
+#LEAD/LAG ANALYTICS: rolling pearson/spearman and cross-correlation of daily posts/sentiment vs returns/volume.
+#?tickers=TSLA,AAPL (or repeated), ?subreddits=..., ?days=365, ?window=30, ?max_lag=10
+@app.route('/api/analytics')
+def api_analytics():
+    tickers = sorted({ticker.strip().upper() for value in request.args.getlist('tickers') for ticker in value.split(',') if ticker.strip()})
+    if not tickers:
+        return jsonify({'error': 'at least one ticker is required.'}), 400
+    if len(tickers) > MAX_TICKERS:
+        return jsonify({'error': f'at most {MAX_TICKERS} tickers per request.'}), 400
+    unknown = [ticker for ticker in tickers if not is_valid_ticker(ticker)]
+    if unknown:
+        return jsonify({'error': f'Ticker not found: {", ".join(unknown)}'}), 404
+    days = max(1, min(request.args.get('days', 365, type=int), MAX_ANALYTICS_DAYS))
+    window = max(5, min(request.args.get('window', WINDOW, type=int), MAX_WINDOW))
+    max_lag = max(0, min(request.args.get('max_lag', MAX_LAG, type=int), 30))
+    return jsonify({'tickers': analyze_tickers(tickers, request.args.getlist('subreddits') or None, days, window, max_lag)})
+
+#WINDOW SENTIMENT from the daily rollups: post count, mean, variance, label tallies. ?days=365 (0 = all time), ?subreddits=...
+@app.route('/api/sentiment/<ticker>')
+def api_sentiment(ticker):
+    days = request.args.get('days', 365, type=int)
+    since_utc = time.time() - days * 86400 if days > 0 else None
+    return jsonify(dict(window_sentiment(ticker.strip().upper(), request.args.getlist('subreddits') or None, since_utc), days=days))
+
+#BATCH SCAN a watchlist: {"tickers": [...], "subreddits": [...], "time_filter": "week"} -> job, poll /jobs/<id> for the per ticker summary.
+@app.route('/api/batch', methods=['POST'])
+def api_batch():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'expected a JSON object.'}), 400
+    for field in ('tickers', 'subreddits'):
+        value = data.get(field)
+        if value is not None and (not isinstance(value, list) or not all(isinstance(item, str) for item in value)):
+            return jsonify({'error': f'{field} must be a list of strings.'}), 400
+    if not isinstance(data.get('time_filter') or '', str):
+        return jsonify({'error': 'time_filter must be a string.'}), 400
+    tickers = sorted({ticker.strip().upper().lstrip('$') for ticker in data.get('tickers') or [] if ticker.strip('$ ')})
+    subreddits = sorted({subreddit.strip().lower() for subreddit in data.get('subreddits') or DEFAULT_SUBREDDITS if subreddit.strip()})
+    time_filter = (data.get('time_filter') or 'week').strip().lower()
+    if not tickers:
+        return jsonify({'error': 'at least one ticker is required.'}), 400
+    if len(tickers) > MAX_TICKERS:
+        return jsonify({'error': f'at most {MAX_TICKERS} tickers per request.'}), 400
+    if time_filter not in ('day', 'week', 'month', 'year', 'all'):
+        return jsonify({'error': 'Invalid time filter.'}), 400
+    job = submit_job(('batch', tuple(tickers), tuple(subreddits), time_filter), scan_watchlist, tickers, subreddits, time_filter)
+    return jsonify(dict(job.to_dict(), status_url=url_for('job_status', job_id=job.id))), 202
+
+#FULL-TEXT SEARCH over every stored post (FTS5 index in the post store, reddit is never called), ranked with snippets.
+#?q=earnings guidance (words must all match, "quoted phrases" allowed), ?ticker=TSLA, ?subreddits=investing (repeatable),
+#?days=90, ?sentiment=positive|neutral|negative, ?limit=20, ?offset=0
+@app.route('/api/search')
+def api_search():
+    query = request.args.get('q', '').strip()
+    sentiment_filter = request.args.get('sentiment', '').strip().lower() or None
+    if not query:
+        return jsonify({'error': 'q is required.'}), 400
+    if sentiment_filter is not None and sentiment_filter not in SENTIMENT_FILTERS:
+        return jsonify({'error': f"sentiment must be one of {', '.join(SENTIMENT_FILTERS)}."}), 400
+    days = request.args.get('days', 0, type=int)
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    offset = max(0, request.args.get('offset', 0, type=int))
+    started = time.perf_counter()
+    with instrument.stage('search'):
+        rows = search_posts(query, request.args.get('ticker', '').strip().upper() or None, request.args.getlist('subreddits') or None,
+                            time.time() - days * 86400 if days > 0 else None, sentiment=sentiment_filter, limit=limit, offset=offset)
+    results = [{'id': row['id'], 'subreddit': row['subreddit'], 'title': row['title'], 'url': f"https://www.reddit.com{row['permalink']}",
+                'date': time.strftime('%Y-%m-%d', time.gmtime(row['created_utc'])), 'compound_score': row['compound'],
+                'content_sentiment': row['label'], 'snippet': row['snippet'], 'rank': round(row['rank'], 4)} for row in rows]
+    return jsonify({'query': query, 'limit': limit, 'offset': offset, 'results': results,
+                    'took_ms': round((time.perf_counter() - started) * 1000, 2)})
+
+#TICKER AUTOCOMPLETE from the local symbol index, no network.
+@app.route('/api/tickers')
+def api_tickers():
+    query = request.args.get('q', '').strip()
+    return jsonify({'query': query, 'suggestions': suggest_tickers(query, limit=10)})
+
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,122 @@
+import argparse
+import json
+import sys
+import time
+from redditfetch import fetch_subreddit_listing, iter_fetch_jobs
+from marketdata import prefetch_daily_bars, get_stock_metrics, is_valid_ticker
+from poststore import get_sync_state, save_posts, window_sentiment
+from scraper import TIME_FILTER_MAPPING, TIME_FILTER_ORDER, TIME_FILTER_SECONDS, analyze_raw_posts, score_records, mark_synced
+from tickermatch import TickerMatcher
+
+#watchlist mode: scan many tickers at once. every subreddit's /new listing is crawled ONCE for the window
+#(instead of one reddit search per ticker per subreddit), each post is matched against all tickers in one pass,
+#analyzed/scored once and stored under every ticker it mentions. market data for the whole list is one batched download.
+#
+#   python batchscan.py TSLA AAPL GME --time-filter week --subreddits wallstreetbets stocks
+
+#same list the console scraper searches
+DEFAULT_SUBREDDITS = [
+    'wallstreetbets', 'pennystocks', 'valueinvesting',
+    'investing', 'stockmarket', 'stocksandtrading',
+    'robinhoodpennystocks', 'wallstreetbetselite',
+    'shortsqueeze', 'dividends'
+]
+MAX_LISTING_POSTS = 1000 #reddit listings stop at ~1000 items anyway
+
+INCREMENTAL_OVERLAP = 600 #incremental crawls reach this far behind the last sync, posts show up in /new a bit late
+
+def _listing_jobs(subreddits, since_utc, raise_errors):
+    return {subreddit: {'subreddit': subreddit, 'since_utc': since_utc.get(subreddit), 'max_results': MAX_LISTING_POSTS, 'per_page': 100,
+                        'raise_errors': raise_errors}
+            for subreddit in subreddits}
+
+#how far back each subreddit's crawl goes: the start of the window, or when every ticker already covers the window
+#only back to the oldest of their last syncs (incremental mode).
+def _crawl_since(tickers, subreddits, time_filter, window_since, incremental):
+    since_utc = {}
+    for subreddit in subreddits:
+        since_utc[subreddit] = window_since
+        if not incremental or not tickers:
+            continue
+        states = [get_sync_state(ticker, subreddit) for ticker in tickers]
+        if all(state and TIME_FILTER_ORDER.index(state[0]) >= TIME_FILTER_ORDER.index(time_filter) for state in states):
+            last_sync = min(state[1] for state in states) - INCREMENTAL_OVERLAP
+            since_utc[subreddit] = last_sync if window_since is None else max(last_sync, window_since)
+    return since_utc
+
+#{ticker: [raw posts]} for one subreddit's listing
+def match_posts(matcher, raw_posts):
+    matched = {}
+    for rp in raw_posts:
+        post_data = rp.get('data', {})
+        tickers = matcher.find(f"{post_data.get('title', '')}\n{post_data.get('selftext', '')}")
+        for ticker in tickers:
+            matched.setdefault(ticker, []).append(rp)
+    return matched
+
+#crawl + match + store. returns {ticker: {subreddit: new matches}}.
+#incremental=True only crawls back to the last sync where that is safe (see _crawl_since),
+#raise_errors=True lets redditfetch.RedditUnavailable through instead of storing a partial crawl.
+#a ticker/subreddit pair is only marked as synced for the window when the crawl actually reached the start of the window
+#(a listing cut off at MAX_LISTING_POSTS or by a fetch error leaves the older part for the regular search to backfill).
+def scan_subreddits(tickers, subreddits, time_filter='week', now=None, incremental=False, raise_errors=False):
+    now = now or time.time()
+    window_since = now - TIME_FILTER_SECONDS[time_filter] if time_filter in TIME_FILTER_SECONDS else None
+    matcher = TickerMatcher(tickers)
+    found = {ticker: {} for ticker in matcher.tickers}
+    jobs = _listing_jobs(subreddits, _crawl_since(matcher.tickers, subreddits, time_filter, window_since, incremental), raise_errors)
+    for subreddit, raw_posts in iter_fetch_jobs(jobs, fetch=fetch_subreddit_listing):
+        complete = raw_posts.complete #back to the window start (or the end of the listing) without a fetch error
+        matched = match_posts(matcher, raw_posts)
+        by_id = {}
+        for record in score_records(analyze_raw_posts(subreddit, [rp for posts in matched.values() for rp in posts])):
+            by_id.setdefault(record['id'], record) #posts mentioning several tickers are analyzed once
+        for ticker, posts in matched.items():
+            records = [by_id[post_id] for post_id in dict.fromkeys(rp['data']['id'] for rp in posts if rp['data'].get('id'))]
+            save_posts(ticker, records)
+            found[ticker][subreddit] = len(records)
+        if complete:
+            for ticker in matcher.tickers:
+                mark_synced(ticker, time_filter, subreddit, get_sync_state(ticker, subreddit), now)
+    return found
+
+#full watchlist scan: validate, one batched market data download, one crawl per subreddit, then a per ticker summary
+#(window sentiment from the daily rollups + the usual stock metrics).
+def scan_watchlist(tickers, subreddits=None, time_filter='week'):
+    subreddits = sorted({subreddit.lower() for subreddit in (subreddits or DEFAULT_SUBREDDITS)})
+    tickers = sorted({ticker.strip().upper().lstrip('$') for ticker in tickers if ticker.strip('$ ')})
+    valid = [ticker for ticker in tickers if is_valid_ticker(ticker)]
+    period = TIME_FILTER_MAPPING.get(time_filter, '5d')
+    now = time.time()
+    prefetch_daily_bars(valid, period)
+    found = scan_subreddits(valid, subreddits, time_filter, now)
+    since_utc = now - TIME_FILTER_SECONDS[time_filter] if time_filter in TIME_FILTER_SECONDS else None
+    results = {}
+    for ticker in valid:
+        results[ticker] = {'new_posts': found[ticker], 'sentiment': window_sentiment(ticker, subreddits, since_utc),
+                           'metrics': get_stock_metrics(ticker, period)}
+    return {'time_filter': time_filter, 'subreddits': subreddits, 'invalid': [ticker for ticker in tickers if ticker not in valid],
+            'tickers': results}
+
+#tickers from a watchlist file, one per line, # starts a comment.
+def read_watchlist(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.split('#')[0].strip() for line in f if line.split('#')[0].strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scan a watchlist of tickers across subreddits in one pass.')
+    parser.add_argument('tickers', nargs='*', help='ticker symbols, $ optional')
+    parser.add_argument('--watchlist', help='file with one ticker per line (# comments allowed)')
+    parser.add_argument('--subreddits', nargs='+', default=None, help='defaults to the console scraper list')
+    parser.add_argument('--time-filter', default='week', choices=list(TIME_FILTER_MAPPING))
+    args = parser.parse_args(argv)
+    tickers = list(args.tickers)
+    if args.watchlist:
+        tickers += read_watchlist(args.watchlist)
+    if not tickers:
+        parser.error('no tickers given')
+    json.dump(scan_watchlist(tickers, args.subreddits, args.time_filter), sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+#benchmark for the scrape -> analyze -> plot pipeline without touching reddit or yahoo.
+#reddit is a local http server (redditfetch is pointed at it with STOCKA_REDDIT_BASE_URL) that pages through fixture posts
+#exactly like search.json does, yfinance.download is swapped for a fixture frame. every stage is timed at several sizes
+#and the result is JSON so runs from different releases can be compared.
+#
+#   python benchmark.py                                  #100, 1k, 10k and 100k posts -> stdout
+#   python benchmark.py --sizes 100 1000 --output bench.json
+#   python benchmark.py --compare bench.json             #exit 1 when a stage got slower than --max-slowdown
+#   python benchmark.py record TSLA --subreddits wallstreetbets stocks   #record real pages/bars into benchfixtures/
+#
+#recorded fixtures are used as templates when present (cycled with fresh ids/dates to reach each size),
+#otherwise posts are generated from a fixed seed so every run benchmarks the same data.
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchfixtures')
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+STOCK = 'TSLA'
+POSTS_PER_SUBREDDIT = 1000 #reddit never returns more than this for one search
+PAGE_SIZE = 100
+SEED = 1234
+
+STAGES = ['scrape_posts', 'fetch', 'language_filter', 'vader', 'store', 'load', 'dedupe', 'aggregation', 'market_metrics', 'plotting']
+
+ENGLISH_SENTENCES = [
+    'I think {stock} is going to rip after earnings because the delivery numbers were way better than anyone expected.',
+    'Honestly the valuation makes no sense to me and I am worried this whole thing collapses when rates go up again.',
+    'Bought more shares this morning and I will keep averaging down until the market comes to its senses.',
+    'The options chain looks crazy right now, there is a huge wall of calls sitting just above the current price.',
+    'This is not financial advice but the chart has been forming a nice cup and handle for the last few weeks.',
+    'Management keeps missing their own guidance and I do not trust anything they say on the conference calls anymore.',
+    'Revenue grew nicely but margins are getting squeezed and that is what the market actually cares about.',
+    'I lost a lot of money on this one last year so I am staying on the sidelines until things calm down.',
+    'Great company, terrible stock, that is how I would sum up the last two years of holding it.',
+    'If the short interest numbers are right we could see a real squeeze once the next catalyst hits.',
+]
+SPANISH_SENTENCES = [
+    'Creo que {stock} va a subir mucho despues de los resultados porque las entregas fueron mejores de lo esperado.',
+    'La verdad es que la valoracion no tiene sentido y me preocupa que todo se caiga cuando suban los tipos.',
+    'Compre mas acciones esta manana y voy a seguir promediando hasta que el mercado recupere la cordura.',
+]
+
+def synthetic_post(rng, post_id, subreddit, now):
+    english = rng.random() > 0.1
+    sentences = ENGLISH_SENTENCES if english else SPANISH_SENTENCES
+    length = 1 if rng.random() < 0.1 else rng.randint(4, 12) #~10% are too short to be analyzed
+    selftext = ' '.join(rng.choice(sentences) for _ in range(length)).format(stock=STOCK)
+    return {'id': post_id, 'subreddit': subreddit, 'title': f'{STOCK} discussion {post_id}', 'selftext': selftext,
+            'permalink': f'/r/{subreddit}/comments/{post_id}/', 'created_utc': now - rng.random() * 365 * 86400,
+            'score': rng.randint(0, 5000), 'num_comments': rng.randint(0, 800)}
+
+def recorded_posts():
+    posts = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, 'reddit', '*.json'))):
+        with open(path, encoding='utf-8') as f:
+            posts += [child['data'] for child in json.load(f) if child.get('data')]
+    return posts
+
+#`size` posts spread over ceil(size / 1000) subreddits, ~2% share a permalink with an earlier post so dedupe has work to do.
+def build_fixture(size, templates=None):
+    rng = random.Random(SEED + size)
+    now = time.time()
+    posts = {}
+    for index in range(size):
+        subreddit = f'bench{index // POSTS_PER_SUBREDDIT}'
+        post_id = f'b{size}x{index}'
+        if templates:
+            post = dict(templates[index % len(templates)], id=post_id, subreddit=subreddit,
+                        permalink=f'/r/{subreddit}/comments/{post_id}/', created_utc=now - rng.random() * 365 * 86400)
+        else:
+            post = synthetic_post(rng, post_id, subreddit, now)
+        if index and rng.random() < 0.02:
+            post['permalink'] = posts[subreddit][-1]['permalink'] if posts.get(subreddit) else post['permalink']
+        posts.setdefault(subreddit, []).append(post)
+    return posts
+
+#subreddit -> {after token -> encoded page}, encoded up front so the server side costs almost nothing per request.
+def encode_pages(fixture):
+    pages = {}
+    for subreddit, posts in fixture.items():
+        pages[subreddit] = {}
+        for start in range(0, len(posts), PAGE_SIZE):
+            chunk = posts[start:start + PAGE_SIZE]
+            after = f't3_{chunk[-1]["id"]}' if start + PAGE_SIZE < len(posts) else None
+            token = '' if start == 0 else f't3_{posts[start - 1]["id"]}'
+            body = {'kind': 'Listing', 'data': {'children': [{'kind': 't3', 'data': post} for post in chunk], 'after': after}}
+            pages[subreddit][token] = json.dumps(body).encode('utf-8')
+    return pages
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        pages = self.server.pages.get(parts[1]) if len(parts) == 3 and parts[0] == 'r' else None
+        body = pages.get(parse_qs(url.query).get('after', [''])[0]) if pages is not None else None
+        if body is None:
+            body = json.dumps({'kind': 'Listing', 'data': {'children': [], 'after': None}}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Ratelimit-Remaining', '1000000') #lets the real token bucket open all the way up
+        self.send_header('X-Ratelimit-Reset', '1')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    server.daemon_threads = True
+    server.pages = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+#recorded daily bars when there are some, otherwise a seeded random walk over 10 years of business days.
+def market_fixture():
+    import numpy as np
+    import pandas as pd
+    path = os.path.join(FIXTURE_DIR, 'market', 'bars.csv')
+    if os.path.exists(path):
+        return pd.read_csv(path, index_col='Date', parse_dates=True)
+    rng = np.random.default_rng(SEED)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=2520, name='Date')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+    return pd.DataFrame({'Open': close * 0.99, 'High': close * 1.02, 'Low': close * 0.98, 'Close': close,
+                         'Volume': rng.integers(1_000_000, 50_000_000, len(dates)).astype(float)}, index=dates)
+
+def patch_market(bars):
+    import marketdata
+    from marketdata import period_slice
+    def download(tickers, period='1y', interval='1d', progress=False, **kwargs):
+        return period_slice(bars, period).copy()
+    marketdata.yf = types.SimpleNamespace(download=download) #stands in for the lazily imported yfinance module
+
+#fresh store + cold in-process caches so every run measures the same (uncached) work.
+def reset_state(db_path):
+    import langfilter
+    import marketdata
+    import plotcache
+    import poststore
+    connection = getattr(poststore._local, 'connection', None)
+    if connection is not None:
+        connection.close()
+    poststore._local.connection = None
+    poststore.DB_PATH = db_path
+    langfilter._memo.clear()
+    marketdata._bars.clear()
+    plotcache._images.clear()
+
+class Timer:
+    def __init__(self):
+        self.timings = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        yield
+        self.timings[name] = time.perf_counter() - started
+
+def run_once(size, subreddits, workdir, run):
+    from redditfetch import iter_fetch_jobs
+    from scraper import scrape_posts, analyze_raw_posts, score_records, remove_dupes, overall_sentiment, subreddit_sentiment
+    from postbatch import PostBatch
+    from poststore import save_posts, load_posts, window_sentiment
+    from marketdata import get_stock_metrics
+    from monthly import build_monthly_frame
+    from monthlyplot import render_post_counts_plot
+    timer = Timer()
+    counts = {}
+
+    #end to end, what app.home pays for a cold search
+    reset_state(os.path.join(workdir, f'e2e_{size}_{run}.db'))
+    with timer.stage('scrape_posts'):
+        scrape_posts(STOCK, 'year', subreddits, '1y')
+
+    #the same pipeline one stage at a time
+    reset_state(os.path.join(workdir, f'stages_{size}_{run}.db'))
+    jobs = {subreddit: {'stock': STOCK, 'subreddit': subreddit, 'time_filter': 'year', 'sort': 'top',
+                        'max_results': POSTS_PER_SUBREDDIT, 'per_page': PAGE_SIZE} for subreddit in subreddits}
+    with timer.stage('fetch'):
+        fetched = list(iter_fetch_jobs(jobs))
+    counts['fetched'] = sum(len(raw_posts) for _, raw_posts in fetched)
+    with timer.stage('language_filter'):
+        records = [record for subreddit, raw_posts in fetched for record in analyze_raw_posts(subreddit, raw_posts)]
+    counts['english'] = sum(1 for record in records if record['is_english'])
+    with timer.stage('vader'):
+        score_records(records)
+    with timer.stage('store'):
+        save_posts(STOCK, records)
+    with timer.stage('load'):
+        posts = PostBatch.from_rows(load_posts(STOCK, subreddits))
+    with timer.stage('dedupe'):
+        posts = remove_dupes(posts)
+    counts['unique'] = len(posts)
+    with timer.stage('aggregation'):
+        overall_sentiment(posts)
+        subreddit_sentiment(posts)
+        window_sentiment(STOCK, subreddits)
+        frame = build_monthly_frame(posts, STOCK)
+    with timer.stage('market_metrics'):
+        import marketdata
+        marketdata._bars.clear()
+        get_stock_metrics(STOCK, '1mo')
+    with timer.stage('plotting'):
+        render_post_counts_plot(list(frame.index), frame['posts'].tolist(), frame['close'].tolist(), frame['volume'].tolist(), STOCK)
+    return timer.timings, counts
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(sizes, repeat=1):
+    server = start_server()
+    os.environ['STOCKA_REDDIT_BASE_URL'] = f'http://127.0.0.1:{server.server_address[1]}'
+    workdir = tempfile.mkdtemp(prefix='stocka-bench-')
+    os.environ['STOCKA_DB'] = os.path.join(workdir, 'import.db')
+    patch_market(market_fixture())
+    templates = recorded_posts()
+    results = {}
+    for size in sizes:
+        fixture = build_fixture(size, templates)
+        server.pages = encode_pages(fixture)
+        subreddits = sorted(fixture)
+        runs = []
+        for run in range(repeat):
+            timings, counts = run_once(size, subreddits, workdir, run)
+            runs.append(timings)
+        results[str(size)] = {
+            'posts': size, 'subreddits': len(subreddits), 'counts': counts,
+            'stages': {stage: {'min': round(min(timings[stage] for timings in runs), 6),
+                               'median': round(statistics.median(timings[stage] for timings in runs), 6)} for stage in STAGES},
+        }
+        print(f'{size} posts: ' + ', '.join(f'{stage} {results[str(size)]["stages"][stage]["min"]:.3f}s' for stage in STAGES), file=sys.stderr)
+    server.shutdown()
+    return {
+        'meta': {'timestamp': datetime.now().isoformat(timespec='seconds'), 'commit': git_commit(), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'cpus': os.cpu_count(), 'repeat': repeat, 'recorded_fixtures': bool(templates)},
+        'sizes': results,
+    }
+
+#stage -> current/baseline ratio for every size both runs have, plus whether any went over max_slowdown.
+def compare(result, baseline, max_slowdown):
+    report = {}
+    regressed = False
+    for size, current in result['sizes'].items():
+        before = baseline.get('sizes', {}).get(size)
+        if not before:
+            continue
+        report[size] = {}
+        for stage, timing in current['stages'].items():
+            old = before['stages'].get(stage, {}).get('min')
+            if not old:
+                continue
+            ratio = round(timing['min'] / old, 3)
+            report[size][stage] = ratio
+            regressed = regressed or ratio > max_slowdown
+    return report, regressed
+
+#save real search pages and daily bars as fixtures (needs network).
+def record(stock, subreddits, time_filter):
+    from redditfetch import fetch_reddit_posts
+    import yfinance as yf
+    os.makedirs(os.path.join(FIXTURE_DIR, 'reddit'), exist_ok=True)
+    os.makedirs(os.path.join(FIXTURE_DIR, 'market'), exist_ok=True)
+    for subreddit in subreddits:
+        raw_posts = fetch_reddit_posts(stock, subreddit, time_filter)
+        with open(os.path.join(FIXTURE_DIR, 'reddit', f'{subreddit}.json'), 'w', encoding='utf-8') as f:
+            json.dump(raw_posts, f)
+        print(f'r/{subreddit}: {len(raw_posts)} posts', file=sys.stderr)
+    bars = yf.download(stock, period='10y', interval='1d', progress=False)
+    if hasattr(bars.columns, 'levels'):
+        bars.columns = bars.columns.get_level_values(0)
+    bars.index.name = 'Date'
+    bars.to_csv(os.path.join(FIXTURE_DIR, 'market', 'bars.csv'))
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == 'record':
+        parser = argparse.ArgumentParser(prog='benchmark.py record', description='Record real reddit pages and daily bars as fixtures.')
+        parser.add_argument('stock')
+        parser.add_argument('--subreddits', nargs='+', default=['wallstreetbets', 'stocks', 'investing'])
+        parser.add_argument('--time-filter', default='year')
+        args = parser.parse_args(argv[1:])
+        record(args.stock.upper(), args.subreddits, args.time_filter)
+        return 0
+    parser = argparse.ArgumentParser(description='Time every stage of the scrape -> analyze -> plot pipeline on local fixtures.')
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=1, help='runs per size, min and median are reported')
+    parser.add_argument('--output', help='write the JSON here instead of stdout')
+    parser.add_argument('--compare', help='baseline JSON from an earlier run')
+    parser.add_argument('--max-slowdown', type=float, default=1.25, help='with --compare, fail when a stage is this many times slower')
+    args = parser.parse_args(argv)
+    result = run_benchmark(args.sizes, max(1, args.repeat))
+    status = 0
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            report, regressed = compare(result, json.load(f), args.max_slowdown)
+        result['comparison'] = {'baseline': args.compare, 'max_slowdown': args.max_slowdown, 'ratios': report, 'regressed': regressed}
+        status = 1 if regressed else 0
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    else:
+        json.dump(result, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from poststore import save_posts
+from scraper import analyze_raw_posts, score_records
+from batchscan import DEFAULT_SUBREDDITS, match_posts, read_watchlist
+from tickermatch import TickerMatcher
+
+#offline backfill from the monthly reddit submission dumps (RS_YYYY-MM.zst, zstd compressed NDJSON, one submission per line).
+#reddit search stops at ~1000 results per query so the 'all' window of a live search is only the top of the history,
+#the dumps have every post. the file is decompressed as a stream in BLOCK_SIZE pieces (cut at line ends) and the blocks go to
+#a process pool, at most MAX_PENDING blocks per worker in flight so memory stays bounded whatever the file size.
+#workers drop every line from another subreddit before parsing it (a bytes regex on the raw line, that is most of the dump),
+#match the rest against the tickers, run the usual is_english + VADER on the matches and send back post store records,
+#the main process bulk inserts them per ticker (daily rollups included).
+#
+#   pip install zstandard
+#   python dumpimport.py RS_2021-01.zst RS_2021-02.zst --watchlist watchlist.txt --subreddits wallstreetbets stocks
+#
+#sync_state is left alone, the live searches keep topping up the store like before.
+
+BLOCK_SIZE = 8 * 1024 * 1024 #decompressed bytes per work unit
+MAX_PENDING = 2 #blocks in flight per worker
+WORKERS = int(os.getenv('STOCKA_IMPORT_WORKERS', os.cpu_count() or 1))
+ZSTD_WINDOW = 2 ** 31 #the dumps are compressed with --long=31
+
+SUBREDDIT_RE = re.compile(rb'"subreddit"\s*:\s*"([^"]+)"')
+
+_matcher = None
+_subreddits = None
+_since = None
+_until = None
+
+#zstandard is only needed here, so it is imported on use
+def open_dump(path):
+    if not path.endswith('.zst'):
+        return open(path, 'rb')
+    try:
+        import zstandard
+    except ImportError:
+        raise SystemExit('reading .zst dumps needs the zstandard package (pip install zstandard)') from None
+    return zstandard.ZstdDecompressor(max_window_size=ZSTD_WINDOW).stream_reader(open(path, 'rb'), closefd=True)
+
+#decompressed blocks of whole lines, roughly block_size bytes each
+def iter_blocks(path, block_size=BLOCK_SIZE):
+    with open_dump(path) as stream:
+        buffer = bytearray()
+        while True:
+            chunk = stream.read(block_size)
+            if chunk:
+                buffer += chunk
+                if len(buffer) < block_size:
+                    continue
+            cut = buffer.rfind(b'\n') + 1 if chunk else len(buffer)
+            if cut:
+                yield bytes(buffer[:cut])
+                del buffer[:cut]
+            if not chunk:
+                break
+
+#runs once in every worker process
+def _init_worker(tickers, subreddits, since_utc, until_utc):
+    global _matcher, _subreddits, _since, _until
+    import sentiment
+    sentiment.WORKERS = 1 #already one process per core, no nested pool for VADER
+    _matcher = TickerMatcher(tickers)
+    _subreddits = frozenset(subreddit.lower().encode() for subreddit in subreddits)
+    _since, _until = since_utc, until_utc
+
+#one block -> (stats, [(tickers, record)])
+def process_block(block):
+    stats = {'lines': 0, 'subreddit': 0, 'matched': 0, 'english': 0}
+    by_subreddit = {}
+    for line in block.split(b'\n'):
+        if not line:
+            continue
+        stats['lines'] += 1
+        #nested crossposts carry their own "subreddit" key, so any hit only means the line is worth parsing
+        if not any(name.lower() in _subreddits for name in SUBREDDIT_RE.findall(line)):
+            continue
+        try:
+            post_data = json.loads(line)
+        except ValueError:
+            continue
+        if str(post_data.get('subreddit', '')).lower().encode() not in _subreddits:
+            continue
+        created_utc = float(post_data.get('created_utc') or 0)
+        if (_since is not None and created_utc < _since) or (_until is not None and created_utc >= _until):
+            continue
+        stats['subreddit'] += 1
+        post_data['created_utc'] = created_utc #older dumps store it as a string
+        by_subreddit.setdefault(post_data['subreddit'].lower(), []).append({'data': post_data})
+    results = []
+    for subreddit, raw_posts in by_subreddit.items():
+        tickers_by_id = {}
+        unique = {}
+        for ticker, posts in match_posts(_matcher, raw_posts).items():
+            for rp in posts:
+                if rp['data'].get('id'):
+                    tickers_by_id.setdefault(rp['data']['id'], []).append(ticker)
+                    unique[rp['data']['id']] = rp
+        stats['matched'] += len(unique)
+        #posts mentioning several tickers are analyzed once
+        for record in score_records(analyze_raw_posts(subreddit, list(unique.values()))):
+            stats['english'] += 1 if record['is_english'] else 0
+            results.append((tickers_by_id[record['id']], record))
+    return stats, results
+
+#records -> post store, one save_posts transaction per ticker
+def store_results(results):
+    by_ticker = {}
+    for tickers, record in results:
+        for ticker in tickers:
+            by_ticker.setdefault(ticker, []).append(record)
+    for ticker, records in by_ticker.items():
+        save_posts(ticker, records)
+
+log = logging.getLogger(__name__) #timestamped lines on stdout, set up in main()
+
+#import every dump file in order. returns the summed stats.
+def import_dumps(paths, tickers, subreddits=None, since_utc=None, until_utc=None, workers=WORKERS, block_size=BLOCK_SIZE):
+    subreddits = sorted({subreddit.lower() for subreddit in (subreddits or DEFAULT_SUBREDDITS)})
+    tickers = TickerMatcher(tickers).tickers
+    totals = {'lines': 0, 'subreddit': 0, 'matched': 0, 'english': 0}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(tickers, subreddits, since_utc, until_utc)) as pool:
+        for path in paths:
+            started = time.time()
+            file_totals = dict.fromkeys(totals, 0)
+            pending = deque()
+
+            def drain(limit):
+                while len(pending) > limit:
+                    stats, results = pending.popleft().result()
+                    store_results(results)
+                    for key, value in stats.items():
+                        file_totals[key] += value
+
+            for block in iter_blocks(path, block_size):
+                pending.append(pool.submit(process_block, block))
+                drain(workers * MAX_PENDING)
+            drain(0)
+            seconds = max(time.time() - started, 1e-9)
+            log.info(f"{os.path.basename(path)}: {file_totals['lines']} lines in {seconds:.1f}s ({file_totals['lines'] / seconds * 60:,.0f}/min), "
+                f"{file_totals['subreddit']} in the subreddits, {file_totals['matched']} ticker matches, {file_totals['english']} english")
+            for key, value in file_totals.items():
+                totals[key] += value
+    return totals
+
+#YYYY-MM-DD -> unix timestamp of that midnight in utc (the dumps created_utc), not the local one.
+def _timestamp(value):
+    return datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp() if value else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Backfill the post store from reddit submission dump files (zstd NDJSON).')
+    parser.add_argument('dumps', nargs='+', help='RS_YYYY-MM.zst files (uncompressed .ndjson works too)')
+    parser.add_argument('--tickers', nargs='*', default=[], help='ticker symbols, $ optional')
+    parser.add_argument('--watchlist', help='file with one ticker per line (# comments allowed)')
+    parser.add_argument('--subreddits', nargs='+', default=None, help='defaults to the console scraper list')
+    parser.add_argument('--since', help='YYYY-MM-DD (utc), skip older posts')
+    parser.add_argument('--until', help='YYYY-MM-DD (utc), skip posts from this day on')
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s', datefmt='%Y-%m-%dT%H:%M:%S', stream=sys.stdout)
+    tickers = list(args.tickers)
+    if args.watchlist:
+        tickers += read_watchlist(args.watchlist)
+    if not tickers:
+        parser.error('no tickers given')
+    totals = import_dumps(args.dumps, tickers, args.subreddits, _timestamp(args.since), _timestamp(args.until), max(1, args.workers))
+    log.info(f"done: {totals['lines']} lines, {totals['matched']} ticker matches, {totals['english']} english")
+
+if __name__ == '__main__':
+    main()
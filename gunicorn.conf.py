@@ -0,0 +1,21 @@
+import os
+
+#gunicorn -c gunicorn.conf.py app:app
+#the app and the heavy libraries/models are loaded once in the master (preload + warmup) and shared copy-on-write
+#by the forked workers, so worker boot is just a fork.
+
+bind = os.getenv('STOCKA_BIND', '0.0.0.0:8000')
+#one worker by default: job state (jobs.py) lives in the process that runs the job, with more workers a
+#/home?job=<id> or /jobs/<id> poll that lands on another worker finds nothing. only raise this behind sticky sessions.
+workers = int(os.getenv('STOCKA_WEB_WORKERS', '1'))
+threads = int(os.getenv('STOCKA_WEB_THREADS', '8')) #/home waits on jobs and /home/stream holds a connection open
+timeout = int(os.getenv('STOCKA_WEB_TIMEOUT', '120'))
+preload_app = True
+
+def on_starting(server):
+    from warmup import warmup
+    try:
+        server.log.info(f'warmup done in {warmup():.2f}s')
+    except LookupError as e: #VADER lexicon not installed, a build artifact (readme: python vendorassets.py)
+        server.log.error(str(e))
+        raise SystemExit(1)
@@ -0,0 +1,118 @@
+import argparse
+import logging
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from redditfetch import RedditUnavailable
+from marketdata import CACHE_DIR, MIN_PERIOD, prefetch_daily_bars, is_valid_ticker
+from batchscan import DEFAULT_SUBREDDITS, scan_subreddits, read_watchlist
+
+#ingestion daemon: polls the subreddits for a watchlist on a schedule and keeps the post store (langdetect + VADER + daily rollups)
+#and the market data parquet tier filled ahead of time. run the web app with STOCKA_INGEST_ONLY=1 (and the same STOCKA_DB /
+#STOCKA_MARKET_CACHE_DIR, this daemon itself runs without the flag) and page loads only read what this process wrote,
+#neither reddit nor yahoo is on the request path (see marketdata.INGEST_ONLY for what that leaves out).
+#
+#   STOCKA_MARKET_CACHE_DIR=marketcache python ingest.py --watchlist watchlist.txt --interval 300
+#
+#every cycle crawls each subreddit's /new listing once (batchscan), the first one back to the start of --time-filter,
+#later ones only back to the previous sync. a reddit error skips the rest of the cycle and the next one waits
+#interval * 2^failures (capped at MAX_BACKOFF), market bars are refreshed every --market-interval seconds.
+
+INTERVAL = int(os.getenv('STOCKA_INGEST_INTERVAL', '300')) #seconds between reddit polls
+MARKET_INTERVAL = int(os.getenv('STOCKA_INGEST_MARKET_INTERVAL', '900')) #seconds between market data refreshes
+MAX_BACKOFF = int(os.getenv('STOCKA_INGEST_MAX_BACKOFF', '3600'))
+JITTER = 0.1 #+-10% on every sleep so several daemons dont poll in lockstep
+
+log = logging.getLogger(__name__) #timestamped lines on stdout, set up in main()
+
+class Ingestor:
+    def __init__(self, tickers, subreddits=None, time_filter='week', interval=INTERVAL, market_interval=MARKET_INTERVAL, max_backoff=MAX_BACKOFF):
+        self.tickers = sorted({ticker.strip().upper().lstrip('$') for ticker in tickers if ticker.strip('$ ')})
+        self.subreddits = sorted({subreddit.lower() for subreddit in (subreddits or DEFAULT_SUBREDDITS)})
+        self.time_filter = time_filter
+        self.interval = interval
+        self.market_interval = market_interval
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.last_market = 0.0
+        self.stop_event = threading.Event()
+
+    def refresh_market(self, now):
+        if now - self.last_market < self.market_interval:
+            return
+        prefetch_daily_bars(self.tickers, MIN_PERIOD, refresh=True)
+        self.last_market = now
+        log.info(f"market bars refreshed for {len(self.tickers)} tickers")
+
+    #one poll. returns the number of new post/ticker matches stored, raises RedditUnavailable on reddit errors.
+    def run_cycle(self):
+        now = time.time()
+        try:
+            self.refresh_market(now)
+        except Exception as e:
+            log.warning(f"market data refresh failed: {e}") #stale bars are better than no posts, keep going
+        found = scan_subreddits(self.tickers, self.subreddits, self.time_filter, now, incremental=True, raise_errors=True)
+        return sum(count for per_subreddit in found.values() for count in per_subreddit.values())
+
+    #seconds until the next cycle, exponential backoff after failures.
+    def next_delay(self):
+        delay = min(self.interval * (2 ** self.failures), self.max_backoff) if self.failures else self.interval
+        return delay * random.uniform(1 - JITTER, 1 + JITTER)
+
+    def run(self, once=False):
+        invalid = [ticker for ticker in self.tickers if not is_valid_ticker(ticker)]
+        if invalid:
+            log.warning(f"skipping unknown tickers: {', '.join(invalid)}")
+            self.tickers = [ticker for ticker in self.tickers if ticker not in invalid]
+        if not self.tickers:
+            log.info("nothing to ingest")
+            return
+        if not CACHE_DIR:
+            log.warning("STOCKA_MARKET_CACHE_DIR is not set, market bars will only be cached in this process")
+        log.info(f"ingesting {len(self.tickers)} tickers from {len(self.subreddits)} subreddits every {self.interval}s")
+        while not self.stop_event.is_set():
+            started = time.time()
+            try:
+                stored = self.run_cycle()
+                self.failures = 0
+                log.info(f"cycle done in {time.time() - started:.1f}s, {stored} new matches")
+            except RedditUnavailable as e:
+                self.failures += 1
+                log.warning(f"reddit error ({e}), failure #{self.failures}")
+            except Exception as e:
+                self.failures += 1
+                log.warning(f"cycle failed ({e}), failure #{self.failures}")
+            if once:
+                return
+            self.stop_event.wait(self.next_delay())
+
+    def stop(self, *_):
+        self.stop_event.set()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Poll subreddits for a watchlist and keep the post store and market data up to date.')
+    parser.add_argument('tickers', nargs='*', help='ticker symbols, $ optional (also STOCKA_INGEST_TICKERS=TSLA,AAPL)')
+    parser.add_argument('--watchlist', default=os.getenv('STOCKA_INGEST_WATCHLIST'), help='file with one ticker per line')
+    parser.add_argument('--subreddits', nargs='+', default=None, help='defaults to the console scraper list')
+    parser.add_argument('--time-filter', default='week', choices=['day', 'week', 'month', 'year'], help='how far back the first cycle crawls')
+    parser.add_argument('--interval', type=int, default=INTERVAL)
+    parser.add_argument('--market-interval', type=int, default=MARKET_INTERVAL)
+    parser.add_argument('--max-backoff', type=int, default=MAX_BACKOFF)
+    parser.add_argument('--once', action='store_true', help='run a single cycle and exit')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s', datefmt='%Y-%m-%dT%H:%M:%S', stream=sys.stdout)
+    tickers = list(args.tickers) + [ticker for ticker in os.getenv('STOCKA_INGEST_TICKERS', '').split(',') if ticker.strip()]
+    if args.watchlist:
+        tickers += read_watchlist(args.watchlist)
+    if not tickers:
+        parser.error('no tickers given')
+    ingestor = Ingestor(tickers, args.subreddits, args.time_filter, args.interval, args.market_interval, args.max_backoff)
+    signal.signal(signal.SIGTERM, ingestor.stop)
+    signal.signal(signal.SIGINT, ingestor.stop)
+    ingestor.run(once=args.once)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+import contextlib
+import contextvars
+import functools
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter as Tally
+from ttlcache import TTLCache
+
+#hot path instrumentation: process wide counters/histograms (rendered for prometheus on /metrics) plus a per request
+#trace of stage durations that app.py sends back as a Server-Timing header. stage() is cheap enough to leave on everywhere.
+#metrics are per process, with several gunicorn workers each one reports its own numbers.
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, '')) for name in labelnames)
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = [(name, value) for name, value in zip(labelnames, key)] + list(extra)
+    if not pairs:
+        return ''
+    escaped = [(name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for name, value in pairs]
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name + _format_labels(self.labelnames, key), value) for key, value in sorted(self._values.items())]
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=TIME_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {} #label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[index] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            rows = sorted((key, list(row)) for key, row in self._values.items())
+        samples = []
+        for key, row in rows:
+            for bound, count in zip(self.buckets, row):
+                samples.append((self.name + '_bucket' + _format_labels(self.labelnames, key, [('le', repr(float(bound)))]), count))
+            samples.append((self.name + '_bucket' + _format_labels(self.labelnames, key, [('le', '+Inf')]), row[-1]))
+            samples.append((self.name + '_sum' + _format_labels(self.labelnames, key), row[-2]))
+            samples.append((self.name + '_count' + _format_labels(self.labelnames, key), row[-1]))
+        return samples
+
+def _register(metric):
+    with _registry_lock:
+        return _registry.setdefault(metric.name, metric)
+
+def counter(name, help_text, labelnames=()):
+    return _register(Counter(name, help_text, labelnames))
+
+def histogram(name, help_text, labelnames=(), buckets=TIME_BUCKETS):
+    return _register(Histogram(name, help_text, labelnames, buckets))
+
+#prometheus text exposition format
+def render_metrics():
+    lines = []
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda metric: metric.name)
+    for metric in metrics:
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines += [f'{name} {value}' for name, value in metric.samples()]
+    return '\n'.join(lines) + '\n'
+
+HTTP_REQUESTS = counter('stocka_http_requests_total', 'Outbound HTTP requests by service and status.', ('service', 'status'))
+HTTP_SECONDS = histogram('stocka_http_request_seconds', 'Outbound HTTP request duration.', ('service',))
+HTTP_BYTES = counter('stocka_http_response_bytes_total', 'Bytes received from outbound HTTP requests.', ('service',))
+RATELIMIT_WAIT = counter('stocka_ratelimit_wait_seconds_total', 'Time spent waiting on the reddit rate limiter.')
+CACHE_REQUESTS = counter('stocka_cache_requests_total', 'Cache lookups by cache and result.', ('cache', 'result'))
+POSTS = counter('stocka_posts_total', 'Posts seen at each pipeline stage.', ('stage',))
+STAGE_SECONDS = histogram('stocka_stage_seconds', 'Duration of each pipeline stage.', ('stage',))
+REQUEST_SECONDS = histogram('stocka_request_seconds', 'Flask request duration.', ('endpoint', 'method', 'status'))
+
+#one outbound http call: status is an int, 'ok' or 'error'
+def record_http(service, seconds, status, nbytes=None):
+    HTTP_REQUESTS.inc(service=service, status=status)
+    HTTP_SECONDS.observe(seconds, service=service)
+    if nbytes:
+        HTTP_BYTES.inc(nbytes, service=service)
+
+def cache_result(cache, result):
+    CACHE_REQUESTS.inc(cache=cache, result=result)
+
+def count_posts(stage_name, amount):
+    if amount:
+        POSTS.inc(amount, stage=stage_name)
+
+#stage durations of one request (or one background job), in the order they first ran.
+class Trace:
+    def __init__(self):
+        self.stages = {} #name -> [seconds, calls]
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, calls=1):
+        with self._lock:
+            row = self.stages.setdefault(name, [0.0, 0])
+            row[0] += seconds
+            row[1] += calls
+
+    #another trace's stages (e.g. the job a request waited for)
+    def merge(self, stages):
+        for name, (seconds, calls) in (stages or {}).items():
+            self.add(name, seconds, calls)
+
+    def to_dict(self):
+        with self._lock:
+            return {name: (seconds, calls) for name, (seconds, calls) in self.stages.items()}
+
+    #Server-Timing header value, durations in ms
+    def server_timing(self):
+        return ', '.join(f'{name};dur={seconds * 1000:.1f}' for name, (seconds, _) in self.to_dict().items())
+
+_current = contextvars.ContextVar('stocka_trace', default=None)
+
+def current_trace():
+    return _current.get()
+
+#make a new trace current for the duration of the block (worker threads dont inherit the request's).
+@contextlib.contextmanager
+def trace():
+    new_trace = Trace()
+    token = _current.set(new_trace)
+    try:
+        yield new_trace
+    finally:
+        _current.reset(token)
+
+def start_trace():
+    new_trace = Trace()
+    return new_trace, _current.set(new_trace)
+
+def end_trace(token):
+    _current.reset(token)
+
+@contextlib.contextmanager
+def stage(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.observe(seconds, stage=name)
+        current = _current.get()
+        if current is not None:
+            current.add(name, seconds)
+
+#decorator version of stage()
+def timed(name):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+#PROFILING: a sampling profiler that can be switched on for a single request (STOCKA_PROFILING=1 to allow it at all).
+#every SAMPLE_INTERVAL it records the stacks of the threads attached to it: the request thread plus the pool threads
+#running work submitted through follow() on its behalf (its job, fetch and hash threads). other requests running at the
+#same time are not sampled. a job the request joined (already queued by someone else) and the VADER process pool are not
+#followed. the result is kept as collapsed stacks ("outer;inner;leaf count" lines, flamegraph.pl / speedscope ready).
+PROFILING_ENABLED = os.getenv('STOCKA_PROFILING') == '1'
+SAMPLE_INTERVAL = float(os.getenv('STOCKA_PROFILE_INTERVAL', '0.005'))
+MAX_STACK_DEPTH = 64
+
+_profiles = TTLCache(maxsize=32, ttl=3600) #profile id -> collapsed stacks text
+
+_profiler = contextvars.ContextVar('stocka_profiler', default=None)
+
+class SamplingProfiler:
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Tally()
+        self.samples = 0
+        self._threads = Tally() #thread id -> attach depth
+        self._threads_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._attached = None
+
+    #sample the current thread (and let follow() pick this profiler up) for the duration of the block.
+    @contextlib.contextmanager
+    def attach(self):
+        thread_id = threading.get_ident()
+        with self._threads_lock:
+            self._threads[thread_id] += 1
+        token = _profiler.set(self)
+        try:
+            yield
+        finally:
+            _profiler.reset(token)
+            with self._threads_lock:
+                self._threads[thread_id] -= 1
+                if self._threads[thread_id] <= 0:
+                    del self._threads[thread_id]
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            with self._threads_lock:
+                attached = set(self._threads)
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in attached:
+                    continue
+                names = []
+                while frame is not None and len(names) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(names))] += 1
+            self.samples += 1
+
+    #start sampling with the calling (request) thread attached, stop() from the same thread.
+    def start(self):
+        self._attached = self.attach()
+        self._attached.__enter__()
+        self._thread = threading.Thread(target=self._sample, name='stocka-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    #stop sampling, returns the collapsed stacks most frequent first
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._attached.__exit__(None, None, None)
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+#fn wrapped to run attached to the profiler of the calling thread, for work handed to a pool thread.
+#returns fn itself when nothing is being profiled.
+def follow(fn):
+    profiler = _profiler.get()
+    if profiler is None:
+        return fn
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with profiler.attach():
+            return fn(*args, **kwargs)
+    return wrapper
+
+def save_profile(text):
+    profile_id = uuid.uuid4().hex
+    _profiles.set(profile_id, text)
+    return profile_id
+
+def get_profile(profile_id):
+    return _profiles.get(profile_id)
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import instrument
+
+#in-process job queue so long scrapes run on a worker pool instead of inside the flask request thread.
+#identical requests that are still queued/running share one job (dedupe by key).
+
+WORKERS = int(os.getenv('STOCKA_JOB_WORKERS', '4'))
+RESULT_TTL = 15 * 60 #finished jobs are kept this long for /jobs/<id>
+
+class Job:
+    def __init__(self, key):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = 'queued' #queued -> running -> done / failed
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.done_event = threading.Event()
+
+    def wait(self, timeout=None):
+        return self.done_event.wait(timeout)
+
+    #status without the result (the caller decides how to serialize that).
+    def to_dict(self):
+        return {'id': self.id, 'status': self.status, 'error': self.error,
+                'created': self.created, 'started': self.started, 'finished': self.finished}
+
+_jobs = {} #job id -> Job
+_inflight = {} #key -> Job still queued or running
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='stocka-job')
+
+def _run(job, fn, args, kwargs):
+    job.status = 'running'
+    job.started = time.time()
+    try:
+        job.result = fn(*args, **kwargs)
+        job.status = 'done'
+    except Exception as e:
+        job.error = str(e)
+        job.status = 'failed'
+    job.finished = time.time()
+    with _lock:
+        if _inflight.get(job.key) is job:
+            del _inflight[job.key]
+    job.done_event.set()
+
+#drop finished jobs nobody asked about for RESULT_TTL.
+def _prune():
+    cutoff = time.time() - RESULT_TTL
+    for job_id in [job_id for job_id, job in _jobs.items() if job.finished and job.finished < cutoff]:
+        del _jobs[job_id]
+
+#queue fn(*args, **kwargs) under key, or return the job already queued/running for that key.
+def submit(key, fn, *args, **kwargs):
+    with _lock:
+        _prune()
+        job = _inflight.get(key)
+        if job is not None:
+            return job
+        job = Job(key)
+        _jobs[job.id] = job
+        _inflight[key] = job
+    _executor.submit(_run, job, instrument.follow(fn), args, kwargs) #a profiled request keeps sampling its job
+    return job
+
+def get_job(job_id):
+    with _lock:
+        return _jobs.get(job_id)
@@ -0,0 +1,71 @@
+import re
+from langdetect import DetectorFactory, detect
+from ttlcache import TTLCache
+import instrument
+
+#english filter with a fast path. a cheap ascii/stopword ratio check settles obvious english (and obvious non-latin text)
+#right away, only ambiguous posts go to the full detector and it only ever sees a bounded prefix of the text.
+
+DetectorFactory.seed = 0 #langdetect is random by default, seed it so the same post always gets the same answer.
+
+PREFIX_CHARS = 1500 #nothing past this is looked at
+MIN_ASCII_RATIO = 0.85 #below this share of ascii letters its not english
+ENGLISH_STOPWORD_RATIO = 0.25 #english prose is ~40% stopwords, other latin languages rarely pass 15% on this list
+MIN_WORDS = 20
+
+STOPWORDS = frozenset('''
+a about after all also an and any are as at be because been but by can could did do does for from had has have he her
+his how i if in into is it its just like me more my no not of on one or our out so some than that the their them then
+there these they this to up was we were what when which who will with would you your
+'''.split())
+
+WORD_RE = re.compile(r"[a-z']+")
+
+_memo = TTLCache(maxsize=50000, ttl=None) #post id -> bool
+
+#langdetect on the prefix, default full detector. swap it with set_detector().
+def langdetect_detector(text):
+    try:
+        return detect(text) == "en"
+    except:
+        return False
+
+_detector = langdetect_detector
+
+#plug in a different full detector (any callable text -> bool).
+def set_detector(detector):
+    global _detector
+    _detector = detector
+
+#True/False when the heuristic is sure, None when the full detector has to decide.
+def quick_check(text):
+    letters = [c for c in text if c.isalpha()]
+    if not letters:
+        return False
+    ascii_ratio = sum(c.isascii() for c in letters) / len(letters)
+    if ascii_ratio < MIN_ASCII_RATIO:
+        return False
+    words = WORD_RE.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+    stopword_ratio = sum(word in STOPWORDS for word in words) / len(words)
+    if stopword_ratio >= ENGLISH_STOPWORD_RATIO:
+        return True
+    return None
+
+#only english (fast path first, full detector only when ambiguous), memoized by reddit post id when one is given.
+def is_english(content, post_id=None):
+    if post_id is not None:
+        cached = _memo.get(post_id)
+        if cached is not None:
+            instrument.cache_result('language', 'hit')
+            return cached
+        instrument.cache_result('language', 'miss')
+    prefix = content[:PREFIX_CHARS]
+    result = quick_check(prefix)
+    if result is None:
+        instrument.count_posts('langdetect', 1)
+        result = _detector(prefix)
+    if post_id is not None:
+        _memo.set(post_id, result)
+    return result
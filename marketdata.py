@@ -0,0 +1,262 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+import tickerindex
+import instrument
+from ttlcache import TTLCache
+
+#every yfinance call in the app goes through here. the widest daily OHLCV range needed is downloaded once per ticker
+#and everything else (monthly bars, last close, the value 31 days ago, avg daily change) is derived from it locally.
+
+PERIOD_ORDER = ['1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'max']
+MIN_PERIOD = '1y' #the 12 month plots always need a year so never fetch less than that.
+BARS_TTL = 15 * 60 #daily bars are fine for 15 min.
+NEGATIVE_TTL = 3600 #unknown symbols are rechecked over the network after an hour.
+CACHE_DIR = os.getenv('STOCKA_MARKET_CACHE_DIR') #optional on-disk parquet tier, off when unset.
+#with the ingest daemon running (STOCKA_INGEST_ONLY=1) it refreshes the parquet files, so the web tier takes them at any age
+#and never calls yahoo itself: bars it has no file for (a ticker off the watchlist, a period wider than the daemon's) come
+#back shorter or empty, and a ticker missing from the symbol index is only valid if the daemon wrote bars for it.
+INGEST_ONLY = os.getenv('STOCKA_INGEST_ONLY') == '1'
+DISK_MAX_AGE = None if INGEST_ONLY else BARS_TTL
+
+yf = None #yfinance, imported on first use (it is slow to import and most requests are served from the caches)
+
+def _yfinance():
+    global yf
+    if yf is None:
+        import yfinance
+        yf = yfinance
+    return yf
+
+_bars = TTLCache(maxsize=256, ttl=BARS_TTL) #ticker -> (period, daily bars)
+_invalid = TTLCache(maxsize=4096, ttl=NEGATIVE_TTL) #tickers yahoo said are not valid
+_fetch_locks = {}
+_fetch_locks_guard = threading.Lock()
+
+#one lock per ticker so two threads asking for the same ticker dont both hit yahoo.
+def _fetch_lock(ticker):
+    with _fetch_locks_guard:
+        return _fetch_locks.setdefault(ticker, threading.Lock())
+
+def _covers(have, want):
+    return PERIOD_ORDER.index(have) >= PERIOD_ORDER.index(want)
+
+#newer yfinance returns (Price, Ticker) multiindex columns even for one ticker, flatten them.
+def _normalize(df):
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    df.index.name = 'Date'
+    return df
+
+def _disk_path(ticker, period):
+    return os.path.join(CACHE_DIR, f'{ticker}_{period}.parquet')
+
+#freshest-enough parquet file that covers the period, None when the tier is off or nothing usable is on disk.
+def _read_disk(ticker, period):
+    if not CACHE_DIR:
+        return None
+    for have in reversed(PERIOD_ORDER):
+        if not _covers(have, period):
+            break
+        path = _disk_path(ticker, have)
+        try:
+            if DISK_MAX_AGE is not None and time.time() - os.path.getmtime(path) > DISK_MAX_AGE:
+                continue
+            return have, pd.read_parquet(path)
+        except (ImportError, OSError, ValueError):
+            continue
+    return None
+
+def _write_disk(ticker, period, df):
+    if not CACHE_DIR:
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = _disk_path(ticker, period) + '.tmp'
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, _disk_path(ticker, period)) #atomic so other workers never read half a file
+    except (ImportError, OSError, ValueError):
+        pass
+
+def _empty_bars():
+    return _normalize(pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume']))
+
+#widest parquet file on disk for the ticker whatever its period, (period, bars) or None.
+def _read_disk_any(ticker):
+    return _read_disk(ticker, PERIOD_ORDER[0])
+
+#yf.download with the outbound request metrics (yfinance hides the raw http, so no byte counts here).
+def _download(tickers, **kwargs):
+    started = time.perf_counter()
+    try:
+        with instrument.stage('yahoo_download'):
+            df = _yfinance().download(tickers, interval='1d', progress=False, **kwargs)
+    except Exception:
+        instrument.record_http('yahoo', time.perf_counter() - started, 'error')
+        raise
+    instrument.record_http('yahoo', time.perf_counter() - started, 'ok')
+    return df
+
+#daily OHLCV bars for at least `period`, cached in memory (and on disk when enabled).
+def get_daily_bars(ticker, period='1y'):
+    ticker = ticker.upper()
+    if not _covers(period, MIN_PERIOD):
+        period = MIN_PERIOD
+    cached = _bars.get(ticker)
+    if cached and _covers(cached[0], period):
+        instrument.cache_result('bars', 'hit')
+        return cached[1]
+    with _fetch_lock(ticker):
+        cached = _bars.get(ticker)
+        if cached and _covers(cached[0], period):
+            instrument.cache_result('bars', 'hit')
+            return cached[1]
+        from_disk = _read_disk(ticker, period)
+        if from_disk:
+            instrument.cache_result('bars', 'disk')
+            _bars.set(ticker, from_disk)
+            return from_disk[1]
+        if INGEST_ONLY:
+            #whatever the daemon has, kept as if it covered the period until BARS_TTL so the disk isnt read every request
+            from_disk = _read_disk_any(ticker)
+            instrument.cache_result('bars', 'disk' if from_disk else 'unavailable')
+            df = from_disk[1] if from_disk else _empty_bars()
+            _bars.set(ticker, (period, df))
+            return df
+        instrument.cache_result('bars', 'miss')
+        df = _normalize(_download(ticker, period=period))
+        _bars.set(ticker, (period, df))
+        if not df.empty:
+            _write_disk(ticker, period, df)
+        return df
+
+#warm the cache for many tickers with one batched yf.download instead of one request per ticker (batch scans).
+#tickers already cached (memory or disk) for the period are skipped unless refresh=True (the ingest daemon).
+def prefetch_daily_bars(tickers, period='1y', refresh=False):
+    if not _covers(period, MIN_PERIOD):
+        period = MIN_PERIOD
+    missing = []
+    for ticker in sorted({ticker.upper() for ticker in tickers}):
+        if refresh:
+            missing.append(ticker)
+            continue
+        cached = _bars.get(ticker)
+        if cached and _covers(cached[0], period):
+            continue
+        from_disk = _read_disk(ticker, period)
+        if from_disk:
+            _bars.set(ticker, from_disk)
+            continue
+        missing.append(ticker)
+    if INGEST_ONLY and not refresh:
+        missing = [] #get_daily_bars falls back to what the daemon wrote
+    if len(missing) < 2 and not refresh:
+        for ticker in missing:
+            get_daily_bars(ticker, period)
+        return
+    if not missing:
+        return
+    df = _download(missing, period=period, group_by='ticker')
+    for ticker in missing:
+        if isinstance(df.columns, pd.MultiIndex) and ticker in df.columns.get_level_values(0):
+            bars = _normalize(df[ticker].dropna(how='all').copy())
+        elif not isinstance(df.columns, pd.MultiIndex) and len(missing) == 1: #older yfinance doesnt group a single ticker
+            bars = _normalize(df.dropna(how='all').copy())
+        else:
+            bars = _empty_bars()
+        _bars.set(ticker, (period, bars))
+        if not bars.empty:
+            _write_disk(ticker, period, bars)
+
+#last `period` worth of rows out of a daily frame.
+def period_slice(df, period):
+    if df.empty or period == 'max':
+        return df
+    if period.endswith('d'):
+        return df.tail(int(period[:-1]))
+    if period.endswith('mo'):
+        start = df.index[-1] - pd.DateOffset(months=int(period[:-2]))
+    else:
+        start = df.index[-1] - pd.DateOffset(years=int(period[:-1]))
+    return df[df.index > start]
+
+#calendar month bars out of daily bars (same shape as yf.download(interval='1mo')).
+def monthly_bars(df):
+    if df.empty:
+        return df
+    grouped = df.groupby(df.index.to_period('M'))
+    monthly = grouped.agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'})
+    monthly.index = monthly.index.to_timestamp()
+    monthly.index.name = 'Date'
+    return monthly
+
+        #       get stock metrics + average daily change + last close value
+def get_stock_metrics(ticker, period='3mo'):
+    df = get_daily_bars(ticker, period)
+    #yfinance can hand back a row with no close/volume yet (e.g. today before the first trade), use the last complete day
+    df = df.dropna(subset=['Close', 'Volume'])
+    if df.empty:
+        current_total_volume = 0
+        stock_price_today = 0.0
+    else:
+        current_total_volume = int(df['Volume'].iloc[-1])
+        stock_price_today = float(df['Close'].iloc[-1])
+
+    today = datetime.now().date()
+    target_date = today - timedelta(days=31)
+    df_past_filtered = df[df.index.date <= target_date] if not df.empty else df
+    if df_past_filtered.empty:
+        close_past = 0.0
+        volume_past = 0.0
+    else:
+        close_past = float(df_past_filtered['Close'].iloc[-1])
+        volume_past = float(df_past_filtered['Volume'].iloc[-1])
+
+    if close_past != 0:
+        stock_price_change_pct = ((stock_price_today - close_past) / close_past) * 100.0
+    else:
+        stock_price_change_pct = 0.0
+
+    if volume_past != 0:
+        volume_change_pct = ((current_total_volume - volume_past) / volume_past) * 100.0
+    else:
+        volume_change_pct = 0.0
+
+    df_period = period_slice(df, period)
+    if df_period.empty or len(df_period) < 2:
+        avg_daily_change = 0.0
+    else:
+        avg_daily_change = float(df_period['Close'].pct_change().mean() * 100.0)
+    return {
+        'avg_daily_change': round(avg_daily_change, 2), 'stock_price': round(stock_price_today, 2), 'current_total_volume': current_total_volume, 'volume_change_pct': round(volume_change_pct, 2), 'stock_price_change_pct': round(stock_price_change_pct, 2)
+    }
+
+#       func to check if user entered ticker symbol is valid. known symbols are answered from the local index,
+#       unknown ones fall back to the yfin API once and the answer is cached (negative answers only for NEGATIVE_TTL).
+#       with INGEST_ONLY the fallback is the market cache dir instead of the API.
+def is_valid_ticker(ticker):
+    ticker = ticker.upper()
+    if tickerindex.is_known(ticker):
+        return True
+    cached = _invalid.get(ticker)
+    if cached is not None:
+        instrument.cache_result('invalid_tickers', 'hit')
+        return False
+    if INGEST_ONLY:
+        return _read_disk_any(ticker) is not None
+    started = time.perf_counter()
+    try:
+        info = _yfinance().Ticker(ticker).info
+        symbol = info.get('symbol', '')
+    except Exception as e:
+        # Log the error if needed: print(f"Error validating ticker {ticker}: {e}")
+        instrument.record_http('yahoo', time.perf_counter() - started, 'error')
+        return False #dont cache network errors
+    instrument.record_http('yahoo', time.perf_counter() - started, 'ok')
+    if symbol and symbol.upper() == ticker:
+        tickerindex.add_symbol(ticker, info.get('shortName') or info.get('longName') or '')
+        return True
+    _invalid.set(ticker, True)
+    return False
@@ -0,0 +1,29 @@
+from datetime import datetime
+import pandas as pd
+from marketdata import get_daily_bars, period_slice
+import instrument
+
+#monthly aggregation shared by every 12 month plot: posts bucketed with one groupby and daily bars resampled
+#to month-end close + mean daily volume in one pass, gaps forward-filled (0 before the first month with data).
+
+#last `count` months including this one as a PeriodIndex
+def last_months(count=12):
+    return pd.period_range(end=pd.Period(datetime.today(), freq='M'), periods=count, freq='M')
+
+#frame indexed by 'YYYY-MM' with posts / close / volume columns for the last `count` months (posts_data is a PostBatch).
+@instrument.timed('monthly_aggregation')
+def build_monthly_frame(posts_data, stock, count=12):
+    months = last_months(count)
+    dates = pd.Series(pd.to_datetime(posts_data.created_utc, unit='s'))
+    post_counts = dates.dt.to_period('M').value_counts().reindex(months, fill_value=0) if len(dates) else pd.Series(0, index=months)
+
+    daily = period_slice(get_daily_bars(stock, '1y'), '1y')
+    if daily.empty:
+        market = pd.DataFrame({'close': 0.0, 'volume': 0.0}, index=months)
+    else:
+        market = daily.groupby(daily.index.to_period('M')).agg(close=('Close', 'last'), volume=('Volume', 'mean'))
+        market = market.reindex(months).ffill().fillna(0.0)
+
+    frame = pd.DataFrame({'posts': post_counts.astype(int), 'close': market['close'].astype(float), 'volume': market['volume'].astype(float)}, index=months)
+    frame.index = months.strftime('%Y-%m')
+    return frame
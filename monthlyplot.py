@@ -0,0 +1,57 @@
+import io
+from monthly import build_monthly_frame
+from plotcache import cached_plot, new_figure
+import instrument
+
+#one figure for the home page: monthly post counts against month-end close (top) and average volume (bottom),
+#both panels share the month axis so it is one aggregation + one matplotlib render instead of two.
+#returns the plotcache key (served by /plots/<key>.png)
+@instrument.timed('plot_monthly')
+def generate_post_counts_plot(posts_data, stock, subreddits=()):
+    frame = build_monthly_frame(posts_data, stock)
+    months, post_counts = list(frame.index), frame['posts'].tolist()
+    stock_prices, avg_volumes = frame['close'].tolist(), frame['volume'].tolist()
+    return cached_plot('monthly', stock, subreddits, [months, post_counts, stock_prices, avg_volumes],
+                       lambda: render_post_counts_plot(months, post_counts, stock_prices, avg_volumes, stock))
+
+#matplotlib part, only runs when the plot isnt cached yet. returns png bytes.
+def render_post_counts_plot(months, post_counts, stock_prices, avg_volumes, stock):
+    fig = new_figure(figsize=(12, 10))
+    price_ax, volume_ax = fig.subplots(2, 1, sharex=True)
+    positions = range(len(months))
+
+    #TOP: post counts + stock price
+    price_ax.bar(positions, post_counts, color='skyblue', label='Total Posts')
+    price_ax.set_ylabel('Total Posts', color='skyblue')
+    price_ax.tick_params(axis='y', labelcolor='skyblue')
+    price_line_ax = price_ax.twinx()
+    price_line_ax.plot(positions, stock_prices, color='orange', marker='o', label='Stock Price')
+    price_line_ax.set_ylabel('Stock Price ($)', color='orange')
+    price_line_ax.tick_params(axis='y', labelcolor='orange')
+    price_ax.set_title(f'Total Posts in Selected Subreddits and Stock Price for {stock} Over the Last 12 Months')
+    bars, labels_bars = price_ax.get_legend_handles_labels()
+    lines, labels_lines = price_line_ax.get_legend_handles_labels()
+    price_ax.legend(bars + lines, labels_bars + labels_lines, loc='upper left')
+
+    #BOTTOM: post counts + average volume
+    volume_ax.bar(positions, post_counts, color='lightgreen', label='Total Posts')
+    volume_ax.set_ylabel('Total Posts', color='lightgreen')
+    volume_ax.tick_params(axis='y', labelcolor='lightgreen')
+    volume_line_ax = volume_ax.twinx()
+    volume_line_ax.plot(positions, avg_volumes, color='purple', marker='o', label='Average Volume')
+    volume_line_ax.set_ylabel('Average Volume', color='purple')
+    volume_line_ax.tick_params(axis='y', labelcolor='purple')
+    volume_ax.set_title(f'Total Posts in Selected Subreddits and Average Volume for {stock} Over the Last 12 Months')
+    bars, labels_bars = volume_ax.get_legend_handles_labels()
+    lines, labels_lines = volume_line_ax.get_legend_handles_labels()
+    volume_ax.legend(bars + lines, labels_bars + labels_lines, loc='upper left')
+
+    #shared month axis
+    volume_ax.set_xlabel('Month')
+    volume_ax.set_xticks(positions)
+    volume_ax.set_xticklabels(months, rotation=45)
+    fig.tight_layout()
+
+    buffer = io.BytesIO() #save to memory, not static/
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
@@ -0,0 +1,55 @@
+import hashlib
+import json
+import logging
+from datetime import datetime
+from ttlcache import TTLCache
+import instrument
+import resultcache
+
+#rendered plot PNGs live in memory under a content address: hash of (plot kind, ticker, subreddits, month bucket, plotted data).
+#same inputs -> same key, so a repeat view is a cache hit and matplotlib never runs, and two users never share/overwrite a file.
+#every image is also written to the shared result cache file so other gunicorn workers can serve it.
+
+MAX_IMAGES = 256
+_images = TTLCache(maxsize=MAX_IMAGES, ttl=None) #key -> png bytes, LRU bounded
+
+def plot_key(kind, stock, subreddits, data):
+    month_bucket = datetime.today().strftime('%Y-%m')
+    payload = json.dumps([kind, stock.upper(), sorted(subreddit.lower() for subreddit in subreddits), month_bucket, data], default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+#matplotlib Figure (not pyplot, so plots can render on several threads at once). matplotlib is only imported
+#the first time a plot actually has to be rendered, Agg backend for headless environments.
+def new_figure(**kwargs):
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    return Figure(**kwargs)
+
+#memory first, then the shared on disk copy (a plot rendered by another gunicorn worker)
+def get_image(key):
+    png_bytes = _images.get(key)
+    if png_bytes is None:
+        png_bytes = resultcache.get_plot(key)
+        if png_bytes is not None:
+            _images.set(key, png_bytes)
+    return png_bytes
+
+#the in-memory copy is enough for this worker to serve the plot, a failed shared write (locked/full disk) is only logged.
+def put_image(key, png_bytes):
+    _images.set(key, png_bytes)
+    try:
+        resultcache.put_plot(key, png_bytes)
+    except Exception as e:
+        logging.getLogger(__name__).warning('shared plot cache write failed: %s', e)
+
+#key for the plot, render(): -> png bytes only runs on a cache miss.
+def cached_plot(kind, stock, subreddits, data, render):
+    key = plot_key(kind, stock, subreddits, data)
+    if get_image(key) is None:
+        instrument.cache_result('plots', 'miss')
+        with instrument.stage('plot_render'):
+            put_image(key, render())
+    else:
+        instrument.cache_result('plots', 'hit')
+    return key
@@ -0,0 +1,202 @@
+from datetime import datetime
+import numpy as np
+import sentiment
+
+#scraped posts stored as columns instead of one dict per post: created_utc/compound as numpy arrays, subreddit and label
+#as small integer codes into a shared name list, and id/title/permalink as one string each plus an offsets array
+#(post i is blob[offsets[i]:offsets[i + 1]]). windows, dedupe and every aggregate work on the arrays,
+#templates and the json payloads iterate cheap row views that only build a value when it is read.
+
+REDDIT_URL = 'https://www.reddit.com'
+
+#(one string, offsets) for a list of strings
+def _encode(strings):
+    strings = ['' if value is None else str(value) for value in strings]
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    if strings:
+        np.cumsum([len(value) for value in strings], out=offsets[1:])
+    return ''.join(strings), offsets
+
+def _decode(blob, offsets, index):
+    return blob[offsets[index]:offsets[index + 1]]
+
+#offset encoded strings for the rows picked by `indices`
+def _take_strings(blob, offsets, indices):
+    return _encode([blob[offsets[index]:offsets[index + 1]] for index in indices.tolist()])
+
+class PostBatch:
+    __slots__ = ('created_utc', 'compound', 'subreddit_codes', 'subreddit_names', 'label_codes',
+                 '_ids', '_id_offsets', '_titles', '_title_offsets', '_permalinks', '_permalink_offsets')
+
+    def __init__(self, ids, created_utc, compound, subreddits, titles, permalinks):
+        self.created_utc = np.asarray(created_utc, dtype=np.float64)
+        self.compound = np.asarray(compound, dtype=np.float64)
+        #sorted names so the per subreddit aggregates come out in the same order as before
+        names = sorted(set(map(str, subreddits)))
+        lookup = {name: code for code, name in enumerate(names)}
+        self.subreddit_names = names
+        self.subreddit_codes = np.fromiter((lookup[str(subreddit)] for subreddit in subreddits), dtype=np.int32, count=len(subreddits))
+        self.label_codes = sentiment.label_codes(self.compound).astype(np.int8)
+        self._ids, self._id_offsets = _encode(ids)
+        self._titles, self._title_offsets = _encode(titles)
+        self._permalinks, self._permalink_offsets = _encode(permalinks)
+
+    #post store rows (poststore.load_posts) -> batch
+    @classmethod
+    def from_rows(cls, rows):
+        return cls([row['id'] for row in rows], [row['created_utc'] for row in rows], [row['compound'] for row in rows],
+                   [row['subreddit'] for row in rows], [row['title'] for row in rows], [row['permalink'] for row in rows])
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [], [], [])
+
+    #batch with only the given rows (index array or boolean mask), in that order. columns are copied, not viewed,
+    #so a small window never keeps a big parent batch alive.
+    def take(self, selector):
+        indices = np.arange(len(self))[selector] if np.asarray(selector).dtype == bool else np.asarray(selector, dtype=np.int64)
+        batch = PostBatch.__new__(PostBatch)
+        batch.created_utc = self.created_utc[indices]
+        batch.compound = self.compound[indices]
+        batch.subreddit_names = self.subreddit_names
+        batch.subreddit_codes = self.subreddit_codes[indices]
+        batch.label_codes = self.label_codes[indices]
+        batch._ids, batch._id_offsets = _take_strings(self._ids, self._id_offsets, indices)
+        batch._titles, batch._title_offsets = _take_strings(self._titles, self._title_offsets, indices)
+        batch._permalinks, batch._permalink_offsets = _take_strings(self._permalinks, self._permalink_offsets, indices)
+        return batch
+
+    #several batches -> one (subreddit codes are remapped onto the merged name list)
+    @classmethod
+    def concat(cls, batches):
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+        return cls([post_id for batch in batches for post_id in batch.ids()],
+                   np.concatenate([batch.created_utc for batch in batches]), np.concatenate([batch.compound for batch in batches]),
+                   [name for batch in batches for name in batch.subreddits()],
+                   [title for batch in batches for title in batch.titles()], [link for batch in batches for link in batch.permalinks()])
+
+    def __len__(self):
+        return len(self.created_utc)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return PostView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield PostView(self, index)
+
+    def ids(self):
+        return [_decode(self._ids, self._id_offsets, index) for index in range(len(self))]
+
+    def titles(self):
+        return [_decode(self._titles, self._title_offsets, index) for index in range(len(self))]
+
+    def permalinks(self):
+        return [_decode(self._permalinks, self._permalink_offsets, index) for index in range(len(self))]
+
+    #subreddit name per row
+    def subreddits(self):
+        names = self.subreddit_names
+        return [names[code] for code in self.subreddit_codes.tolist()]
+
+    #rows created at or after a unix timestamp
+    def since(self, cutoff):
+        return self.take(self.created_utc >= cutoff)
+
+    #first row for every permalink (= url), order kept
+    def unique_urls(self):
+        seen = {}
+        for index, permalink in enumerate(self.permalinks()):
+            seen.setdefault(permalink, index)
+        if len(seen) == len(self):
+            return self
+        return self.take(np.fromiter(seen.values(), dtype=np.int64, count=len(seen)))
+
+    #rows whose permalink is not in `seen` (a set that is updated with them), for the per subreddit streaming dedupe
+    def exclude_urls(self, seen):
+        keep = np.ones(len(self), dtype=bool)
+        for index, permalink in enumerate(self.permalinks()):
+            if permalink in seen:
+                keep[index] = False
+            else:
+                seen.add(permalink)
+        return self if keep.all() else self.take(keep)
+
+    #the aggregates straight off the columns
+    def overall_label(self):
+        return sentiment.overall_label(self.compound)
+
+    def subreddit_breakdown(self):
+        return sentiment.aggregate_codes(self.compound, self.subreddit_codes, self.subreddit_names)
+
+    #post dicts like the ones the app used to pass around (for code that really wants dicts)
+    def to_dicts(self):
+        return [view.to_dict() for view in self]
+
+#one row of a PostBatch with the old post dict interface: post.title / post['title'] / post.get('title'),
+#every value is read from the columns on access.
+class PostView:
+    __slots__ = ('batch', 'index')
+    KEYS = ('id', 'subreddit', 'title', 'url', 'compound_score', 'content_sentiment', 'date', 'created_utc')
+
+    def __init__(self, batch, index):
+        self.batch = batch
+        self.index = index
+
+    @property
+    def id(self):
+        return _decode(self.batch._ids, self.batch._id_offsets, self.index)
+
+    @property
+    def subreddit(self):
+        return self.batch.subreddit_names[self.batch.subreddit_codes[self.index]]
+
+    @property
+    def title(self):
+        return _decode(self.batch._titles, self.batch._title_offsets, self.index)
+
+    @property
+    def permalink(self):
+        return _decode(self.batch._permalinks, self.batch._permalink_offsets, self.index)
+
+    @property
+    def url(self):
+        return REDDIT_URL + self.permalink
+
+    @property
+    def compound_score(self):
+        return float(self.batch.compound[self.index])
+
+    @property
+    def content_sentiment(self):
+        return str(sentiment.LABELS[self.batch.label_codes[self.index]])
+
+    @property
+    def created_utc(self):
+        return float(self.batch.created_utc[self.index])
+
+    @property
+    def date(self):
+        return datetime.utcfromtimestamp(self.created_utc).date()
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.KEYS else default
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.KEYS}
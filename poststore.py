@@ -0,0 +1,307 @@
+import os
+import re
+import html
+import json
+import sqlite3
+import threading
+from sentiment import POSITIVE_THRESHOLD, NEGATIVE_THRESHOLD, label as sentiment_label, label_codes
+
+#local post store so repeat searches dont redownload everything from reddit.
+#posts are keyed by reddit post id and hold the raw post + langdetect result + VADER scores,
+#post_tickers maps a ticker to the posts its searches returned and sync_state remembers how far each (ticker, subreddit) got,
+#window_sync lists every window that had its own sort=top backfill (so a capped wide backfill doesnt redo the narrow ones).
+#daily_rollups keeps per (ticker, subreddit, day) counts, compound sums/sums of squares and label tallies of the english scored posts,
+#updated as posts come in so a window's sentiment is a sum over a few rows instead of a scan over every post.
+#posts_fts is an FTS5 index over title + selftext (external content, kept in sync by triggers) for local full-text search.
+DB_PATH = os.getenv('STOCKA_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stocka.db'))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS posts (
+    id TEXT PRIMARY KEY,
+    subreddit TEXT NOT NULL,
+    created_utc REAL NOT NULL,
+    title TEXT,
+    permalink TEXT,
+    selftext TEXT,
+    raw TEXT,
+    is_english INTEGER,
+    neg REAL,
+    neu REAL,
+    pos REAL,
+    compound REAL
+);
+CREATE TABLE IF NOT EXISTS post_tickers (
+    ticker TEXT NOT NULL,
+    post_id TEXT NOT NULL,
+    subreddit TEXT NOT NULL,
+    created_utc REAL NOT NULL,
+    PRIMARY KEY (ticker, post_id)
+);
+CREATE INDEX IF NOT EXISTS idx_post_tickers_lookup ON post_tickers (ticker, subreddit, created_utc);
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    ticker TEXT NOT NULL,
+    subreddit TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    posts INTEGER NOT NULL,
+    compound_sum REAL NOT NULL,
+    compound_sq_sum REAL NOT NULL,
+    positive INTEGER NOT NULL,
+    neutral INTEGER NOT NULL,
+    negative INTEGER NOT NULL,
+    PRIMARY KEY (ticker, subreddit, day)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    ticker TEXT NOT NULL,
+    subreddit TEXT NOT NULL,
+    time_filter TEXT NOT NULL,
+    last_sync REAL NOT NULL,
+    PRIMARY KEY (ticker, subreddit)
+);
+CREATE TABLE IF NOT EXISTS window_sync (
+    ticker TEXT NOT NULL,
+    subreddit TEXT NOT NULL,
+    time_filter TEXT NOT NULL,
+    last_sync REAL NOT NULL,
+    PRIMARY KEY (ticker, subreddit, time_filter)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    title, selftext, content='posts', content_rowid='rowid', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts (rowid, title, selftext) VALUES (new.rowid, new.title, new.selftext);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, selftext) VALUES ('delete', old.rowid, old.title, old.selftext);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, selftext ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, selftext) VALUES ('delete', old.rowid, old.title, old.selftext);
+    INSERT INTO posts_fts (rowid, title, selftext) VALUES (new.rowid, new.title, new.selftext);
+END;
+'''
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+#one connection per thread (sqlite connections cant be shared across threads), schema created on first use.
+def get_connection():
+    connection = getattr(_local, 'connection', None)
+    if connection is None:
+        connection = sqlite3.connect(DB_PATH, timeout=30)
+        connection.row_factory = sqlite3.Row
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        with _schema_lock:
+            if DB_PATH not in _schema_ready:
+                had_index = connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'posts_fts'").fetchone() is not None
+                connection.executescript(SCHEMA)
+                if connection.execute('SELECT 1 FROM daily_rollups LIMIT 1').fetchone() is None:
+                    rebuild_rollups(connection) #stores created before the rollups existed
+                if not had_index:
+                    rebuild_search_index(connection) #stores created before the search index existed
+                _schema_ready.add(DB_PATH)
+        _local.connection = connection
+    return connection
+
+#(time_filter, last_sync) for a ticker/subreddit or None if it was never synced.
+def get_sync_state(ticker, subreddit):
+    row = get_connection().execute(
+        'SELECT time_filter, last_sync FROM sync_state WHERE ticker = ? AND subreddit = ?',
+        (ticker.upper(), subreddit.lower())).fetchone()
+    if row is None:
+        return None
+    return row['time_filter'], row['last_sync']
+
+def set_sync_state(ticker, subreddit, time_filter, last_sync):
+    connection = get_connection()
+    with connection:
+        connection.execute(
+            'INSERT OR REPLACE INTO sync_state (ticker, subreddit, time_filter, last_sync) VALUES (?, ?, ?, ?)',
+            (ticker.upper(), subreddit.lower(), time_filter, last_sync))
+
+#windows that already had their own sort=top backfill for a ticker/subreddit.
+def get_synced_windows(ticker, subreddit):
+    rows = get_connection().execute(
+        'SELECT time_filter FROM window_sync WHERE ticker = ? AND subreddit = ?',
+        (ticker.upper(), subreddit.lower())).fetchall()
+    return {row['time_filter'] for row in rows}
+
+def set_window_synced(ticker, subreddit, time_filter, last_sync):
+    connection = get_connection()
+    with connection:
+        connection.execute(
+            'INSERT OR REPLACE INTO window_sync (ticker, subreddit, time_filter, last_sync) VALUES (?, ?, ?, ?)',
+            (ticker.upper(), subreddit.lower(), time_filter, last_sync))
+
+#ids of the newest stored posts, the incremental sort=new fetch stops as soon as it sees one of these.
+def recent_post_ids(ticker, subreddit, limit=100):
+    rows = get_connection().execute(
+        'SELECT post_id FROM post_tickers WHERE ticker = ? AND subreddit = ? ORDER BY created_utc DESC LIMIT ?',
+        (ticker.upper(), subreddit.lower(), limit)).fetchall()
+    return {row['post_id'] for row in rows}
+
+SECONDS_PER_DAY = 86400
+
+ROLLUP_UPSERT = (
+    'INSERT INTO daily_rollups (ticker, subreddit, day, posts, compound_sum, compound_sq_sum, positive, neutral, negative) '
+    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+    'ON CONFLICT (ticker, subreddit, day) DO UPDATE SET posts = posts + excluded.posts, compound_sum = compound_sum + excluded.compound_sum, '
+    'compound_sq_sum = compound_sq_sum + excluded.compound_sq_sum, positive = positive + excluded.positive, '
+    'neutral = neutral + excluded.neutral, negative = negative + excluded.negative')
+
+#records are dicts with the posts columns (is_english/scores are None for posts that were never analyzed).
+#only mentions that are new for this ticker get added to the daily rollups so re-fetching a post never double counts it.
+def save_posts(ticker, records):
+    if not records:
+        return
+    ticker = ticker.upper()
+    connection = get_connection()
+    with connection:
+        connection.executemany(
+            'INSERT OR IGNORE INTO posts (id, subreddit, created_utc, title, permalink, selftext, raw, is_english, neg, neu, pos, compound) '
+            'VALUES (:id, :subreddit, :created_utc, :title, :permalink, :selftext, :raw, :is_english, :neg, :neu, :pos, :compound)',
+            [dict(record, subreddit=record['subreddit'].lower(), raw=json.dumps(record['raw'])) for record in records])
+        rollups = {}
+        for record in records:
+            inserted = connection.execute(
+                'INSERT OR IGNORE INTO post_tickers (ticker, post_id, subreddit, created_utc) VALUES (?, ?, ?, ?)',
+                (ticker, record['id'], record['subreddit'].lower(), record['created_utc'])).rowcount
+            if not inserted or not record['is_english'] or record['compound'] is None:
+                continue
+            compound = record['compound']
+            key = (record['subreddit'].lower(), int(record['created_utc'] // SECONDS_PER_DAY))
+            row = rollups.setdefault(key, [0, 0.0, 0.0, 0, 0, 0])
+            row[0] += 1
+            row[1] += compound
+            row[2] += compound * compound
+            row[5 - int(label_codes(compound))] += 1 #positive, neutral, negative columns
+        connection.executemany(ROLLUP_UPSERT, [(ticker, subreddit, day, *row) for (subreddit, day), row in rollups.items()])
+
+#recompute every rollup from the stored posts.
+def rebuild_rollups(connection=None):
+    connection = connection or get_connection()
+    with connection:
+        connection.execute('DELETE FROM daily_rollups')
+        connection.execute(
+            'INSERT INTO daily_rollups (ticker, subreddit, day, posts, compound_sum, compound_sq_sum, positive, neutral, negative) '
+            'SELECT t.ticker, t.subreddit, CAST(t.created_utc / 86400 AS INTEGER), COUNT(*), SUM(p.compound), SUM(p.compound * p.compound), '
+            'SUM(p.compound > ?), SUM(p.compound BETWEEN ? AND ?), SUM(p.compound < ?) '
+            'FROM post_tickers t JOIN posts p ON p.id = t.post_id WHERE p.is_english = 1 AND p.compound IS NOT NULL '
+            'GROUP BY t.ticker, t.subreddit, CAST(t.created_utc / 86400 AS INTEGER)',
+            (POSITIVE_THRESHOLD, NEGATIVE_THRESHOLD, POSITIVE_THRESHOLD, NEGATIVE_THRESHOLD))
+
+#WHERE clause for the rollup queries
+def _rollup_filter(ticker, subreddits, since_utc):
+    query = ' WHERE ticker = ?'
+    params = [ticker.upper()]
+    if subreddits:
+        subreddits = [subreddit.lower() for subreddit in subreddits]
+        query += f' AND subreddit IN ({",".join("?" * len(subreddits))})'
+        params += subreddits
+    if since_utc is not None:
+        query += ' AND day >= ?'
+        params.append(int(since_utc // SECONDS_PER_DAY))
+    return query, params
+
+#sentiment for any window from the rollups: post count, mean, variance, label tallies and overall label.
+def window_sentiment(ticker, subreddits=None, since_utc=None):
+    where, params = _rollup_filter(ticker, subreddits, since_utc)
+    row = get_connection().execute(
+        'SELECT SUM(posts) AS posts, SUM(compound_sum) AS compound_sum, SUM(compound_sq_sum) AS compound_sq_sum, '
+        'SUM(positive) AS positive, SUM(neutral) AS neutral, SUM(negative) AS negative FROM daily_rollups' + where, params).fetchone()
+    posts = row['posts'] or 0
+    if not posts:
+        return {'posts': 0, 'mean': None, 'variance': None, 'label': None, 'positive': 0, 'neutral': 0, 'negative': 0}
+    mean = row['compound_sum'] / posts
+    variance = max(row['compound_sq_sum'] / posts - mean * mean, 0.0)
+    return {'posts': posts, 'mean': round(mean, 4), 'variance': round(variance, 4), 'label': sentiment_label(mean),
+            'positive': row['positive'], 'neutral': row['neutral'], 'negative': row['negative']}
+
+#english posts with VADER scores for a ticker in the given subreddits, optionally only since a unix timestamp.
+#highest reddit score first (as stored when the post was fetched), the order of reddit's sort=top listings, newest first on ties.
+#with_text adds the selftext column (only needed by the relevance filter).
+def load_posts(ticker, subreddits, since_utc=None, with_text=False):
+    subreddits = [subreddit.lower() for subreddit in subreddits]
+    if not subreddits:
+        return []
+    query = ('SELECT p.id, p.subreddit, p.created_utc, p.title, p.permalink, p.neg, p.neu, p.pos, p.compound' + (', p.selftext ' if with_text else ' ') +
+             'FROM post_tickers t JOIN posts p ON p.id = t.post_id '
+             f'WHERE t.ticker = ? AND t.subreddit IN ({",".join("?" * len(subreddits))}) AND p.is_english = 1 AND p.compound IS NOT NULL')
+    params = [ticker.upper()] + subreddits
+    if since_utc is not None:
+        query += ' AND t.created_utc >= ?'
+        params.append(since_utc)
+    query += " ORDER BY json_extract(p.raw, '$.score') DESC, t.created_utc DESC"
+    return [dict(row) for row in get_connection().execute(query, params)]
+
+#per-day post count and compound sum for a ticker (all stored subreddits unless given), day = unix day number (created_utc // 86400).
+#read from the daily rollups.
+def daily_post_stats(ticker, subreddits=None, since_utc=None):
+    where, params = _rollup_filter(ticker, subreddits, since_utc)
+    query = ('SELECT day, SUM(posts) AS posts, SUM(compound_sum) AS compound_sum, SUM(compound_sq_sum) AS compound_sq_sum '
+             'FROM daily_rollups' + where + ' GROUP BY day ORDER BY day')
+    return [dict(row) for row in get_connection().execute(query, params)]
+
+#reindex every stored post (after a VACUUM, which may renumber the posts rowids the index points at).
+def rebuild_search_index(connection=None):
+    connection = connection or get_connection()
+    with connection:
+        connection.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+
+SEARCH_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+SNIPPET_START, SNIPPET_END = '\x02', '\x03' #placeholders, swapped for <mark> after the snippet is html escaped
+SENTIMENT_FILTERS = {
+    'positive': ('p.compound > ?', (POSITIVE_THRESHOLD,)),
+    'negative': ('p.compound < ?', (NEGATIVE_THRESHOLD,)),
+    'neutral': ('p.compound BETWEEN ? AND ?', (NEGATIVE_THRESHOLD, POSITIVE_THRESHOLD)),
+}
+
+#free text -> FTS5 query: every word (or "quoted phrase") has to match, user input never reaches the FTS5 syntax.
+def fts_query(text):
+    terms = []
+    for phrase, word in SEARCH_TERM_RE.findall(text or ''):
+        term = phrase or word
+        if re.search(r'\w', term):
+            terms.append('"' + term.replace('"', '""') + '"')
+    return ' '.join(terms)
+
+#ranked (bm25, title matches weigh more) stored posts matching a free text query, optionally only ones stored for a ticker,
+#from some subreddits, in a time range or with a sentiment label ('positive' / 'neutral' / 'negative').
+#every result carries an html snippet with the matched terms in <mark>.
+def search_posts(text, ticker=None, subreddits=None, since_utc=None, until_utc=None, sentiment=None, limit=20, offset=0):
+    query = fts_query(text)
+    if not query:
+        return []
+    sql = ('SELECT p.id, p.subreddit, p.created_utc, p.title, p.permalink, p.compound, '
+           f"snippet(posts_fts, -1, '{SNIPPET_START}', '{SNIPPET_END}', '…', 24) AS snippet, bm25(posts_fts, 4.0, 1.0) AS rank "
+           'FROM posts_fts JOIN posts p ON p.rowid = posts_fts.rowid '
+           'WHERE posts_fts MATCH ?')
+    params = [query]
+    if ticker:
+        sql += ' AND p.id IN (SELECT post_id FROM post_tickers WHERE ticker = ?)'
+        params.append(ticker.upper())
+    if subreddits:
+        subreddits = [subreddit.lower() for subreddit in subreddits]
+        sql += f' AND p.subreddit IN ({",".join("?" * len(subreddits))})'
+        params += subreddits
+    if since_utc is not None:
+        sql += ' AND p.created_utc >= ?'
+        params.append(since_utc)
+    if until_utc is not None:
+        sql += ' AND p.created_utc < ?'
+        params.append(until_utc)
+    if sentiment:
+        #only english posts with 50+ words are scored, a sentiment filter narrows the search to those
+        condition, values = SENTIMENT_FILTERS[sentiment]
+        sql += ' AND p.is_english = 1 AND p.compound IS NOT NULL AND ' + condition
+        params += values
+    sql += ' ORDER BY rank LIMIT ? OFFSET ?'
+    params += [limit, offset]
+    results = []
+    for row in get_connection().execute(sql, params):
+        result = dict(row)
+        result['snippet'] = html.escape(result['snippet'] or '').replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>')
+        #none when never scored (too short or not english)
+        result['label'] = None if result['compound'] is None else sentiment_label(result['compound'])
+        results.append(result)
+    return results
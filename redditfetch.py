@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from requests.adapters import HTTPAdapter
+import instrument
+
+headers = {'User-Agent': 'Mozilla/5.0 (compatible; Bot/0.1)'} #so reDdit doesnt blocp for scraping MORE: (https://deviceatlas.com/blog/list-of-user-agent-strings).
+
+REDDIT_BASE_URL = os.getenv('STOCKA_REDDIT_BASE_URL', 'https://www.reddit.com').rstrip('/') #the benchmark points this at its fixture server
+MAX_WORKERS = 8 #subreddits fetched at the same time, the limiter below is what actually bounds the request rate.
+
+#token bucket shared by every fetch thread. starts at ~1 request/sec (same pace as the old fixed sleeps)
+#and then follows what reddit tells us in the X-Ratelimit-* headers.
+class TokenBucket:
+    def __init__(self, rate=1.0, capacity=5):
+        self.rate = rate #tokens per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    #block until a token is free then take it.
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    #X-Ratelimit-Remaining = requests left in this window, X-Ratelimit-Reset = seconds until the window resets.
+    def update_from_headers(self, response_headers):
+        try:
+            remaining = float(response_headers['X-Ratelimit-Remaining'])
+            reset = float(response_headers['X-Ratelimit-Reset'])
+        except (KeyError, TypeError, ValueError):
+            return
+        with self.lock:
+            self._refill()
+            if remaining < 1:
+                #out of budget, nothing goes out until the window resets.
+                self.tokens = min(self.tokens, 0) - self.rate * reset
+            else:
+                #spread what is left evenly over the rest of the window.
+                self.rate = max(remaining / max(reset, 1.0), 0.01)
+                self.tokens = min(self.tokens, remaining)
+
+LIMITER = TokenBucket()
+
+#raised instead of quietly returning what was fetched so far when a caller asks for raise_errors (the ingest daemon backs off on it).
+class RedditUnavailable(Exception):
+    pass
+
+#one pooled session for every request so connections to reddit get reused.
+SESSION = requests.Session()
+SESSION.headers.update(headers)
+SESSION.mount('https://', HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS))
+
+#what fetch_pages returns: the posts (a plain list otherwise) plus how paging ended.
+#ok is False when a request failed and paging stopped early, reached_end is True when the listing ran out
+#or stop() hit, i.e. nothing was cut off by an error or by max_results.
+class Listing(list):
+    def __init__(self, posts=(), ok=True, reached_end=False):
+        super().__init__(posts)
+        self.ok = ok
+        self.reached_end = reached_end
+
+    #fetched all the way without an error
+    @property
+    def complete(self):
+        return self.ok and self.reached_end
+
+#page through a reddit listing/search until it runs out, max_results is hit or stop(child) says so (that child is not kept).
+#a failed request ends paging early (Listing.ok is False), with raise_errors it raises RedditUnavailable instead.
+def fetch_pages(base_url, params, max_results=1000, per_page=100, stop=None, raise_errors=False):
+    all_posts = []
+    ok = True
+    reached_end = False
+    after = None
+    while True:
+        page_params = dict(params, limit=per_page)
+        if after:
+            page_params["after"] = after
+        try:
+            waited = time.perf_counter()
+            LIMITER.acquire()            #prevent rate-limiting by Reddit stay stealthy.
+            instrument.RATELIMIT_WAIT.inc(time.perf_counter() - waited)
+            started = time.perf_counter()
+            try:
+                response = SESSION.get(base_url, params=page_params, timeout=30)
+            except Exception:
+                instrument.record_http('reddit', time.perf_counter() - started, 'error')
+                raise
+            instrument.record_http('reddit', time.perf_counter() - started, response.status_code, len(response.content))
+            LIMITER.update_from_headers(response.headers)
+            if response.status_code != 200:
+                if raise_errors:
+                    raise RedditUnavailable(f"{base_url} returned {response.status_code}")
+                ok = False
+                break
+            data = response.json().get("data", {})
+            children = data.get("children", [])
+            if not children:
+                reached_end = True
+                break
+            if stop:
+                stop_at = next((i for i, child in enumerate(children) if stop(child)), None)
+                if stop_at is not None:
+                    all_posts.extend(children[:stop_at])
+                    reached_end = True
+                    break
+            all_posts.extend(children)
+            if len(all_posts) >= max_results:
+                break
+            after = data.get("after")
+            if not after:
+                reached_end = True
+                break
+        except RedditUnavailable:
+            raise
+        except Exception as e:
+            if raise_errors:
+                raise RedditUnavailable(f"{base_url}: {e}") from e
+            ok = False
+            break
+    return Listing(all_posts[:max_results], ok, reached_end)
+
+#get posts from a specific subreddit based on the stock ticker and time filter
+#stop_ids: ids we already have, paging stops at the first one of them (used with sort="new" for incremental refreshes).
+def fetch_reddit_posts(stock, subreddit, time_filter="all", sort="top", max_results=1000, per_page=100, stop_ids=None):
+    base_url = f"{REDDIT_BASE_URL}/r/{subreddit}/search.json" #look up subreddit by name,
+    params = {"q": stock, "restrict_sr": "true", "sort": sort, "t": time_filter}
+    stop = (lambda child: child.get('data', {}).get('id') in stop_ids) if stop_ids else None
+    return fetch_pages(base_url, params, max_results, per_page, stop)
+
+#every new post in a subreddit (no search), newest first, back to since_utc or the first known id.
+#used by the batch scanner: one crawl per subreddit no matter how many tickers are watched.
+def fetch_subreddit_listing(subreddit, since_utc=None, max_results=1000, per_page=100, stop_ids=None, raise_errors=False):
+    base_url = f"{REDDIT_BASE_URL}/r/{subreddit}/new.json"
+    def stop(child):
+        post_data = child.get('data', {})
+        if stop_ids and post_data.get('id') in stop_ids:
+            return True
+        return since_utc is not None and post_data.get('created_utc', 0) < since_utc
+    return fetch_pages(base_url, {}, max_results, per_page, stop, raise_errors)
+
+#run several fetch_reddit_posts (or `fetch`) calls concurrently, jobs = {key: fetch kwargs}, the key is usually the subreddit.
+#yields (key, raw_posts) as each one finishes. follow_up(key, raw_posts) may return more {key: fetch kwargs},
+#those are queued on the same pool (and yielded the same way) before the finished result is handed out.
+def iter_fetch_jobs(jobs, fetch=fetch_reddit_posts, follow_up=None):
+    if not jobs:
+        return
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS if follow_up else min(MAX_WORKERS, len(jobs))) as pool:
+        pending = {}
+        def submit(more):
+            for key, kwargs in more.items():
+                pending[pool.submit(instrument.follow(fetch), **kwargs)] = key
+        submit(jobs)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                result = future.result()
+                if follow_up:
+                    submit(follow_up(key, result))
+                yield key, result
@@ -0,0 +1,81 @@
+import os
+import re
+import threading
+from ttlcache import TTLCache
+
+#zero-shot "is this post about the stock" filter for the web app and OGconsoleScraper (same model/labels as the original console check):
+#a cashtag/mention prefilter settles the obvious posts, the rest go through the pipeline in batches,
+#inputs are cut to a token budget, it runs on CPU with a fixed thread count and verdicts are cached per (post id, ticker).
+#off unless STOCKA_RELEVANCE=1.
+
+ENABLED = os.getenv('STOCKA_RELEVANCE', '0') == '1'
+MODEL = os.getenv('STOCKA_RELEVANCE_MODEL', 'facebook/bart-large-mnli')
+THREADS = int(os.getenv('STOCKA_RELEVANCE_THREADS', '2')) #torch threads, keep it low so the web workers still get CPU
+BATCH_SIZE = int(os.getenv('STOCKA_RELEVANCE_BATCH', '8'))
+TOKEN_BUDGET = int(os.getenv('STOCKA_RELEVANCE_TOKENS', '256')) #only the start of a post is classified
+MIN_MENTIONS = 3 #this many uppercase ticker mentions counts as relevant without asking the model
+
+_classifier = None
+_classifier_lock = threading.Lock()
+_verdicts = TTLCache(maxsize=100000, ttl=None) #(post id, ticker) -> bool
+
+#loaded on first use, not at import.
+def get_classifier():
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            import torch
+            from transformers import pipeline
+            torch.set_num_threads(THREADS)
+            _classifier = pipeline("zero-shot-classification", model=MODEL, device=-1)
+        return _classifier
+
+def relevance_labels(stock):
+    return [f"related to {stock} stock analysis", "not related to stock analysis"]
+
+#True when the post obviously talks about the ticker ($TSLA or several TSLA mentions), None when the model has to decide.
+def prefilter(content, stock):
+    stock = re.escape(stock.upper())
+    if re.search(rf'\${stock}\b', content, re.IGNORECASE):
+        return True
+    if len(re.findall(rf'\b{stock}\b', content)) >= MIN_MENTIONS:
+        return True
+    return None
+
+#cut text down to the token budget (cheap char cut first so the tokenizer never sees a whole wall of text).
+def truncate(text, tokenizer):
+    text = text[:TOKEN_BUDGET * 8]
+    ids = tokenizer(text, truncation=True, max_length=TOKEN_BUDGET, add_special_tokens=False)['input_ids']
+    return tokenizer.decode(ids, skip_special_tokens=True)
+
+#posts = [(post_id, content)], returns {post_id: bool}.
+def classify_posts(posts, stock):
+    stock = stock.upper()
+    verdicts = {}
+    ambiguous = []
+    for post_id, content in posts:
+        cached = _verdicts.get((post_id, stock))
+        if cached is None:
+            cached = prefilter(content, stock)
+            if cached is not None:
+                _verdicts.set((post_id, stock), cached)
+        if cached is None:
+            ambiguous.append((post_id, content))
+        else:
+            verdicts[post_id] = cached
+    if ambiguous:
+        classifier = get_classifier()
+        labels = relevance_labels(stock)
+        texts = [truncate(content, classifier.tokenizer) for _, content in ambiguous]
+        results = classifier(texts, candidate_labels=labels, batch_size=BATCH_SIZE)
+        if isinstance(results, dict):
+            results = [results]
+        for (post_id, _), result in zip(ambiguous, results):
+            verdict = result["labels"][0] == labels[0]
+            _verdicts.set((post_id, stock), verdict)
+            verdicts[post_id] = verdict
+    return verdicts
+
+#single post version (OGconsoleScraper)
+def is_relevant(content, stock, post_id=None):
+    return classify_posts([(post_id if post_id is not None else content, content)], stock).popitem()[1]
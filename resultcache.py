@@ -0,0 +1,125 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import instrument
+
+#whole /home results (posts, metrics, overall label, plot keys) cached on disk under the normalized query
+#(ticker, sorted lowercase subreddits, time_filter), in one sqlite file every gunicorn worker on the box shares.
+#an entry is fresh for the window's TTL, after that it is still served right away (stale) for up to MAX_STALE while one
+#worker refreshes it in the background. rendered plot PNGs are stored here too so a result cached by one worker can
+#have its /plots/<key>.png served by any other.
+CACHE_PATH = os.getenv('STOCKA_RESULT_CACHE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultcache.db'))
+ENABLED = os.getenv('STOCKA_RESULT_CACHE_ENABLED', '1') == '1'
+
+#seconds a result stays fresh, short windows move fastest
+TTLS = {'day': 120, 'week': 600, 'month': 1800, 'year': 6 * 3600, 'all': 12 * 3600}
+DEFAULT_TTL = 600
+MAX_STALE = 24 * 3600 #stale results older than fresh + this are dropped instead of served
+REFRESH_LEASE = 300 #one worker refreshes a stale entry, the others keep serving it until this runs out
+PLOT_MAX_AGE = 3 * 86400
+PRUNE_INTERVAL = 600
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    payload BLOB NOT NULL,
+    fresh_until REAL NOT NULL,
+    stale_until REAL NOT NULL,
+    refreshing_until REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS plots (
+    key TEXT PRIMARY KEY,
+    png BLOB NOT NULL,
+    created REAL NOT NULL
+);
+'''
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+_last_prune = 0.0
+
+#one connection per thread, schema created on first use (same setup as the post store).
+def get_connection():
+    connection = getattr(_local, 'connection', None)
+    if connection is None:
+        connection = sqlite3.connect(CACHE_PATH, timeout=30)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        with _schema_lock:
+            if CACHE_PATH not in _schema_ready:
+                connection.executescript(SCHEMA)
+                _schema_ready.add(CACHE_PATH)
+        _local.connection = connection
+    return connection
+
+def result_key(stock, subreddits, time_filter):
+    return '|'.join([stock.strip().upper(), ','.join(sorted({subreddit.strip().lower() for subreddit in subreddits})), time_filter.strip().lower()])
+
+#(result, fresh) for a query or None. expired entries count as a miss.
+def get_result(stock, subreddits, time_filter, now=None):
+    if not ENABLED:
+        return None
+    now = now or time.time()
+    row = get_connection().execute('SELECT payload, fresh_until, stale_until FROM results WHERE key = ?',
+                                   (result_key(stock, subreddits, time_filter),)).fetchone()
+    if row is None or row[2] < now:
+        instrument.cache_result('results', 'miss')
+        return None
+    fresh = row[1] >= now
+    instrument.cache_result('results', 'hit' if fresh else 'stale')
+    return pickle.loads(row[0]), fresh
+
+def put_result(stock, subreddits, time_filter, result, now=None):
+    if not ENABLED:
+        return
+    now = now or time.time()
+    fresh_until = now + TTLS.get(time_filter, DEFAULT_TTL)
+    connection = get_connection()
+    with connection:
+        connection.execute('INSERT OR REPLACE INTO results (key, payload, fresh_until, stale_until, refreshing_until) VALUES (?, ?, ?, ?, 0)',
+                           (result_key(stock, subreddits, time_filter), pickle.dumps(result, pickle.HIGHEST_PROTOCOL),
+                            fresh_until, fresh_until + MAX_STALE))
+    prune(now)
+
+#True for exactly one caller (across all workers) per stale entry and lease, that caller runs the refresh.
+def claim_refresh(stock, subreddits, time_filter, now=None):
+    now = now or time.time()
+    connection = get_connection()
+    with connection:
+        claimed = connection.execute('UPDATE results SET refreshing_until = ? WHERE key = ? AND refreshing_until < ?',
+                                     (now + REFRESH_LEASE, result_key(stock, subreddits, time_filter), now)).rowcount
+    return bool(claimed)
+
+def get_plot(key):
+    if not ENABLED:
+        return None
+    row = get_connection().execute('SELECT png FROM plots WHERE key = ?', (key,)).fetchone()
+    return row[0] if row else None
+
+def put_plot(key, png_bytes):
+    if not ENABLED:
+        return
+    connection = get_connection()
+    with connection:
+        connection.execute('INSERT OR REPLACE INTO plots (key, png, created) VALUES (?, ?, ?)', (key, png_bytes, time.time()))
+
+#drop results past their stale limit and old plots, at most every PRUNE_INTERVAL per process.
+def prune(now=None):
+    global _last_prune
+    now = now or time.time()
+    if now - _last_prune < PRUNE_INTERVAL:
+        return
+    _last_prune = now
+    connection = get_connection()
+    with connection:
+        connection.execute('DELETE FROM results WHERE stale_until < ?', (now,))
+        connection.execute('DELETE FROM plots WHERE created < ?', (now - PLOT_MAX_AGE,))
+
+def clear():
+    connection = get_connection()
+    with connection:
+        connection.execute('DELETE FROM results')
+        connection.execute('DELETE FROM plots')
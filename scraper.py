@@ -1,146 +1,185 @@
 import os
-import requests
-import yfinance as yf
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-import nltk
 import time
-from langdetect import detect
-import pandas as pd
-from collections import defaultdict
-from datetime import datetime, timedelta
-
-nltk.download('vader_lexicon')#download vader for sent analysis.
-VADER = SentimentIntensityAnalyzer()#sent analy sis.
+from langfilter import is_english #only english, fast heuristic first then langdetect for ambiguous posts.
+from redditfetch import iter_fetch_jobs
+from marketdata import get_stock_metrics, is_valid_ticker
+import sentiment
+import relevance
+import instrument
+from poststore import get_sync_state, set_sync_state, get_synced_windows, set_window_synced, recent_post_ids, save_posts, load_posts
+from postbatch import PostBatch
 
 TIME_FILTER_MAPPING = {'day': '5d','week': '5d','month': '1mo','year': '1y','all': 'max'}
-headers = {'User-Agent': 'Mozilla/5.0 (compatible; Bot/0.1)'} #so reDdit doesnt blocp for scraping MORE: (https://deviceatlas.com/blog/list-of-user-agent-strings).
-
-        #       get stock metrics + average daily change + last close value
-def get_stock_metrics(ticker, period='3mo'):
-    df_today = yf.download(ticker, period='1d', interval='1d', progress=False)
-    if df_today.empty:
-        current_total_volume = 0
-        stock_price_today = 0.0
-    else:
-        current_total_volume = int(df_today['Volume'].iloc[-1].item())   #SINGLE ELEMENT SERIES
-        stock_price_today = float(df_today['Close'].iloc[-1].item())
-
-    today = datetime.now().date()
-    target_date = today - timedelta(days=31)
-    df_past = yf.download(ticker, start=(target_date - timedelta(days=1)).strftime('%Y-%m-%d'), end=(today + timedelta(days=1)).strftime('%Y-%m-%d'), interval='1d', progress=False)
-
-    if df_past.empty:
-        close_past = 0.0
-        volume_past = 0.0
-    else:
-        df_past_filtered = df_past[df_past.index.date <= target_date]
-        if df_past_filtered.empty:
-            close_past = 0.0
-            volume_past = 0.0
-        else:
-            closest_date = df_past_filtered.index.max()
-            close_past = float(df_past['Close'].loc[closest_date].item())
-            volume_past = float(df_past['Volume'].loc[closest_date].item())
-
-    if close_past != 0:
-        stock_price_change_pct = ((stock_price_today - close_past) / close_past) * 100.0
-    else:
-        stock_price_change_pct = 0.0
-
-    if volume_past != 0:
-        volume_change_pct = ((current_total_volume - volume_past) / volume_past) * 100.0
-    else:
-        volume_change_pct = 0.0
-
-    df_period = yf.download(ticker, period=period, interval='1d', progress=False)
-    if df_period.empty or len(df_period) < 2:
-        avg_daily_change = 0.0
-    else:
-        avg_daily_change = df_period['Close'].pct_change().mean() * 100.0
-    return {
-        'avg_daily_change': round(avg_daily_change, 2), 'stock_price': round(stock_price_today, 2), 'current_total_volume': current_total_volume, 'volume_change_pct': round(volume_change_pct, 2), 'stock_price_change_pct': round(stock_price_change_pct, 2)
-    }
-
-#       func to check if user entered ticker symbol is valid using yfin API
-def is_valid_ticker(ticker):
-    try:
-        stock = yf.Ticker(ticker.upper())
-        symbol = stock.info.get('symbol', '')
-        if symbol and symbol.upper() == ticker.upper():
-            return True
-    except Exception as e:
-        # Log the error if needed: print(f"Error validating ticker {ticker}: {e}")
-        return False
-    return False
 
 #VADER sentiment (neg, neu, pos, compound) and conver tthat to either POSITIVE, NEGATIVE, NEUTRAL.
 def label_sentiment(compound_score):
-    if compound_score > 0.5:
-        return "POSITIVE"
-    elif compound_score < -0.5:
-        return "NEGATIVE"
-    else:
-        return "NEUTRAL"
-
-#get posts from a specific subreddit based on the stock ticker and time filter
-def fetch_reddit_posts(stock, subreddit, time_filter="all", sort="top", max_results=1000, per_page=100):
-    base_url = f"https://www.reddit.com/r/{subreddit}/search.json" #look up subreddit by name,  
-    all_posts = []
-    after = None
-    while True:
-        params = {"q": stock, "restrict_sr": "true", "sort": sort, "t": time_filter,"limit": per_page,}
-        if after:
-            params["after"] = after
-        try:
-            response = requests.get(base_url, headers=headers, params=params)
-            if response.status_code != 200:
-                break
-            data = response.json().get("data", {})
-            children = data.get("children", [])
-            if not children:
-                break
-            all_posts.extend(children)
-            if len(all_posts) >= max_results:
-                break
-            after = data.get("after")
-            if not after:
-                break
-            time.sleep(1.0)            #prevent rate-limiting by Reddit stay stealthy.
-        except:
-            break
-    return all_posts[:max_results]
-
-#only english via langdetect lib.
-def is_english(content):
-    try:
-        return detect(content) == "en"
-    except:
-        return False
-
-#dupe post remover.
+    return sentiment.label(compound_score)
+
+#dupe post remover (first post per url).
 def remove_dupes(posts):
-    unique_urls = set()
-    unique_posts = []
-    for post in posts:
-        post_url = post.get('url')
-        if post_url and post_url not in unique_urls:
-            unique_urls.add(post_url)
-            unique_posts.append(post)
-    return unique_posts
+    return posts.unique_urls()
 
-#post scraper
-def scrape_posts(stock, time_filter, subreddits, period):
-    #validate time_filter
-    if time_filter not in ["day", "week", "month", "year", "all"]:
-        return [], {}, None
-    period = TIME_FILTER_MAPPING.get(time_filter, '1mo')
-    if not is_valid_ticker(stock):
-        return [], {}, None
-    metrics = get_stock_metrics(stock, period=period)
-    if not metrics:
-        return [], {}, None
-    posts_data = []
-    all_compounds = []
+#seconds covered by each reddit time filter, 'all' has no cutoff.
+TIME_FILTER_ORDER = ['day', 'week', 'month', 'year', 'all']
+TIME_FILTER_SECONDS = {'day': 86400, 'week': 7 * 86400, 'month': 31 * 86400, 'year': 366 * 86400}
+
+#widest of the requested windows so one fetch covers every one of them.
+def widest_time_filter(time_filters):
+    return max(time_filters, key=TIME_FILTER_ORDER.index)
+
+#narrow an already scraped PostBatch down to a smaller window using its created_utc column.
+def filter_posts_by_window(posts_data, time_filter, now=None):
+    if time_filter == 'all':
+        return posts_data
+    cutoff = (now if now is not None else time.time()) - TIME_FILTER_SECONDS[time_filter]
+    return posts_data.since(cutoff)
+
+#overall label from the mean compound of a set of posts.
+def overall_sentiment(posts_data):
+    return posts_data.overall_label()
+
+#mean compound + label per subreddit for a set of posts.
+def subreddit_sentiment(posts_data):
+    return posts_data.subreddit_breakdown()
+
+INGEST_ONLY = os.getenv('STOCKA_INGEST_ONLY') == '1' #ingest.py keeps the store filled, the web tier never calls reddit itself.
+STORE_REFRESH_SECONDS = 60 #a (ticker, subreddit) synced less than this long ago is served straight from the post store.
+
+#langdetect for one subreddit's raw reddit posts, returns post store records (VADER scores get filled in by score_records).
+#posts that are too short keep is_english/scores as None so they are stored but never shown.
+def analyze_raw_posts(subreddit, raw_posts):
+    records = []
+    for rp in raw_posts:
+        post_data = rp.get('data', {})
+        if not post_data.get('id'):
+            continue
+        content = post_data.get('selftext', 'No Content')
+        record = {'id': post_data['id'], 'subreddit': subreddit, 'created_utc': post_data.get('created_utc', 0),
+                  'title': post_data.get('title', 'No Title'), 'permalink': post_data.get('permalink', ''), 'selftext': content,
+                  'raw': post_data, 'is_english': None, 'neg': None, 'neu': None, 'pos': None, 'compound': None}
+        #skip any posts with not enough content or non-English text
+        if content != 'No Content' and len(content.split()) >= 50:
+            record['is_english'] = int(is_english(content, post_data['id']))
+        records.append(record)
+    instrument.count_posts('fetched', len(records))
+    instrument.count_posts('too_short', sum(1 for record in records if record['is_english'] is None))
+    instrument.count_posts('non_english', sum(1 for record in records if record['is_english'] == 0))
+    instrument.count_posts('english', sum(1 for record in records if record['is_english']))
+    return records
+
+#VADER sentiment (neg, neu, pos, compound) for every english record in one batch (process pool for big batches).
+def score_records(records):
+    to_score = [record for record in records if record['is_english']]
+    scores = sentiment.score_texts(record['selftext'] for record in to_score)
+    for record, row in zip(to_score, scores.tolist()):
+        record.update(zip(sentiment.SCORE_KEYS, row))
+    return records
+
+#work out which subreddits need reddit at all: first time a (ticker, subreddit) or a wider window is seen
+#it is backfilled with sort=top like before, after that only posts newer than the last sync are fetched (sort=new, stops at the first known id).
+#returns (fetch jobs, previous sync states). in ingest only mode there are never any jobs.
+def plan_sync(stock, time_filter, subreddits, now):
+    jobs = {}
+    states = {}
+    for subreddit in subreddits:
+        state = get_sync_state(stock, subreddit)
+        states[subreddit] = state
+        if INGEST_ONLY:
+            continue
+        if state and TIME_FILTER_ORDER.index(state[0]) >= TIME_FILTER_ORDER.index(time_filter):
+            if now - state[1] < STORE_REFRESH_SECONDS:
+                continue
+            jobs[subreddit] = {'stock': stock, 'subreddit': subreddit, 'time_filter': 'all', 'sort': 'new', 'max_results': 1000, 'per_page': 100, 'stop_ids': recent_post_ids(stock, subreddit)}
+        else:
+            jobs[subreddit] = {'stock': stock, 'subreddit': subreddit, 'time_filter': time_filter, 'sort': 'top', 'max_results': 1000, 'per_page': 100}
+    return jobs, states
+
+def mark_synced(stock, time_filter, subreddit, state, now):
+    covered = widest_time_filter([state[0], time_filter]) if state else time_filter
+    set_sync_state(stock, subreddit, covered, now)
+
+#a wide sort=top backfill that hit max_results only holds the top posts of the wide window, a narrower window cut out of it
+#would show fewer (and different) posts than its own query. for those subreddits every narrower requested window gets
+#its own sort=top query, the same one the per window search used to make, unless that window was already backfilled
+#(synced = windows from get_synced_windows / the previous sync state). jobs are keyed (subreddit, window).
+def capped_window_jobs(subreddit, job, raw_posts, windows, synced=()):
+    if job['sort'] != 'top' or not raw_posts.ok or raw_posts.reached_end:
+        return {}
+    return {(subreddit, window): dict(job, time_filter=window) for window in set(windows) - set(synced)
+            if TIME_FILTER_ORDER.index(window) < TIME_FILTER_ORDER.index(job['time_filter'])}
+
+#iter_fetch_jobs follow_up: a capped wide backfill queues its narrow window jobs on the same pool.
+def narrow_follow_up(stock, jobs, states, windows):
+    def follow_up(key, raw_posts):
+        if isinstance(key, tuple):
+            return {}
+        synced = get_synced_windows(stock, key) | ({states[key][0]} if states[key] else set())
+        return capped_window_jobs(key, jobs[key], raw_posts, windows, synced)
+    return follow_up
+
+#langdetect + VADER + store for [(subreddit, raw_posts)], a post fetched by several queries is analyzed once.
+def store_fetched(stock, fetched):
+    with instrument.stage('language_filter'):
+        records = list({record['id']: record for subreddit, raw_posts in fetched for record in analyze_raw_posts(subreddit, raw_posts)}.values())
+    with instrument.stage('vader'):
+        score_records(records)
+    with instrument.stage('store'):
+        save_posts(stock, records)
+
+#store [(key, raw_posts)] from the wide (key = subreddit) and narrow (key = (subreddit, window)) jobs, then record what synced.
+#a fetch that failed partway is not recorded, the next search retries the same backfill.
+def store_synced(stock, time_filter, jobs, states, fetched, now):
+    store_fetched(stock, [(key[0] if isinstance(key, tuple) else key, raw_posts) for key, raw_posts in fetched])
+    for key, raw_posts in fetched:
+        if not raw_posts.ok:
+            continue
+        if isinstance(key, tuple):
+            set_window_synced(stock, key[0], key[1], now)
+            continue
+        mark_synced(stock, time_filter, key, states[key], now)
+        if jobs[key]['sort'] == 'top':
+            set_window_synced(stock, key, jobs[key]['time_filter'], now)
+
+#bring the post store up to date for every subreddit. windows = the narrower windows the caller will show (see capped_window_jobs).
+def sync_posts(stock, time_filter, subreddits, windows=()):
+    now = time.time()
+    with instrument.stage('plan_sync'):
+        jobs, states = plan_sync(stock, time_filter, subreddits, now)
+    #every subreddit (and any narrow window job) is fetched concurrently (rate limited in redditfetch), then all new posts are scored as one batch.
+    with instrument.stage('reddit_fetch'):
+        fetched = list(iter_fetch_jobs(jobs, follow_up=narrow_follow_up(stock, jobs, states, windows)))
+    store_synced(stock, time_filter, jobs, states, fetched, now)
+
+#streaming version of sync_posts, yields each subreddit as soon as its posts are in the store
+#(already fresh ones first, the rest in the order their fetches finish, a capped one once its narrow window jobs are in too).
+def iter_sync_posts(stock, time_filter, subreddits, windows=()):
+    now = time.time()
+    with instrument.stage('plan_sync'):
+        jobs, states = plan_sync(stock, time_filter, subreddits, now)
+    for subreddit in subreddits:
+        if subreddit not in jobs:
+            yield subreddit
+    narrow_jobs = narrow_follow_up(stock, jobs, states, windows)
+    waiting = {}
+    fetched = {subreddit: [] for subreddit in jobs}
+    def follow_up(key, raw_posts):
+        more = narrow_jobs(key, raw_posts)
+        if not isinstance(key, tuple):
+            waiting[key] = len(more)
+        return more
+    for key, raw_posts in iter_fetch_jobs(jobs, follow_up=follow_up):
+        subreddit = key[0] if isinstance(key, tuple) else key
+        fetched[subreddit].append((key, raw_posts))
+        if isinstance(key, tuple):
+            waiting[subreddit] -= 1
+        if waiting[subreddit]:
+            continue
+        store_synced(stock, time_filter, jobs, states, fetched.pop(subreddit), now)
+        yield subreddit
+
+#fetch + filter + VADER for every subreddit over one time window, no ticker validation or metrics here.
+#windows: narrower windows that will be carved out of the result (fetched on their own where the wide one was capped).
+def collect_posts(stock, time_filter, subreddits, windows=()):
 
     #relevancy to specified stock can also modify this to look for due diligence specifically on reddit (prob a better idea tbh.)  USE TRANSFORMERS INSTEAD OF OPENAI API
     #def is_relevant(content, stock):
@@ -165,34 +204,79 @@ def scrape_posts(stock, time_filter, subreddits, period):
     #             ],
     #             stream=True,
     
-    for subreddit in subreddits:
-        raw_posts = fetch_reddit_posts(stock, subreddit, time_filter, "top", 1000, 100)
-        for rp in raw_posts:
-            post_data = rp.get('data', {})
-            title = post_data.get('title', 'No Title')
-            permalink = post_data.get('permalink', '')
-            post_url = f"https://www.reddit.com{permalink}"
-            content = post_data.get('selftext', 'No Content')
-            created_utc = post_data.get('created_utc', 0)
-            #skip any posts with not enough content or non-English text
-            if content == 'No Content' or len(content.split()) < 50:
-                continue
-            if not is_english(content):
-                continue
+    sync_posts(stock, time_filter, subreddits, windows)
+    return load_window_posts(stock, time_filter, subreddits)
+
+#posts already in the store for a window (+ relevance filter when enabled) as a PostBatch, no reddit calls.
+def load_window_posts(stock, time_filter, subreddits):
+    since = None if time_filter == 'all' else time.time() - TIME_FILTER_SECONDS[time_filter]
+    with instrument.stage('load'):
+        rows = load_posts(stock, subreddits, since, with_text=relevance.ENABLED)
+    instrument.count_posts('loaded', len(rows))
+    #filter with relevancy constraints using the zero-shot BART model (STOCKA_RELEVANCE=1), prefiltered + batched + cached.
+    if relevance.ENABLED and rows:
+        with instrument.stage('relevance'):
+            verdicts = relevance.classify_posts([(row['id'], row['selftext']) for row in rows], stock)
+        instrument.count_posts('irrelevant', sum(1 for row in rows if not verdicts[row['id']]))
+        rows = [row for row in rows if verdicts[row['id']]]
+    with instrument.stage('dedupe'):
+        posts_data = remove_dupes(PostBatch.from_rows(rows))
+    instrument.count_posts('duplicate', len(rows) - len(posts_data))
+    return posts_data
+
+#checks shared by the batch and streaming scrapes, returns (metrics, widest window) or None when the inputs are invalid.
+def prepare_scrape(stock, time_filter, extra_windows=()):
+    #validate time_filter
+    windows = [time_filter] + list(extra_windows)
+    if any(window not in TIME_FILTER_ORDER for window in windows):
+        return None
+    period = TIME_FILTER_MAPPING.get(time_filter, '1mo')
+    with instrument.stage('ticker_check'):
+        if not is_valid_ticker(stock):
+            return None
+    with instrument.stage('market_metrics'):
+        metrics = get_stock_metrics(stock, period=period)
+    if not metrics:
+        return None
+    return metrics, widest_time_filter(windows)
+
+#scrape planner: fetch the widest window once and carve every other requested window out of it
+#(narrower windows get their own query only where the wide fetch hit the 1000 post cap).
+#returns the main results for time_filter plus {window: posts} for extra_windows (e.g. 'year' for the plots).
+def scrape_windows(stock, time_filter, subreddits, extra_windows=()):
+    prepared = prepare_scrape(stock, time_filter, extra_windows)
+    if prepared is None:
+        return PostBatch.empty(), {}, None, {}
+    metrics, widest = prepared
+    all_posts = collect_posts(stock, widest, subreddits, [time_filter] + list(extra_windows))
+    now = time.time()
+    posts_data = filter_posts_by_window(all_posts, time_filter, now)
+    window_posts = {window: filter_posts_by_window(all_posts, window, now) for window in extra_windows}
+    return posts_data, metrics, overall_sentiment(posts_data), window_posts
 
-            
-            #LATER: to filter with  relevancy constraints using TRANSFORMERS BERT   etc:
-                    # if not is_relevant(content, stock):
-                    #     continue
-            sentiment_dict = VADER.polarity_scores(content)   #VADER sentiment (neg, neu, pos, compound) and conver tthat to either POSITIVE, NEGATIVE, NEUTRAL.
-            sentiment_label = label_sentiment(sentiment_dict['compound'])
-            all_compounds.append(sentiment_dict['compound'])
-            post_date = datetime.utcfromtimestamp(created_utc).date()
-            posts_data.append({'subreddit': subreddit,'title': title,'url': post_url,'compound_score': sentiment_dict['compound'],'content_sentiment': sentiment_label,'date': post_date})
-        time.sleep(1.0)    #prevent rate-limiting by Reddit stay stealthy.
-    posts_data = remove_dupes(posts_data)
-    if all_compounds:
-        overall_label = label_sentiment(sum(all_compounds) / len(all_compounds))
-    else:
-        overall_label = None
+#post scraper
+def scrape_posts(stock, time_filter, subreddits, period):
+    posts_data, metrics, overall_label, _ = scrape_windows(stock, time_filter, subreddits)
     return posts_data, metrics, overall_label
+
+#generator pipeline version of scrape_windows for the streaming page, yields (event, payload):
+#  ('metrics', metrics) first, then ('posts', (subreddit, posts in time_filter)) per subreddit as it completes,
+#  then ('summary', (posts_data, overall_label, {window: posts})) once everything is in.
+#yields nothing when the inputs are invalid.
+def iter_scrape(stock, time_filter, subreddits, extra_windows=()):
+    prepared = prepare_scrape(stock, time_filter, extra_windows)
+    if prepared is None:
+        return
+    metrics, widest = prepared
+    yield 'metrics', metrics
+    seen_urls = set()
+    batches = []
+    for subreddit in iter_sync_posts(stock, widest, subreddits, [time_filter] + list(extra_windows)):
+        posts = load_window_posts(stock, widest, [subreddit]).exclude_urls(seen_urls)
+        batches.append(posts)
+        yield 'posts', (subreddit, filter_posts_by_window(posts, time_filter))
+    all_posts = PostBatch.concat(batches)
+    now = time.time()
+    posts_data = filter_posts_by_window(all_posts, time_filter, now)
+    window_posts = {window: filter_posts_by_window(all_posts, window, now) for window in extra_windows}
+    yield 'summary', (posts_data, overall_sentiment(posts_data), window_posts)
@@ -0,0 +1,116 @@
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+#batched VADER scoring. VADER is pure python and CPU bound so big batches are spread over a process pool,
+#scores come back as a numpy array so labels and aggregates are vectorized reductions instead of python loops.
+
+SCORE_KEYS = ('neg', 'neu', 'pos', 'compound') #column order of the score arrays
+COMPOUND = SCORE_KEYS.index('compound')
+POSITIVE_THRESHOLD = 0.5 #the one copy of the cutoffs, scraper.label_sentiment and the post store use these
+NEGATIVE_THRESHOLD = -0.5
+LABELS = np.array(['NEGATIVE', 'NEUTRAL', 'POSITIVE'])
+
+#the VADER lexicon is looked up here first, it is installed by the build step (`python vendorassets.py`, see readme), nothing is downloaded at runtime.
+NLTK_DATA = os.getenv('STOCKA_NLTK_DATA', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'nltk_data'))
+LEXICON = 'sentiment/vader_lexicon.zip'
+
+WORKERS = int(os.getenv('STOCKA_SENTIMENT_WORKERS', os.cpu_count() or 1))
+MIN_POOL_BATCH = 200 #smaller batches are scored inline, shipping them to workers costs more than it saves.
+CHUNK_SIZE = 100
+
+_analyzer = None
+_pool = None
+_pool_lock = threading.Lock()
+
+#put NLTK_DATA on nltk's search path and make sure the lexicon is there (offline, no download).
+def ensure_lexicon():
+    import nltk
+    if NLTK_DATA not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA)
+    try:
+        nltk.data.find(LEXICON)
+    except LookupError:
+        raise LookupError(f"VADER lexicon not found in {NLTK_DATA} or the nltk data paths, run the build step `python vendorassets.py` once") from None
+
+def download_lexicon():
+    import nltk
+    nltk.download('vader_lexicon', download_dir=NLTK_DATA)
+
+#one analyzer per process, built on first use (or by warmup() in a preforking master so the workers inherit it).
+def get_analyzer():
+    global _analyzer
+    if _analyzer is None:
+        ensure_lexicon()
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer
+        _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+def _score_chunk(texts):
+    analyzer = get_analyzer()
+    return [[scores[key] for key in SCORE_KEYS] for scores in map(analyzer.polarity_scores, texts)]
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=WORKERS)
+        return _pool
+
+#VADER scores for a batch of texts, (n, 4) float array in SCORE_KEYS order.
+def score_texts(texts):
+    texts = list(texts)
+    if not texts:
+        return np.empty((0, len(SCORE_KEYS)))
+    if len(texts) < MIN_POOL_BATCH or WORKERS <= 1:
+        rows = _score_chunk(texts)
+    else:
+        chunks = [texts[i:i + CHUNK_SIZE] for i in range(0, len(texts), CHUNK_SIZE)]
+        rows = [row for chunk_rows in _get_pool().map(_score_chunk, chunks) for row in chunk_rows]
+    return np.asarray(rows, dtype=np.float64)
+
+#0 = NEGATIVE, 1 = NEUTRAL, 2 = POSITIVE for every compound score.
+def label_codes(compounds):
+    compounds = np.asarray(compounds, dtype=np.float64)
+    return np.where(compounds > POSITIVE_THRESHOLD, 2, np.where(compounds < NEGATIVE_THRESHOLD, 0, 1))
+
+def labels(compounds):
+    return LABELS[label_codes(compounds)]
+
+#label for one compound score
+def label(compound):
+    return str(LABELS[label_codes(compound)])
+
+#label of the mean compound, None when there is nothing to average.
+def overall_label(compounds):
+    compounds = np.asarray(compounds, dtype=np.float64)
+    if compounds.size == 0:
+        return None
+    return str(LABELS[label_codes(compounds.mean())])
+
+#count / mean compound / label per group (subreddit, day, ...) with one bincount per stat.
+def aggregate_by(compounds, keys):
+    compounds = np.asarray(compounds, dtype=np.float64)
+    if compounds.size == 0:
+        return {}
+    groups, inverse = np.unique(np.asarray(keys), return_inverse=True)
+    return aggregate_codes(compounds, inverse, groups.tolist())
+
+#same for keys that are already integer codes into `names` (PostBatch subreddit codes), groups without rows are left out.
+def aggregate_codes(compounds, codes, names):
+    compounds = np.asarray(compounds, dtype=np.float64)
+    if compounds.size == 0:
+        return {}
+    counts = np.bincount(codes, minlength=len(names))
+    present = np.flatnonzero(counts)
+    means = np.bincount(codes, weights=compounds, minlength=len(names))[present] / counts[present]
+    group_labels = labels(means)
+    return {names[group]: {'count': int(counts[group]), 'mean': round(float(means[i]), 4), 'label': str(group_labels[i])} for i, group in enumerate(present.tolist())}
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['download']:
+        download_lexicon()
+    else:
+        print('usage: python sentiment.py download')
@@ -0,0 +1,66 @@
+import math
+import time
+from datetime import datetime
+import pandas as pd
+from marketdata import get_daily_bars
+from poststore import daily_post_stats
+
+#compact columnar time series for the client side charts: posts, mean sentiment, close and volume per day/week/month.
+#everything comes from the post store and the cached daily bars, nothing is scraped.
+
+RESOLUTIONS = {'daily': 'D', 'weekly': 'W', 'monthly': 'M'}
+MAX_DAYS = 3650
+
+#smallest yfinance period that covers `days`
+def period_for_days(days):
+    for period, period_days in (('1y', 366), ('2y', 731), ('5y', 1827), ('10y', 3653)):
+        if days <= period_days:
+            return period
+    return 'max'
+
+#NaN -> None so the JSON has nulls (gaps in the chart) instead of invalid NaN literals
+def _column(values, digits):
+    return [None if value is None or (isinstance(value, float) and math.isnan(value)) else round(float(value), digits) for value in values]
+
+def build_series(ticker, subreddits=None, days=365, resolution='daily'):
+    days = max(1, min(int(days), MAX_DAYS))
+    freq = RESOLUTIONS.get(resolution, 'D')
+    since_utc = time.time() - days * 86400
+    calendar = pd.period_range(end=pd.Period(datetime.utcnow().date(), freq='D'), periods=days, freq='D')
+
+    daily = pd.DataFrame({'posts': 0, 'compound_sum': 0.0}, index=calendar)
+    stats = daily_post_stats(ticker, subreddits, since_utc)
+    if stats:
+        stats = pd.DataFrame(stats)
+        stats.index = pd.PeriodIndex(pd.to_datetime(stats['day'], unit='D'), freq='D')
+        daily = stats[['posts', 'compound_sum']].reindex(calendar, fill_value=0)
+
+    bars = get_daily_bars(ticker, period_for_days(days))
+    if bars.empty:
+        daily['close'] = float('nan')
+        daily['volume'] = float('nan')
+    else:
+        market = bars[['Close', 'Volume']].copy()
+        market.index = market.index.to_period('D')
+        market = market[~market.index.duplicated(keep='last')]
+        daily['close'] = market['Close'].reindex(calendar)
+        daily['volume'] = market['Volume'].reindex(calendar)
+
+    if freq == 'D':
+        grouped = daily
+    else:
+        buckets = daily.index.asfreq(freq)
+        grouped = daily.groupby(buckets).agg(posts=('posts', 'sum'), compound_sum=('compound_sum', 'sum'),
+                                            close=('close', 'last'), volume=('volume', 'mean'))
+        grouped.index = grouped.index.asfreq('D', how='start')
+    sentiment_mean = grouped['compound_sum'] / grouped['posts'].where(grouped['posts'] > 0)
+
+    return {
+        'ticker': ticker.upper(),
+        'resolution': resolution if resolution in RESOLUTIONS else 'daily',
+        'dates': grouped.index.strftime('%Y-%m-%d').tolist(),
+        'post_counts': grouped['posts'].astype(int).tolist(),
+        'sentiment_mean': _column(sentiment_mean, 4),
+        'close': _column(grouped['close'], 2),
+        'volume': _column(grouped['volume'], 0),
+    }
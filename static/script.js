@@ -84,10 +84,388 @@ document.addEventListener('DOMContentLoaded', function() {
   // HOME JS
   const scraperForm = document.getElementById('scraperForm');
   if (scraperForm) {
-    scraperForm.addEventListener('submit', function() {
+    scraperForm.addEventListener('submit', function(e) {
       console.log("Scraping posts for the given stock/time_filter..."); 
+      //STREAMING: browsers with EventSource get results pushed one subreddit at a time instead of waiting on the full page
+      if (window.EventSource && scraperForm.dataset.streamUrl) {
+        e.preventDefault();
+        startStream();
+      }
     });
 
+    //INTERACTIVE CHART: drawn in the browser from /api/series/<ticker>, resolution/window changes only refetch the JSON
+    const seriesChart = document.getElementById('seriesChart');
+    let seriesState = null;
+    let seriesChartInstance = null;
+
+    function loadSeries() {
+      const params = new URLSearchParams({resolution: seriesState.resolution, days: seriesState.days});
+      seriesState.subreddits.forEach(function(subreddit) {
+        params.append('subreddits', subreddit);
+      });
+      const url = seriesChart.dataset.seriesUrl.replace('TICKER', encodeURIComponent(seriesState.stock)) + '?' + params.toString();
+      fetch(url)
+        .then(function(response) { return response.json(); })
+        .then(function(series) {
+          if (series.error) {
+            return;
+          }
+          if (seriesChartInstance) {
+            seriesChartInstance.destroy();
+          }
+          seriesChartInstance = new Chart(document.getElementById('seriesCanvas'), {
+            data: {
+              labels: series.dates,
+              datasets: [
+                {type: 'bar', label: 'Posts', data: series.post_counts, backgroundColor: 'skyblue', yAxisID: 'posts'},
+                {type: 'line', label: 'Mean Sentiment', data: series.sentiment_mean, borderColor: 'green', yAxisID: 'sentiment', spanGaps: true, pointRadius: 0},
+                {type: 'line', label: 'Close ($)', data: series.close, borderColor: 'orange', yAxisID: 'close', spanGaps: true, pointRadius: 0},
+                {type: 'line', label: 'Volume', data: series.volume, borderColor: 'purple', yAxisID: 'volume', spanGaps: true, pointRadius: 0, hidden: true}
+              ]
+            },
+            options: {
+              animation: false,
+              interaction: {mode: 'index', intersect: false},
+              scales: {
+                x: {},
+                posts: {type: 'linear', position: 'left', beginAtZero: true},
+                sentiment: {type: 'linear', position: 'right', min: -1, max: 1, grid: {drawOnChartArea: false}},
+                close: {type: 'linear', position: 'right', grid: {drawOnChartArea: false}},
+                volume: {type: 'linear', display: false}
+              }
+            }
+          });
+          resetSeriesRange();
+        })
+        .catch(function(error) { console.log(error); });
+    }
+
+    //ZOOM: show the dates between the two sliders (either order), a new series resets to the whole window
+    const seriesRangeStart = document.getElementById('seriesRangeStart');
+    const seriesRangeEnd = document.getElementById('seriesRangeEnd');
+
+    function applySeriesRange() {
+      if (!seriesChartInstance) {
+        return;
+      }
+      const dates = seriesChartInstance.data.labels;
+      if (!dates.length) {
+        document.getElementById('seriesRangeLabel').textContent = '';
+        return;
+      }
+      const start = Math.min(seriesRangeStart.value, seriesRangeEnd.value);
+      const end = Math.max(seriesRangeStart.value, seriesRangeEnd.value);
+      seriesChartInstance.options.scales.x.min = dates[start];
+      seriesChartInstance.options.scales.x.max = dates[end];
+      seriesChartInstance.update();
+      document.getElementById('seriesRangeLabel').textContent = dates[start] + ' to ' + dates[end];
+    }
+
+    function resetSeriesRange() {
+      const last = Math.max(seriesChartInstance.data.labels.length - 1, 0);
+      [seriesRangeStart, seriesRangeEnd].forEach(function(slider) {
+        slider.max = last;
+      });
+      seriesRangeStart.value = 0;
+      seriesRangeEnd.value = last;
+      applySeriesRange();
+    }
+
+    //LEAD/LAG ANALYTICS: correlation table + cross-correlation per lag from /api/analytics
+    const analyticsPanel = document.getElementById('analyticsPanel');
+    const analyticsPairs = {
+      posts_vs_returns: 'Posts vs Daily Return',
+      posts_vs_volume: 'Posts vs Volume',
+      sentiment_vs_returns: 'Sentiment vs Daily Return',
+      sentiment_vs_volume: 'Sentiment vs Volume'
+    };
+    const analyticsColors = {posts_vs_returns: 'orange', posts_vs_volume: 'purple', sentiment_vs_returns: 'green', sentiment_vs_volume: 'gray'};
+    let analyticsChartInstance = null;
+
+    function analyticsCell(row, value) {
+      const td = document.createElement('td');
+      td.style.padding = '4px 10px';
+      td.textContent = value === null || value === undefined ? '-' : value;
+      row.appendChild(td);
+    }
+
+    function showAnalytics(stock, subreddits) {
+      if (!analyticsPanel || !stock) {
+        return;
+      }
+      const params = new URLSearchParams({tickers: stock, days: 365});
+      subreddits.forEach(function(subreddit) {
+        params.append('subreddits', subreddit);
+      });
+      fetch(analyticsPanel.dataset.analyticsUrl + '?' + params.toString())
+        .then(function(response) { return response.json(); })
+        .then(function(data) {
+          const result = data.tickers && data.tickers[stock];
+          if (!result || result.error) {
+            return;
+          }
+          document.getElementById('analyticsHeading').textContent = '$' + stock + ' Reddit vs Market (Lead/Lag)';
+          document.getElementById('analyticsNote').textContent = result.observations + ' trading days, ' + result.days_with_posts +
+            ' with posts. A positive lag means reddit moved first.';
+          const body = analyticsPanel.querySelector('tbody');
+          body.innerHTML = '';
+          Object.keys(analyticsPairs).forEach(function(pair) {
+            const stats = result.pairs[pair];
+            const row = document.createElement('tr');
+            analyticsCell(row, analyticsPairs[pair]);
+            analyticsCell(row, stats.pearson);
+            analyticsCell(row, stats.spearman);
+            analyticsCell(row, stats.best_lag);
+            analyticsCell(row, stats.best_lag_correlation);
+            body.appendChild(row);
+          });
+          analyticsPanel.style.display = 'block';
+          if (!window.Chart) {
+            return;
+          }
+          if (analyticsChartInstance) {
+            analyticsChartInstance.destroy();
+          }
+          analyticsChartInstance = new Chart(document.getElementById('analyticsCanvas'), {
+            type: 'line',
+            data: {
+              labels: result.pairs.posts_vs_returns.lags,
+              datasets: Object.keys(analyticsPairs).map(function(pair) {
+                return {label: analyticsPairs[pair], data: result.pairs[pair].cross_correlation, borderColor: analyticsColors[pair], spanGaps: true};
+              })
+            },
+            options: {
+              animation: false,
+              interaction: {mode: 'index', intersect: false},
+              scales: {
+                x: {title: {display: true, text: 'Lag (trading days)'}},
+                y: {min: -1, max: 1, title: {display: true, text: 'Correlation'}}
+              }
+            }
+          });
+        })
+        .catch(function(error) { console.log(error); });
+    }
+
+    function showSeriesChart(stock, subreddits) {
+      if (!seriesChart || !window.Chart || !stock) {
+        return;
+      }
+      seriesState = {stock: stock, subreddits: subreddits, resolution: 'daily', days: document.getElementById('seriesDays').value};
+      document.getElementById('seriesHeading').textContent = '$' + stock + ' Interactive Chart';
+      seriesChart.style.display = 'block';
+      loadSeries();
+      showAnalytics(stock, subreddits);
+    }
+
+    if (seriesChart) {
+      document.querySelectorAll('.series-resolution').forEach(function(button) {
+        button.addEventListener('click', function() {
+          if (seriesState) {
+            seriesState.resolution = button.dataset.resolution;
+            loadSeries();
+          }
+        });
+      });
+      seriesRangeStart.addEventListener('input', applySeriesRange);
+      seriesRangeEnd.addEventListener('input', applySeriesRange);
+      document.getElementById('seriesRangeReset').addEventListener('click', function() {
+        if (seriesChartInstance) {
+          resetSeriesRange();
+        }
+      });
+      document.getElementById('seriesDays').addEventListener('change', function() {
+        if (seriesState) {
+          seriesState.days = this.value;
+          loadSeries();
+        }
+      });
+      //server rendered results page
+      if (seriesChart.dataset.stock) {
+        showSeriesChart(seriesChart.dataset.stock, seriesChart.dataset.subreddits ? seriesChart.dataset.subreddits.split(',') : []);
+      }
+    }
+
+    //BACKGROUND JOB: the search is still running on the server, poll it and reload with the results when done
+    const pendingJob = document.getElementById('pendingJob');
+    if (pendingJob) {
+      const pollJob = function() {
+        fetch(pendingJob.dataset.statusUrl)
+          .then(function(response) { return response.json(); })
+          .then(function(job) {
+            if (job.status === 'done' || job.status === 'failed' || job.error) {
+              window.location = pendingJob.dataset.resultUrl;
+            } else {
+              setTimeout(pollJob, 2000);
+            }
+          })
+          .catch(function() { setTimeout(pollJob, 5000); });
+      };
+      setTimeout(pollJob, 2000);
+    }
+
+    let activeStream = null;
+
+    //<p><strong>label</strong> value</p>
+    function metricLine(label, value) {
+      const p = document.createElement('p');
+      const strong = document.createElement('strong');
+      strong.textContent = label + ' ';
+      p.appendChild(strong);
+      p.appendChild(document.createTextNode(value));
+      return p;
+    }
+
+    //same markup as the server rendered posts list
+    function postRow(post) {
+      const li = document.createElement('li');
+      li.style.marginBottom = '10px';
+      const title = document.createElement('strong');
+      title.textContent = post.title;
+      li.appendChild(title);
+      li.appendChild(document.createTextNode(' | Subreddit: '));
+      const subreddit = document.createElement('em');
+      subreddit.textContent = post.subreddit;
+      li.appendChild(subreddit);
+      li.appendChild(document.createTextNode(' | Date: '));
+      const date = document.createElement('em');
+      date.textContent = post.date;
+      li.appendChild(date);
+      li.appendChild(document.createElement('br'));
+      const linkBox = document.createElement('div');
+      linkBox.className = 'white-bg';
+      const link = document.createElement('a');
+      link.href = post.url;
+      link.target = '_blank';
+      link.textContent = post.url;
+      linkBox.appendChild(link);
+      li.appendChild(linkBox);
+      li.appendChild(document.createTextNode('Compound Score: ' + post.compound_score));
+      li.appendChild(document.createElement('br'));
+      li.appendChild(document.createTextNode('Sentiment: '));
+      const label = document.createElement('span');
+      label.className = post.content_sentiment.toLowerCase() + '-label';
+      label.textContent = post.content_sentiment;
+      li.appendChild(label);
+      return li;
+    }
+
+    function startStream() {
+      if (activeStream) {
+        activeStream.close();
+      }
+      const params = new URLSearchParams(new FormData(scraperForm));
+      const results = document.getElementById('streamResults');
+      const status = document.getElementById('streamStatus');
+      const metricsBox = document.getElementById('streamMetrics');
+      const plotsBox = document.getElementById('streamPlots');
+      const postsHeading = document.getElementById('streamPostsHeading');
+      const postsList = document.getElementById('streamPosts');
+      const noPosts = document.getElementById('noPostsMessage');
+      //clear old results (server rendered ones too)
+      document.querySelectorAll('[data-searched="true"]').forEach(function(section) { section.remove(); });
+      if (noPosts) {
+        noPosts.style.display = 'none';
+      }
+      metricsBox.innerHTML = '';
+      plotsBox.innerHTML = '';
+      if (seriesChart) {
+        seriesChart.style.display = 'none';
+      }
+      postsList.innerHTML = '';
+      postsHeading.textContent = '';
+      results.style.display = 'block';
+      status.textContent = 'Searching...';
+
+      let stock = '';
+      let searchedSubreddits = [];
+      let totalPosts = 0;
+      let subredditsLeft = 0;
+      const stream = new EventSource(scraperForm.dataset.streamUrl + '?' + params.toString());
+      activeStream = stream;
+
+      stream.addEventListener('start', function(event) {
+        const data = JSON.parse(event.data);
+        stock = data.stock;
+        searchedSubreddits = data.subreddits;
+        subredditsLeft = data.subreddits.length;
+        postsHeading.textContent = data.timeframe_description + ' Post Search Results and Sentiment Analysis for $' + stock;
+        status.textContent = 'Searching ' + subredditsLeft + ' subreddit(s)...';
+      });
+
+      stream.addEventListener('metrics', function(event) {
+        const metrics = JSON.parse(event.data);
+        const heading = document.createElement('h3');
+        heading.textContent = '$' + stock + ' Metrics';
+        metricsBox.appendChild(heading);
+        metricsBox.appendChild(metricLine('Last Close Price:', '$' + metrics.stock_price));
+        metricsBox.appendChild(metricLine('Last Reported Volume:', metrics.current_total_volume));
+        metricsBox.appendChild(metricLine('Stock Price Change From Start of Month:', metrics.stock_price_change_pct + '%'));
+        metricsBox.appendChild(metricLine('Stock Volume Change From Start of Month:', metrics.volume_change_pct + '%'));
+      });
+
+      //append rows as each subreddit finishes
+      stream.addEventListener('posts', function(event) {
+        const data = JSON.parse(event.data);
+        data.posts.forEach(function(post) {
+          postsList.appendChild(postRow(post));
+        });
+        totalPosts += data.posts.length;
+        subredditsLeft -= 1;
+        status.textContent = 'r/' + data.subreddit + ' done, ' + totalPosts + ' posts so far' + (subredditsLeft > 0 ? ', ' + subredditsLeft + ' subreddit(s) left...' : '.');
+      });
+
+      stream.addEventListener('summary', function(event) {
+        const data = JSON.parse(event.data);
+        metricsBox.appendChild(metricLine('Total Number of Posts within the Searched Timeframe:', data.total_posts));
+        if (data.overall_label) {
+          metricsBox.appendChild(metricLine('Overall Sentiment:', data.overall_label));
+        }
+        Object.keys(data.subreddit_breakdown).forEach(function(subreddit) {
+          const summary = data.subreddit_breakdown[subreddit];
+          metricsBox.appendChild(metricLine('r/' + subreddit + ':', summary.count + ' posts, mean compound ' + summary.mean + ' (' + summary.label + ')'));
+        });
+        status.textContent = 'Rendering plots...';
+      });
+
+      stream.addEventListener('plots', function(event) {
+        const plots = JSON.parse(event.data);
+        if (plots.monthly) {
+          const heading = document.createElement('h3');
+          heading.textContent = '$' + stock + ' Visual Analysis';
+          plotsBox.appendChild(heading);
+          const img = document.createElement('img');
+          img.src = plots.monthly;
+          img.style.maxWidth = '100%';
+          img.style.height = 'auto';
+          plotsBox.appendChild(img);
+        }
+      });
+
+      stream.addEventListener('warning', function(event) {
+        console.log(JSON.parse(event.data).message);
+      });
+
+      stream.addEventListener('failed', function(event) {
+        status.textContent = JSON.parse(event.data).message;
+        stream.close();
+      });
+
+      stream.addEventListener('done', function() {
+        status.textContent = totalPosts ? '' : 'No posts to show. Perhaps nothing was found or you did not submit the form properly!';
+        stream.close();
+        showSeriesChart(stock, searchedSubreddits);
+      });
+
+      //connection dropped, dont let EventSource reconnect and start the whole scrape again
+      stream.onerror = function() {
+        if (stream.readyState !== EventSource.CLOSED) {
+          status.textContent = 'Connection lost while searching.';
+        }
+        stream.close();
+      };
+    }
+
     //DONE toggle the display of <hr> elements
     function toggleSearchDividers() {
       const searchedSections = document.querySelectorAll('[data-searched="true"]');      //checks for  sec with data-searched="true"
@@ -109,6 +487,35 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     toggleSearchDividers();    //call once the DOM is fully loaded
 
+    //TICKER AUTOCOMPLETE from /api/tickers (local symbol index)
+    const stockInput = document.getElementById('stock');
+    const tickerSuggestions = document.getElementById('tickerSuggestions');
+    if (stockInput && tickerSuggestions) {
+      let suggestTimer = null;
+      stockInput.addEventListener('input', function() {
+        clearTimeout(suggestTimer);
+        const query = stockInput.value.trim();
+        if (!query) {
+          tickerSuggestions.innerHTML = '';
+          return;
+        }
+        suggestTimer = setTimeout(function() {   //wait for the user to stop typing
+          fetch('/api/tickers?q=' + encodeURIComponent(query))
+            .then(function(response) { return response.json(); })
+            .then(function(data) {
+              tickerSuggestions.innerHTML = '';
+              data.suggestions.forEach(function(suggestion) {
+                const option = document.createElement('option');
+                option.value = suggestion.symbol;
+                option.label = suggestion.name;
+                tickerSuggestions.appendChild(option);
+              });
+            })
+            .catch(function() {});
+        }, 150);
+      });
+    }
+
     //SELECTALL / DESELECT ALL FUNCTIONS
     const selectAllBtn = document.getElementById('selectAllBtn'); //select all button
     const deselectAllBtn = document.getElementById('deselectAllBtn'); //deselectall button
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+#the modules read these at import, point every sqlite file at a scratch dir so the tests never touch the checkout's stores.
+_scratch = tempfile.mkdtemp(prefix='stocka-tests-')
+for name, filename in (('STOCKA_DB', 'stocka.db'), ('STOCKA_RESULT_CACHE', 'resultcache.db'), ('STOCKA_USER_DB', 'users.db')):
+    os.environ.setdefault(name, os.path.join(_scratch, filename))
+os.environ.setdefault('STOCKA_PBKDF2_ITERATIONS', '1000')
@@ -0,0 +1,94 @@
+import math
+import numpy as np
+import pytest
+from analytics import MIN_PAIRS, cross_correlation, masked_pearson, masked_ranks, masked_spearman, rolling_correlations
+
+#plain python references: pearson over the pairs where both sides exist, spearman = pearson of average ranks
+def pairs(x, y):
+    return [(a, b) for a, b in zip(x, y) if not (math.isnan(a) or math.isnan(b))]
+
+def reference_pearson(x, y):
+    valid = pairs(x, y)
+    if len(valid) < MIN_PAIRS:
+        return math.nan
+    xs, ys = zip(*valid)
+    x_mean, y_mean = sum(xs) / len(xs), sum(ys) / len(ys)
+    covariance = sum((a - x_mean) * (b - y_mean) for a, b in valid)
+    spread = math.sqrt(sum((a - x_mean) ** 2 for a in xs) * sum((b - y_mean) ** 2 for b in ys))
+    return covariance / spread if spread else math.nan
+
+def average_ranks(values):
+    ordered = sorted(values)
+    return [(ordered.index(value) + 1 + len(ordered) - ordered[::-1].index(value)) / 2 for value in values]
+
+def reference_spearman(x, y):
+    valid = pairs(x, y)
+    if len(valid) < MIN_PAIRS:
+        return math.nan
+    xs, ys = zip(*valid)
+    return reference_pearson(average_ranks(xs), average_ranks(ys))
+
+def random_series(rng, n, nan_share=0.2, ties=False):
+    values = rng.integers(0, 5, n).astype(float) if ties else rng.normal(size=n)
+    values[rng.random(n) < nan_share] = np.nan
+    return values
+
+@pytest.mark.parametrize('seed', range(10))
+def test_masked_pearson_and_spearman_match_reference(seed):
+    rng = np.random.default_rng(seed)
+    x = random_series(rng, 40, ties=seed % 2 == 0)
+    y = 0.5 * np.nan_to_num(x) + random_series(rng, 40)
+    assert masked_pearson(x, y) == pytest.approx(reference_pearson(x, y), nan_ok=True)
+    assert masked_spearman(x, y) == pytest.approx(reference_spearman(x, y), nan_ok=True)
+
+def test_masked_ranks_average_ties_and_skip_invalid():
+    values = np.array([3.0, 1.0, 3.0, np.nan, 2.0, 3.0])
+    valid = ~np.isnan(values)
+    ranks = masked_ranks(values, valid)
+    assert ranks[valid].tolist() == [4.0, 1.0, 4.0, 2.0, 4.0]
+    assert np.isnan(ranks[3])
+    #row wise on 2d input
+    assert masked_ranks(np.array([[2.0, 1.0], [1.0, 1.0]]), np.ones((2, 2), dtype=bool)).tolist() == [[2.0, 1.0], [1.5, 1.5]]
+
+def test_too_few_pairs_or_constant_is_nan():
+    x = np.array([1.0, 2.0, 3.0, 4.0, np.nan, 6.0])
+    y = np.array([1.0, np.nan, 3.0, 4.0, 5.0, 6.0])
+    assert np.isnan(masked_pearson(x, y)) #4 valid pairs < MIN_PAIRS
+    assert np.isnan(masked_pearson(np.arange(10.0), np.ones(10)))
+    assert masked_pearson(np.arange(10.0), np.arange(10.0) * 3 + 1) == pytest.approx(1.0)
+    assert masked_spearman(np.arange(10.0), np.exp(np.arange(10.0))) == pytest.approx(1.0) #monotonic, not linear
+
+def test_rolling_correlations_cover_trailing_windows():
+    rng = np.random.default_rng(3)
+    x, y = random_series(rng, 50), random_series(rng, 50)
+    window = 12
+    pearson, spearman = rolling_correlations(x, y, window)
+    assert np.isnan(pearson[:window - 1]).all() and np.isnan(spearman[:window - 1]).all()
+    for end in range(window - 1, 50):
+        chunk = slice(end - window + 1, end + 1)
+        assert pearson[end] == pytest.approx(reference_pearson(x[chunk], y[chunk]), nan_ok=True)
+        assert spearman[end] == pytest.approx(reference_spearman(x[chunk], y[chunk]), nan_ok=True)
+    short_pearson, _ = rolling_correlations(x[:5], y[:5], window)
+    assert np.isnan(short_pearson).all()
+
+@pytest.mark.parametrize('shift', [3, -2, 0])
+def test_cross_correlation_lag_sign(shift):
+    #market[t + shift] = reddit[t]: a positive shift means reddit moves first and has to peak at that positive lag
+    rng = np.random.default_rng(11)
+    reddit = rng.normal(size=200)
+    market = np.full(200, np.nan)
+    if shift >= 0:
+        market[shift:] = reddit[:200 - shift]
+    else:
+        market[:shift] = reddit[-shift:]
+    lags, xcorr = cross_correlation(reddit, market, max_lag=5)
+    assert lags.tolist() == list(range(-5, 6))
+    assert int(lags[np.nanargmax(xcorr)]) == shift
+    assert xcorr[lags.tolist().index(shift)] == pytest.approx(1.0)
+    for lag, value in zip(lags.tolist(), xcorr.tolist()):
+        shifted = [market[t + lag] if 0 <= t + lag < 200 else math.nan for t in range(200)]
+        assert value == pytest.approx(reference_pearson(reddit, shifted), nan_ok=True)
+
+def test_cross_correlation_lag_longer_than_series():
+    lags, xcorr = cross_correlation(np.arange(4.0), np.arange(4.0), max_lag=6)
+    assert len(lags) == 13 and np.isnan(xcorr).all()
@@ -0,0 +1,46 @@
+import pytest
+import app as webapp
+from analytics import MAX_TICKERS
+from jobs import Job
+
+@pytest.fixture
+def submitted(monkeypatch):
+    calls = []
+    def fake_submit(key, fn, *args):
+        calls.append(key)
+        return Job(key)
+    monkeypatch.setattr(webapp, 'submit_job', fake_submit)
+    return calls
+
+@pytest.fixture
+def client():
+    return webapp.app.test_client()
+
+@pytest.mark.parametrize('body', [
+    {'tickers': 'TSLA'}, #a string used to be iterated letter by letter
+    {'tickers': [1]},
+    {'tickers': ['TSLA', None]},
+    {'tickers': ['TSLA'], 'subreddits': 'stocks'},
+    {'tickers': ['TSLA'], 'subreddits': [5]},
+    {'tickers': ['TSLA'], 'time_filter': 5},
+    {'tickers': ['TSLA'], 'time_filter': 'fortnight'},
+    {'tickers': []},
+    {'tickers': [f'T{index}' for index in range(MAX_TICKERS + 1)]},
+    ['TSLA'],
+    'TSLA',
+])
+def test_api_batch_rejects(client, submitted, body):
+    response = client.post('/api/batch', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert submitted == []
+
+def test_api_batch_rejects_non_json(client, submitted):
+    response = client.post('/api/batch', data='tickers=TSLA', content_type='application/x-www-form-urlencoded')
+    assert response.status_code == 400
+    assert submitted == []
+
+def test_api_batch_normalizes(client, submitted):
+    response = client.post('/api/batch', json={'tickers': ['$tsla', 'TSLA ', 'gme'], 'subreddits': ['Stocks', ' '], 'time_filter': 'Month'})
+    assert response.status_code == 202
+    assert submitted == [('batch', ('GME', 'TSLA'), ('stocks',), 'month')]
@@ -0,0 +1,12 @@
+import time
+import dumpimport
+
+def test_timestamp_is_utc_midnight(monkeypatch):
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    try:
+        assert dumpimport._timestamp('2024-01-01') == 1704067200.0
+        assert dumpimport._timestamp('') is None
+    finally:
+        monkeypatch.undo()
+        time.tzset()
@@ -0,0 +1,47 @@
+import threading
+import pytest
+import jobs
+
+@pytest.fixture
+def gate():
+    event = threading.Event()
+    yield event
+    event.set() #never leave a pool thread blocked
+
+def test_identical_inflight_requests_share_a_job(gate):
+    calls = []
+    def work(value):
+        calls.append(value)
+        gate.wait(5)
+        return value * 2
+    first = jobs.submit(('test', 'dedupe'), work, 21)
+    second = jobs.submit(('test', 'dedupe'), work, 21)
+    other = jobs.submit(('test', 'other'), work, 1)
+    assert second is first
+    assert other is not first
+    gate.set()
+    assert first.wait(5) and other.wait(5)
+    assert (first.status, first.result) == ('done', 42)
+    assert sorted(calls) == [1, 21]
+    assert jobs.get_job(first.id) is first
+    #a finished job is not reused, the same key runs again
+    again = jobs.submit(('test', 'dedupe'), work, 5)
+    assert again is not first
+    assert again.wait(5) and again.result == 10
+
+def test_failed_job():
+    def fail():
+        raise ValueError('reddit is down')
+    job = jobs.submit(('test', 'fail'), fail)
+    assert job.wait(5)
+    assert (job.status, job.error, job.result) == ('failed', 'reddit is down', None)
+    assert job.started is not None and job.finished >= job.started
+    assert jobs.submit(('test', 'fail'), fail) is not job
+
+def test_finished_jobs_expire(monkeypatch):
+    job = jobs.submit(('test', 'expire'), lambda: 1)
+    assert job.wait(5)
+    job.finished -= jobs.RESULT_TTL + 1
+    jobs.submit(('test', 'prune'), lambda: 1).wait(5) #pruning happens on submit
+    assert jobs.get_job(job.id) is None
+    assert jobs.get_job('no-such-job') is None
@@ -0,0 +1,58 @@
+import pytest
+import langfilter
+from ttlcache import TTLCache
+
+ENGLISH = ('I think the stock is going to go up because the earnings were good and they have a lot of cash on hand, '
+           'so if you are holding it you should be fine for a while and it will be worth it.')
+GERMAN = ('Die Aktie ist heute stark gestiegen, nachdem das Unternehmen seine Quartalszahlen veröffentlicht hatte und '
+          'die Analysten ihre Kursziele deutlich angehoben haben, trotzdem bleibe ich vorsichtig.')
+RUSSIAN = 'Акции компании сегодня выросли после публикации квартального отчета, аналитики повысили целевые цены.'
+TICKER_LIST = ' '.join(['TSLA GME AMC NVDA PLTR SOFI RIVN LCID'] * 4)
+
+@pytest.fixture
+def detector(monkeypatch):
+    calls = []
+    def fake(text):
+        calls.append(text)
+        return True
+    monkeypatch.setattr(langfilter, '_detector', fake)
+    monkeypatch.setattr(langfilter, '_memo', TTLCache(maxsize=100, ttl=None))
+    return calls
+
+def test_quick_check():
+    assert langfilter.quick_check(ENGLISH) is True
+    assert langfilter.quick_check(RUSSIAN) is False #mostly non ascii letters
+    assert langfilter.quick_check('1234 !!!') is False
+    assert langfilter.quick_check('short english text') is None #too few words to be sure
+    assert langfilter.quick_check(GERMAN) is None #latin, few english stopwords: the detector decides
+    assert langfilter.quick_check(TICKER_LIST) is None
+
+def test_fast_path_skips_detector(detector):
+    assert langfilter.is_english(ENGLISH) is True
+    assert langfilter.is_english(RUSSIAN) is False
+    assert detector == []
+
+def test_ambiguous_text_goes_to_detector_with_prefix_only(detector):
+    long_text = GERMAN + ' x' * 5000
+    assert langfilter.is_english(long_text) is True
+    assert detector == [long_text[:langfilter.PREFIX_CHARS]]
+
+def test_memoized_by_post_id(detector):
+    assert langfilter.is_english(GERMAN, 'p1') is True
+    assert langfilter.is_english('something else entirely', 'p1') is True #answered from the memo
+    assert len(detector) == 1
+    langfilter.is_english(GERMAN) #no id, not memoized
+    langfilter.is_english(GERMAN)
+    assert len(detector) == 3
+
+def test_set_detector(monkeypatch):
+    monkeypatch.setattr(langfilter, '_detector', langfilter._detector)
+    monkeypatch.setattr(langfilter, '_memo', TTLCache(maxsize=100, ttl=None))
+    langfilter.set_detector(lambda text: False)
+    assert langfilter.is_english(GERMAN) is False
+    assert langfilter.is_english(ENGLISH) is True #fast path does not ask it
+
+def test_langdetect_detector():
+    assert langfilter.langdetect_detector(ENGLISH) is True
+    assert langfilter.langdetect_detector(GERMAN) is False
+    assert langfilter.langdetect_detector('') is False #langdetect raises on empty text
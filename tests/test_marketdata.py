@@ -0,0 +1,17 @@
+import math
+import pandas as pd
+import marketdata
+
+def test_metrics_skip_incomplete_last_row(monkeypatch):
+    days = pd.date_range(end=pd.Timestamp.now().normalize(), periods=60, freq='D')
+    df = pd.DataFrame({'Close': [100.0] * 59 + [math.nan], 'Volume': [1000.0] * 58 + [2000.0, math.nan]}, index=days)
+    monkeypatch.setattr(marketdata, 'get_daily_bars', lambda ticker, period: df)
+    metrics = marketdata.get_stock_metrics('TSLA', '3mo')
+    assert metrics['current_total_volume'] == 2000
+    assert metrics['stock_price'] == 100.0
+    assert metrics['volume_change_pct'] == 100.0
+
+def test_metrics_all_nan_bars(monkeypatch):
+    df = pd.DataFrame({'Close': [math.nan], 'Volume': [math.nan]}, index=pd.DatetimeIndex([pd.Timestamp.now().normalize()]))
+    monkeypatch.setattr(marketdata, 'get_daily_bars', lambda ticker, period: df)
+    assert marketdata.get_stock_metrics('TSLA', '3mo')['current_total_volume'] == 0
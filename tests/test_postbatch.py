@@ -0,0 +1,173 @@
+import random
+from datetime import datetime
+import numpy as np
+import pytest
+import sentiment
+from postbatch import PostBatch
+
+#regression tests: every PostBatch operation against the dict-per-post code it replaced (kept below as the reference).
+
+def label_sentiment(compound_score):
+    if compound_score > 0.5:
+        return "POSITIVE"
+    elif compound_score < -0.5:
+        return "NEGATIVE"
+    else:
+        return "NEUTRAL"
+
+def post_from_row(row):
+    return {'id': row['id'], 'subreddit': row['subreddit'], 'title': row['title'], 'url': f"https://www.reddit.com{row['permalink']}",
+            'compound_score': row['compound'], 'content_sentiment': label_sentiment(row['compound']),
+            'date': datetime.utcfromtimestamp(row['created_utc']).date(), 'created_utc': row['created_utc']}
+
+def remove_dupes(posts):
+    unique_urls = set()
+    unique_posts = []
+    for post in posts:
+        post_url = post.get('url')
+        if post_url and post_url not in unique_urls:
+            unique_urls.add(post_url)
+            unique_posts.append(post)
+    return unique_posts
+
+def aggregate_by(posts):
+    groups = {}
+    for post in posts:
+        groups.setdefault(post['subreddit'], []).append(post['compound_score'])
+    result = {}
+    for subreddit in sorted(groups):
+        mean = sum(groups[subreddit]) / len(groups[subreddit])
+        result[subreddit] = {'count': len(groups[subreddit]), 'mean': round(mean, 4), 'label': label_sentiment(mean)}
+    return result
+
+def overall_label(posts):
+    if not posts:
+        return None
+    return label_sentiment(sum(post['compound_score'] for post in posts) / len(posts))
+
+def make_rows(count, seed=0, subreddits=('stocks', 'wallstreetbets', 'investing', 'pennystocks')):
+    rng = random.Random(seed)
+    rows = []
+    for index in range(count):
+        #some permalinks repeat so the dedupe has work to do, titles include non ascii text
+        permalink = f"/r/x/comments/{rng.randrange(count)}/post_{index % 7}/"
+        rows.append({'id': f't3_{index}', 'subreddit': rng.choice(subreddits), 'title': f'title {index} {"é" * (index % 3)}',
+                     'permalink': permalink, 'compound': round(rng.uniform(-1, 1), 4),
+                     'created_utc': 1700000000 + rng.randrange(400 * 86400)})
+    return rows
+
+def assert_same_posts(batch, posts):
+    assert len(batch) == len(posts)
+    assert [view.to_dict() for view in batch] == posts
+
+@pytest.fixture
+def rows():
+    return make_rows(300)
+
+def test_from_rows_matches_post_dicts(rows):
+    assert_same_posts(PostBatch.from_rows(rows), [post_from_row(row) for row in rows])
+
+def test_empty():
+    batch = PostBatch.empty()
+    assert not batch
+    assert batch.to_dicts() == []
+    assert batch.overall_label() is None
+    assert batch.subreddit_breakdown() == {}
+
+@pytest.mark.parametrize('selector', ['mask', 'indices', 'reversed', 'none'])
+def test_take(rows, selector):
+    batch = PostBatch.from_rows(rows)
+    posts = [post_from_row(row) for row in rows]
+    if selector == 'mask':
+        mask = np.array([index % 3 == 0 for index in range(len(rows))])
+        expected = [post for post, keep in zip(posts, mask) if keep]
+        taken = batch.take(mask)
+    elif selector == 'indices':
+        indices = [5, 0, 17, 5, 299]
+        expected = [posts[index] for index in indices]
+        taken = batch.take(np.array(indices))
+    elif selector == 'reversed':
+        expected = posts[::-1]
+        taken = batch.take(np.arange(len(rows))[::-1])
+    else:
+        expected = []
+        taken = batch.take(np.zeros(len(rows), dtype=bool))
+    assert_same_posts(taken, expected)
+
+def test_since(rows):
+    batch = PostBatch.from_rows(rows)
+    posts = [post_from_row(row) for row in rows]
+    for cutoff in (0, 1700000000 + 200 * 86400, 1700000000 + 399 * 86400, 2000000000):
+        assert_same_posts(batch.since(cutoff), [post for post in posts if post.get('created_utc', 0) >= cutoff])
+
+def test_unique_urls(rows):
+    assert_same_posts(PostBatch.from_rows(rows).unique_urls(), remove_dupes([post_from_row(row) for row in rows]))
+
+def test_unique_urls_without_dupes_returns_itself():
+    rows = [dict(row, permalink=f'/r/x/comments/{index}/') for index, row in enumerate(make_rows(20))]
+    batch = PostBatch.from_rows(rows)
+    assert batch.unique_urls() is batch
+
+def test_exclude_urls_matches_streaming_dedupe(rows):
+    #old per subreddit streaming loop: drop posts already shown, remember the new ones
+    seen_urls = set()
+    expected = []
+    seen = set()
+    batches = []
+    for subreddit in ('stocks', 'wallstreetbets', 'investing', 'pennystocks'):
+        subset = [row for row in rows if row['subreddit'] == subreddit]
+        posts = [post for post in remove_dupes([post_from_row(row) for row in subset]) if post['url'] not in seen_urls]
+        seen_urls.update(post['url'] for post in posts)
+        expected.extend(posts)
+        batch = PostBatch.from_rows(subset).unique_urls().exclude_urls(seen)
+        assert_same_posts(batch, posts)
+        batches.append(batch)
+    assert_same_posts(PostBatch.concat(batches), expected)
+    assert seen == {post['url'][len('https://www.reddit.com'):] for post in expected}
+
+def test_concat(rows):
+    parts = [rows[:100], [], rows[100:101], rows[101:]]
+    batch = PostBatch.concat([PostBatch.from_rows(part) for part in parts])
+    assert_same_posts(batch, [post_from_row(row) for row in rows])
+    #subreddit codes are remapped onto the merged name list
+    assert batch.subreddits() == [row['subreddit'] for row in rows]
+    assert not PostBatch.concat([PostBatch.empty(), PostBatch.empty()])
+
+def test_concat_disjoint_subreddits():
+    left = PostBatch.from_rows(make_rows(10, seed=1, subreddits=('zeta',)))
+    right = PostBatch.from_rows(make_rows(10, seed=2, subreddits=('alpha', 'mid')))
+    batch = PostBatch.concat([left, right])
+    assert batch.subreddits() == left.subreddits() + right.subreddits()
+
+@pytest.mark.parametrize('seed', range(5))
+def test_aggregates(seed):
+    rows = make_rows(200, seed=seed)
+    batch = PostBatch.from_rows(rows).unique_urls()
+    posts = remove_dupes([post_from_row(row) for row in rows])
+    breakdown = batch.subreddit_breakdown()
+    expected = aggregate_by(posts)
+    assert list(breakdown) == list(expected)
+    for subreddit, summary in expected.items():
+        assert breakdown[subreddit]['count'] == summary['count']
+        assert breakdown[subreddit]['mean'] == pytest.approx(summary['mean'], abs=1e-4)
+        assert breakdown[subreddit]['label'] == summary['label']
+    assert batch.overall_label() == overall_label(posts)
+
+def test_aggregate_codes_skips_empty_groups():
+    #a window taken out of a batch keeps the parent's name list, subreddits without rows left are not reported
+    rows = make_rows(50)
+    batch = PostBatch.from_rows(rows)
+    window = batch.take(np.array([row['subreddit'] == 'stocks' for row in rows]))
+    assert list(window.subreddit_breakdown()) == ['stocks']
+    assert sentiment.aggregate_codes([], np.array([], dtype=np.int32), ['stocks']) == {}
+
+def test_post_view_dict_interface(rows):
+    view = PostBatch.from_rows(rows)[-1]
+    post = post_from_row(rows[-1])
+    for key in post:
+        assert view[key] == post[key] == view.get(key) == getattr(view, key)
+    assert view.get('missing', 'default') == 'default'
+    with pytest.raises(KeyError):
+        view['missing']
+    with pytest.raises(IndexError):
+        PostBatch.from_rows(rows)[len(rows)]
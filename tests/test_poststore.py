@@ -0,0 +1,149 @@
+import pytest
+import poststore
+
+DAY = 86400
+BASE = 1700000000 - 1700000000 % DAY #midnight utc
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(poststore, 'DB_PATH', str(tmp_path / 'posts.db'))
+    monkeypatch.setattr(poststore._local, 'connection', None, raising=False)
+    yield
+    poststore.get_connection().close()
+    poststore._local.connection = None
+
+def record(post_id, compound, subreddit='stocks', created_utc=BASE, title='title', selftext='', is_english=1):
+    return {'id': post_id, 'subreddit': subreddit, 'created_utc': created_utc, 'title': title, 'permalink': f'/r/{subreddit}/comments/{post_id}/',
+            'selftext': selftext, 'raw': {'id': post_id}, 'is_english': is_english,
+            'neg': None, 'neu': None, 'pos': None, 'compound': compound}
+
+def test_sync_state_roundtrip():
+    assert poststore.get_sync_state('tsla', 'Stocks') is None
+    poststore.set_sync_state('tsla', 'Stocks', 'month', 123.0)
+    assert poststore.get_sync_state('TSLA', 'stocks') == ('month', 123.0)
+    poststore.set_sync_state('TSLA', 'stocks', 'year', 456.0)
+    assert poststore.get_sync_state('tsla', 'stocks') == ('year', 456.0)
+    assert poststore.get_sync_state('tsla', 'investing') is None
+
+def test_window_sync_roundtrip():
+    assert poststore.get_synced_windows('tsla', 'stocks') == set()
+    poststore.set_window_synced('tsla', 'Stocks', 'month', 123.0)
+    poststore.set_window_synced('TSLA', 'stocks', 'year', 124.0)
+    poststore.set_window_synced('TSLA', 'stocks', 'year', 125.0)
+    assert poststore.get_synced_windows('TSLA', 'STOCKS') == {'month', 'year'}
+    assert poststore.get_synced_windows('tsla', 'investing') == set()
+
+def test_recent_post_ids_newest_first():
+    poststore.save_posts('TSLA', [record(f'p{index}', 0.1, created_utc=BASE + index) for index in range(5)])
+    assert poststore.recent_post_ids('tsla', 'STOCKS', limit=2) == {'p4', 'p3'}
+
+def test_window_sentiment_from_rollups():
+    compounds = [0.9, 0.6, 0.0, -0.7, 0.2]
+    poststore.save_posts('TSLA', [record(f'p{index}', value, created_utc=BASE + index * DAY) for index, value in enumerate(compounds)]
+                         + [record('short', None, is_english=None), record('french', 0.8, is_english=0)])
+    summary = poststore.window_sentiment('TSLA')
+    mean = sum(compounds) / len(compounds)
+    variance = sum(value * value for value in compounds) / len(compounds) - mean * mean
+    assert summary['posts'] == 5
+    assert summary['mean'] == round(mean, 4)
+    assert summary['variance'] == round(variance, 4)
+    assert (summary['positive'], summary['neutral'], summary['negative']) == (2, 2, 1)
+    assert summary['label'] == 'NEUTRAL'
+    #since_utc works on whole days
+    assert poststore.window_sentiment('TSLA', since_utc=BASE + 3 * DAY + 5)['posts'] == 2
+    assert poststore.window_sentiment('GME')['posts'] == 0
+    assert poststore.window_sentiment('GME')['label'] is None
+
+def test_rollups_count_each_mention_once():
+    records = [record('a', 0.9), record('b', -0.9, subreddit='investing')]
+    poststore.save_posts('TSLA', records)
+    poststore.save_posts('TSLA', records) #refetch of the same posts
+    poststore.save_posts('GME', records[:1]) #same post, other ticker
+    assert poststore.window_sentiment('TSLA')['posts'] == 2
+    assert poststore.window_sentiment('TSLA', subreddits=['Investing'])['negative'] == 1
+    assert poststore.window_sentiment('GME')['posts'] == 1
+
+def test_rebuild_rollups_matches_incremental():
+    poststore.save_posts('TSLA', [record(f'p{index}', (index % 7 - 3) / 3.5, subreddit=('stocks', 'investing')[index % 2],
+                                         created_utc=BASE + index * 3600) for index in range(60)])
+    before = poststore.daily_post_stats('TSLA')
+    poststore.rebuild_rollups()
+    after = poststore.daily_post_stats('TSLA')
+    assert [row['day'] for row in after] == [row['day'] for row in before]
+    for old, new in zip(before, after):
+        assert new['posts'] == old['posts']
+        assert new['compound_sum'] == pytest.approx(old['compound_sum'])
+    assert sum(row['posts'] for row in after) == 60
+    assert after[0]['day'] == BASE // DAY
+
+def test_load_posts_only_scored_english():
+    poststore.save_posts('TSLA', [record('old', 0.1, created_utc=BASE - 10 * DAY), record('new', 0.2),
+                                  record('short', None, is_english=None), record('other', 0.3, subreddit='pennystocks')])
+    assert {row['id'] for row in poststore.load_posts('TSLA', ['stocks'])} == {'old', 'new'}
+    assert {row['id'] for row in poststore.load_posts('TSLA', ['STOCKS', 'pennystocks'], since_utc=BASE - DAY)} == {'new', 'other'}
+    assert poststore.load_posts('TSLA', []) == []
+    assert 'selftext' in poststore.load_posts('TSLA', ['stocks'], with_text=True)[0]
+
+def test_load_posts_top_score_first():
+    scored = [dict(record(post_id, 0.1, created_utc=BASE + index), raw={'id': post_id, 'score': score})
+              for index, (post_id, score) in enumerate([('low', 3), ('high', 900), ('tie_old', 40), ('tie_new', 40)])]
+    poststore.save_posts('TSLA', scored)
+    assert [row['id'] for row in poststore.load_posts('TSLA', ['stocks'])] == ['high', 'tie_new', 'tie_old', 'low']
+
+@pytest.mark.parametrize('text, expected', [
+    ('earnings guidance', '"earnings" "guidance"'),
+    ('"price target" raised', '"price target" "raised"'),
+    ('tsla OR gme', '"tsla" "OR" "gme"'), #operators are plain words
+    ('NEAR(a b) title:x *', '"NEAR(a" "b)" "title:x"'),
+    ('say "hi', '"say" """hi"'), #unbalanced quote stays a literal
+    ('- ... ""', ''),
+    ('', ''),
+    (None, ''),
+])
+def test_fts_query_escaping(text, expected):
+    assert poststore.fts_query(text) == expected
+
+@pytest.fixture
+def searchable():
+    poststore.save_posts('TSLA', [
+        record('earn', 0.8, title='Earnings beat', selftext='guidance raised for the next quarter'),
+        record('bear', -0.8, subreddit='investing', title='Bearish take', selftext='earning call was weak <b>really</b>'),
+        record('short', None, is_english=None, title='earnings?', selftext=''),
+    ])
+    poststore.save_posts('GME', [record('gme', 0.1, title='Squeeze', selftext='earnings soon', created_utc=BASE - 30 * DAY)])
+
+def test_search_posts_matches_and_ranks(searchable):
+    results = poststore.search_posts('earnings')
+    assert {row['id'] for row in results} == {'earn', 'bear', 'short', 'gme'} #porter stemming: earning == earnings
+    assert results[0]['id'] in ('earn', 'short') #title matches weigh more
+    labels = {row['id']: row['label'] for row in results}
+    assert labels == {'earn': 'POSITIVE', 'bear': 'NEGATIVE', 'short': None, 'gme': 'NEUTRAL'}
+
+def test_search_posts_filters(searchable):
+    assert {row['id'] for row in poststore.search_posts('earnings', ticker='gme')} == {'gme'}
+    assert {row['id'] for row in poststore.search_posts('earnings', subreddits=['Investing'])} == {'bear'}
+    assert {row['id'] for row in poststore.search_posts('earnings', since_utc=BASE - DAY)} == {'earn', 'bear', 'short'}
+    assert {row['id'] for row in poststore.search_posts('earnings', until_utc=BASE)} == {'gme'}
+    assert {row['id'] for row in poststore.search_posts('earnings', sentiment='negative')} == {'bear'}
+    assert {row['id'] for row in poststore.search_posts('earnings', sentiment='neutral')} == {'gme'} #unscored posts never match a label
+    assert len(poststore.search_posts('earnings', limit=2)) == 2
+    assert len(poststore.search_posts('earnings', limit=2, offset=3)) == 1
+
+def test_search_posts_snippet_is_escaped(searchable):
+    snippet = poststore.search_posts('weak')[0]['snippet']
+    assert '<mark>weak</mark>' in snippet
+    assert '&lt;b&gt;really&lt;/b&gt;' in snippet
+
+def test_search_posts_hostile_input(searchable):
+    for text in ('"', 'AND', 'title:*', 'a" OR "b', '^earnings'):
+        poststore.search_posts(text) #never an fts5 syntax error
+    assert poststore.search_posts('...') == []
+
+def test_search_index_follows_updates_and_deletes(searchable):
+    connection = poststore.get_connection()
+    with connection:
+        connection.execute("UPDATE posts SET title = 'Renamed', selftext = 'nothing here' WHERE id = 'earn'")
+        connection.execute("DELETE FROM posts WHERE id = 'gme'")
+    assert {row['id'] for row in poststore.search_posts('earnings')} == {'bear', 'short'}
+    poststore.rebuild_search_index()
+    assert [row['id'] for row in poststore.search_posts('renamed')] == ['earn']
@@ -0,0 +1,69 @@
+import pytest
+import resultcache
+
+NOW = 1700000000.0
+TTL = resultcache.TTLS['week']
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(resultcache, 'CACHE_PATH', str(tmp_path / 'cache.db'))
+    monkeypatch.setattr(resultcache, 'ENABLED', True)
+    monkeypatch.setattr(resultcache._local, 'connection', None, raising=False)
+    monkeypatch.setattr(resultcache, '_last_prune', 0.0)
+    yield
+    resultcache.get_connection().close()
+    resultcache._local.connection = None
+
+def test_key_is_normalized():
+    assert resultcache.result_key(' tsla', ['Stocks', 'investing', 'stocks '], 'Week') == 'TSLA|investing,stocks|week'
+
+def test_fresh_then_stale_then_gone():
+    resultcache.put_result('TSLA', ['stocks'], 'week', {'posts': [1, 2]}, now=NOW)
+    assert resultcache.get_result('tsla', ['STOCKS'], 'week', now=NOW + TTL - 1) == ({'posts': [1, 2]}, True)
+    assert resultcache.get_result('TSLA', ['stocks'], 'week', now=NOW + TTL + 1) == ({'posts': [1, 2]}, False)
+    assert resultcache.get_result('TSLA', ['stocks'], 'week', now=NOW + TTL + resultcache.MAX_STALE + 1) is None
+    assert resultcache.get_result('TSLA', ['stocks'], 'month', now=NOW) is None
+
+def test_ttl_follows_window():
+    resultcache.put_result('TSLA', ['stocks'], 'day', 'day result', now=NOW)
+    resultcache.put_result('TSLA', ['stocks'], 'all', 'all result', now=NOW)
+    later = NOW + resultcache.TTLS['day'] + 1
+    assert resultcache.get_result('TSLA', ['stocks'], 'day', now=later)[1] is False
+    assert resultcache.get_result('TSLA', ['stocks'], 'all', now=later)[1] is True
+
+def test_refresh_lease():
+    resultcache.put_result('TSLA', ['stocks'], 'week', 'old', now=NOW)
+    stale = NOW + TTL + 1
+    assert resultcache.claim_refresh('TSLA', ['stocks'], 'week', now=stale) is True
+    #every other caller keeps serving the stale entry while the lease runs
+    assert resultcache.claim_refresh('TSLA', ['stocks'], 'week', now=stale + 1) is False
+    assert resultcache.claim_refresh('TSLA', ['stocks'], 'week', now=stale + resultcache.REFRESH_LEASE - 1) is False
+    #a refresh that never finished lets the next caller try again
+    assert resultcache.claim_refresh('TSLA', ['stocks'], 'week', now=stale + resultcache.REFRESH_LEASE + 1) is True
+    #a finished refresh writes a fresh entry and clears the lease
+    resultcache.put_result('TSLA', ['stocks'], 'week', 'new', now=stale + 2)
+    assert resultcache.get_result('TSLA', ['stocks'], 'week', now=stale + 3) == ('new', True)
+    assert resultcache.claim_refresh('TSLA', ['stocks'], 'week', now=stale + 3) is True
+    assert resultcache.claim_refresh('GME', ['stocks'], 'week', now=stale) is False #nothing cached
+
+def test_prune_drops_expired_results_and_old_plots():
+    resultcache.put_result('TSLA', ['stocks'], 'week', 'old', now=NOW)
+    resultcache.put_plot('old-plot', b'png')
+    connection = resultcache.get_connection()
+    with connection:
+        connection.execute('UPDATE plots SET created = ?', (NOW - resultcache.PLOT_MAX_AGE - 1,))
+    resultcache.prune(NOW + TTL + resultcache.MAX_STALE + 1)
+    assert connection.execute('SELECT COUNT(*) FROM results').fetchone()[0] == 0
+    assert resultcache.get_plot('old-plot') is None
+
+def test_plots_roundtrip():
+    assert resultcache.get_plot('abc') is None
+    resultcache.put_plot('abc', b'\x89PNG')
+    assert resultcache.get_plot('abc') == b'\x89PNG'
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(resultcache, 'ENABLED', False)
+    resultcache.put_result('TSLA', ['stocks'], 'week', 'result', now=NOW)
+    resultcache.put_plot('abc', b'png')
+    assert resultcache.get_result('TSLA', ['stocks'], 'week', now=NOW) is None
+    assert resultcache.get_plot('abc') is None
@@ -0,0 +1,70 @@
+from functools import partial
+import pytest
+import poststore
+import redditfetch
+import scraper
+from redditfetch import Listing
+from scraper import capped_window_jobs, filter_posts_by_window, widest_time_filter
+
+def backfill(time_filter, sort='top'):
+    return {'stock': 'TSLA', 'subreddit': 'stocks', 'time_filter': time_filter, 'sort': sort, 'max_results': 1000, 'per_page': 100}
+
+CAPPED = Listing([{}] * 1000, ok=True, reached_end=False)
+
+def test_capped_top_backfill_gets_narrow_window_jobs():
+    jobs = capped_window_jobs('stocks', backfill('year'), CAPPED, ['day', 'month', 'year', 'month', 'all'])
+    assert sorted(jobs) == [('stocks', 'day'), ('stocks', 'month')] #only windows narrower than the backfill, once each
+    assert jobs[('stocks', 'month')] == dict(backfill('year'), time_filter='month')
+
+@pytest.mark.parametrize('job, listing', [
+    (backfill('year'), Listing([{}] * 20, ok=True, reached_end=True)), #listing ran out, nothing was cut off
+    (backfill('year'), Listing([{}] * 300, ok=False)), #fetch failed, the next search retries the backfill anyway
+    (backfill('all', sort='new'), CAPPED), #incremental sort=new refresh covers every window
+    (backfill('day'), CAPPED), #nothing narrower than day
+])
+def test_no_narrow_jobs(job, listing):
+    assert capped_window_jobs('stocks', job, listing, ['day', 'week', 'month', 'year']) == {}
+
+def test_already_synced_windows_skipped():
+    jobs = capped_window_jobs('stocks', backfill('all'), CAPPED, ['day', 'month', 'year'], synced={'year', 'month'})
+    assert sorted(jobs) == [('stocks', 'day')]
+
+@pytest.mark.parametrize('sync', [scraper.sync_posts, lambda *args: list(scraper.iter_sync_posts(*args))])
+def test_narrow_windows_fetched_once(tmp_path, monkeypatch, sync):
+    monkeypatch.setattr(poststore, 'DB_PATH', str(tmp_path / 'posts.db'))
+    monkeypatch.setattr(poststore._local, 'connection', None, raising=False)
+    calls = []
+    def fetch(**job):
+        calls.append(job['time_filter'])
+        return CAPPED #every sort=top backfill hits the cap
+    monkeypatch.setattr(scraper, 'iter_fetch_jobs', partial(redditfetch.iter_fetch_jobs, fetch=fetch))
+    sync('TSLA', 'year', ['stocks'], ['month', 'year'])
+    assert sorted(calls) == ['month', 'year']
+    calls.clear()
+    #a later wider backfill doesnt redo the windows that already had their own query
+    sync('TSLA', 'all', ['stocks'], ['month', 'year', 'all'])
+    assert calls == ['all']
+    poststore.get_connection().close()
+    poststore._local.connection = None
+
+def test_follow_up_jobs_share_the_pool():
+    def fetch(name):
+        return name
+    follow_up = lambda key, result: {f'{key}/narrow': {'name': f'{result}!'}} if '/' not in key else {}
+    results = dict(redditfetch.iter_fetch_jobs({'a': {'name': 'a'}, 'b': {'name': 'b'}}, fetch=fetch, follow_up=follow_up))
+    assert results == {'a': 'a', 'b': 'b', 'a/narrow': 'a!', 'b/narrow': 'b!'}
+
+def test_widest_time_filter():
+    assert widest_time_filter(['day', 'year', 'week']) == 'year'
+    assert widest_time_filter(['all', 'day']) == 'all'
+
+def test_filter_posts_by_window():
+    from postbatch import PostBatch
+    now = 1700000000.0
+    rows = [{'id': str(age), 'subreddit': 'stocks', 'title': '', 'permalink': f'/{age}', 'compound': 0.0, 'created_utc': now - age * 86400}
+            for age in (0.5, 3, 20, 200, 900)]
+    batch = PostBatch.from_rows(rows)
+    assert filter_posts_by_window(batch, 'day', now).ids() == ['0.5']
+    assert filter_posts_by_window(batch, 'week', now).ids() == ['0.5', '3']
+    assert filter_posts_by_window(batch, 'year', now).ids() == ['0.5', '3', '20', '200']
+    assert filter_posts_by_window(batch, 'all', now) is batch
@@ -0,0 +1,55 @@
+import random
+import re
+import pytest
+from tickermatch import COMMON_WORDS, TickerMatcher
+
+WATCHLIST = ['TSLA', 'AMD', 'AMDX', 'GME', 'F', 'A', 'ALL', 'SPY', 'T', 'TS']
+
+#one regex per ticker, what the matcher has to agree with
+def reference_find(tickers, text):
+    found = set()
+    for ticker in tickers:
+        if re.search(r'(?<!\w)\$' + re.escape(ticker) + r'(?!\w)', text, re.IGNORECASE):
+            found.add(ticker)
+        elif len(ticker) > 1 and ticker not in COMMON_WORDS and re.search(r'(?<![\w$])' + re.escape(ticker) + r'(?!\w)', text):
+            found.add(ticker)
+    return found
+
+@pytest.mark.parametrize('text, expected', [
+    ('TSLA to the moon', {'TSLA'}),
+    ('tsla to the moon', set()), #bare symbols only in capitals
+    ('Tsla is up', set()),
+    ('$tsla and $Gme', {'TSLA', 'GME'}), #cashtags in any case
+    ('AMDX is not AMD', {'AMDX', 'AMD'}),
+    ('AMDX only', {'AMDX'}),
+    ('CAMD and AMD_1 and AMD2', set()), #word boundaries on both sides
+    ('buy F now', set()), #one letter symbols only as cashtags
+    ('buy $F and $a', {'F', 'A'}),
+    ('ALL IN', set()), #common words only as cashtags
+    ('$ALL in', {'ALL'}),
+    ('$$TSLA', {'TSLA'}), #doubled $ still a cashtag
+    ('x$TSLA', set()),
+    ('SPY, TSLA; (GME).', {'SPY', 'TSLA', 'GME'}),
+    ('TS TSLA', {'TS', 'TSLA'}), #a ticker that is a prefix of another
+    ('', set()),
+])
+def test_find(text, expected):
+    assert TickerMatcher(WATCHLIST).find(text) == expected
+
+def test_normalizes_watchlist():
+    matcher = TickerMatcher(['$tsla', ' ', 'gme', 'TSLA', '$'])
+    assert matcher.tickers == ['GME', 'TSLA']
+    assert TickerMatcher([]).find('TSLA $GME') == set()
+
+def test_non_ascii_text_keeps_offsets():
+    #str.upper() would turn ß into SS and shift every later offset
+    assert TickerMatcher(WATCHLIST).find('straße ßß TSLA ünd $gme') == {'TSLA', 'GME'}
+
+def test_matches_reference_on_random_text():
+    rng = random.Random(7)
+    pieces = ['TSLA', 'tsla', '$tsla', 'AMD', 'AMDX', 'xAMD', 'GME', '$gme', 'F', '$F', 'ALL', '$all', 'TS', 'T', '$T', 'SPY',
+              'the', 'moon', '$', '_', '.', ',', 'ß', 'é', '1', ' ', ' ', ' ']
+    matcher = TickerMatcher(WATCHLIST)
+    for _ in range(2000):
+        text = ''.join(rng.choice(pieces) for _ in range(rng.randrange(1, 12)))
+        assert matcher.find(text) == reference_find(WATCHLIST, text), text
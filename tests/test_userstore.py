@@ -0,0 +1,116 @@
+import threading
+import pytest
+import userstore
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    pool = userstore.ConnectionPool(userstore.SQLiteBackend(str(tmp_path / 'users.db')), size=2, timeout=0.05)
+    monkeypatch.setattr(userstore, '_pool', pool)
+    yield pool
+    pool.close()
+
+def test_make_backend():
+    assert isinstance(userstore.make_backend('sqlite:///x.db'), userstore.SQLiteBackend)
+    assert userstore.make_backend('sqlite:///x.db').path == 'x.db'
+    assert userstore.make_backend('users.db').path == 'users.db'
+
+def test_pool_is_bounded_and_reuses_connections(pool):
+    first = pool.acquire()
+    second = pool.acquire()
+    with pytest.raises(userstore.UserStoreBusy):
+        pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first #idle connection handed out again
+    pool.release(first)
+    pool.release(second)
+
+def test_broken_connection_is_closed_not_reused(pool):
+    connection = pool.acquire()
+    pool.release(connection, broken=True)
+    fresh = pool.acquire()
+    assert fresh is not connection
+    pool.release(fresh)
+
+def test_transaction_rolls_back_on_error(pool):
+    with pytest.raises(RuntimeError):
+        with pool.transaction() as run:
+            run('insert_user', ('alice', 'hash'))
+            raise RuntimeError('boom')
+    with pool.transaction() as run:
+        assert run('get_password', ('alice',)).fetchone() is None
+    #the slot came back after the error
+    connections = [pool.acquire(), pool.acquire()]
+    for connection in connections:
+        pool.release(connection)
+
+def test_account_lifecycle(pool):
+    assert userstore.create_user('alice', 'secret1') is True
+    assert userstore.create_user('alice', 'other') is False
+    assert userstore.check_password('alice', 'secret1') is True
+    assert userstore.check_password('alice', 'wrong') is False
+    assert userstore.check_password('bob', 'secret1') is None
+    assert userstore.change_password('alice', 'wrong', 'new') is False
+    assert userstore.change_password('alice', 'secret1', 'secret2') is True
+    assert userstore.check_password('alice', 'secret2') is True
+    assert userstore.delete_user('alice', 'secret1') is False
+    assert userstore.delete_user('alice', 'secret2') is True
+    assert userstore.check_password('alice', 'secret2') is None
+
+def test_stored_hash_is_werkzeug_pbkdf2(pool):
+    userstore.create_user('carol', 'secret1')
+    with pool.transaction() as run:
+        stored = run('get_password', ('carol',)).fetchone()[1]
+    assert stored.startswith(f'pbkdf2:sha256:{userstore.HASH_ITERATIONS}$')
+    assert userstore.verify_password(stored, 'secret1') is True
+
+@pytest.fixture
+def hash_slots(monkeypatch):
+    monkeypatch.setattr(userstore, '_hash_slots', threading.BoundedSemaphore(1))
+    release = threading.Event()
+    yield release
+    release.set()
+
+def test_hash_admission_refuses_past_the_bound(hash_slots):
+    started = threading.Event()
+    def slow():
+        started.set()
+        hash_slots.wait(5)
+        return 'done'
+    results = []
+    holder = threading.Thread(target=lambda: results.append(userstore._run_hash(slow)))
+    holder.start()
+    assert started.wait(5)
+    with pytest.raises(userstore.UserStoreBusy):
+        userstore._run_hash(lambda: 'never runs')
+    hash_slots.set()
+    holder.join(5)
+    assert results == ['done']
+    assert userstore._run_hash(lambda: 'admitted again') == 'admitted again'
+
+def test_hash_timeout_is_busy_and_frees_the_slot_when_done(hash_slots, monkeypatch):
+    monkeypatch.setattr(userstore, 'HASH_TIMEOUT', 0.05)
+    finished = threading.Event()
+    def slow():
+        hash_slots.wait(5)
+        finished.set()
+    with pytest.raises(userstore.UserStoreBusy):
+        userstore._run_hash(slow)
+    with pytest.raises(userstore.UserStoreBusy):
+        userstore._run_hash(lambda: None) #the timed out hash still holds its slot
+    hash_slots.set()
+    assert finished.wait(5)
+    monkeypatch.setattr(userstore, 'HASH_TIMEOUT', 5)
+    for _ in range(50): #slot is released by the done callback, right after the function returns
+        try:
+            assert userstore._run_hash(lambda: 'ok') == 'ok'
+            break
+        except userstore.UserStoreBusy:
+            finished.wait(0.01)
+    else:
+        pytest.fail('hash slot never released')
+
+def test_hash_errors_propagate(hash_slots):
+    def broken():
+        raise ValueError('bad hash')
+    with pytest.raises(ValueError):
+        userstore._run_hash(broken)
@@ -0,0 +1,125 @@
+import os
+import sys
+import bisect
+import threading
+import requests
+
+#local ticker symbol index so validating a ticker doesnt need a yfinance .info call.
+#loaded once from a pipe delimited symbol list (SYMBOL|Name, same as the nasdaqtrader symbol directory files)
+#and kept in memory as a set for lookups + sorted lists for prefix autocomplete.
+SYMBOLS_PATH = os.getenv('STOCKA_SYMBOLS', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'symbols.txt'))
+
+#nasdaqtrader publishes every listed US symbol in these two files, used by refresh_symbols().
+SYMBOL_SOURCES = [
+    'https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt',
+    'https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt',
+]
+
+_lock = threading.Lock()
+_symbols = None #set of symbols
+_by_symbol = [] #sorted symbols for prefix search
+_by_name = [] #sorted (lowercase name, symbol) for name prefix search
+_names = {}
+
+#yahoo uses BRK-B where the exchanges list BRK.B
+def normalize_symbol(symbol):
+    return symbol.strip().upper().replace('.', '-')
+
+def _parse_lines(lines):
+    entries = {}
+    for line in lines:
+        parts = line.rstrip('\n').split('|')
+        if len(parts) < 2 or parts[0] in ('Symbol', 'ACT Symbol') or parts[0].startswith('File Creation Time'):
+            continue
+        symbol = normalize_symbol(parts[0])
+        if symbol and '$' not in symbol:
+            entries[symbol] = parts[1].strip()
+    return entries
+
+def _build(entries):
+    global _symbols, _by_symbol, _by_name, _names
+    _names = dict(entries)
+    _symbols = set(entries)
+    _by_symbol = sorted(entries)
+    _by_name = sorted((name.lower(), symbol) for symbol, name in entries.items())
+
+def load(path=None):
+    with _lock:
+        try:
+            with open(path or SYMBOLS_PATH, encoding='utf-8') as symbols_file:
+                _build(_parse_lines(symbols_file))
+        except OSError:
+            _build({})
+
+def _ensure_loaded():
+    if _symbols is None:
+        load()
+
+#microsecond membership check against the local index.
+def is_known(symbol):
+    _ensure_loaded()
+    return normalize_symbol(symbol) in _symbols
+
+#symbols confirmed over the network get added so the next check is local too.
+def add_symbol(symbol, name=''):
+    _ensure_loaded()
+    symbol = normalize_symbol(symbol)
+    with _lock:
+        if symbol in _symbols:
+            return
+        _symbols.add(symbol)
+        _names[symbol] = name
+        bisect.insort(_by_symbol, symbol)
+        if name:
+            bisect.insort(_by_name, (name.lower(), symbol))
+
+#autocomplete: symbols starting with the query first, then company names starting with it.
+def suggest(query, limit=10):
+    _ensure_loaded()
+    query = query.strip()
+    if not query:
+        return []
+    results = []
+    seen = set()
+    prefix = normalize_symbol(query)
+    i = bisect.bisect_left(_by_symbol, prefix)
+    while i < len(_by_symbol) and _by_symbol[i].startswith(prefix) and len(results) < limit:
+        results.append({'symbol': _by_symbol[i], 'name': _names.get(_by_symbol[i], '')})
+        seen.add(_by_symbol[i])
+        i += 1
+    name_prefix = query.lower()
+    i = bisect.bisect_left(_by_name, (name_prefix, ''))
+    while i < len(_by_name) and _by_name[i][0].startswith(name_prefix) and len(results) < limit:
+        symbol = _by_name[i][1]
+        if symbol not in seen:
+            results.append({'symbol': symbol, 'name': _names.get(symbol, '')})
+            seen.add(symbol)
+        i += 1
+    return results
+
+#download the current symbol directory and rewrite the symbol list file, then reload.
+def refresh_symbols(path=None):
+    entries = {}
+    for url in SYMBOL_SOURCES:
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        lines = response.text.splitlines()
+        header = lines[0].split('|') if lines else []
+        test_col = header.index('Test Issue') if 'Test Issue' in header else None
+        for symbol, name in _parse_lines(line for line in lines if test_col is None or line.split('|')[test_col:test_col + 1] != ['Y']).items():
+            entries[symbol] = name
+    path = path or SYMBOLS_PATH
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as symbols_file:
+        symbols_file.write('Symbol|Security Name\n')
+        for symbol in sorted(entries):
+            symbols_file.write(f'{symbol}|{entries[symbol]}\n')
+    os.replace(tmp_path, path)
+    load(path)
+    return len(entries)
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['refresh']:
+        print(f'{refresh_symbols()} symbols written to {SYMBOLS_PATH}')
+    else:
+        print('usage: python tickerindex.py refresh')
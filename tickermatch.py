@@ -0,0 +1,80 @@
+from collections import deque
+
+#find every watched ticker in a post with one pass over the text, no matter how many tickers are watched (aho-corasick).
+#"$tsla"/"$TSLA" cashtags match in any case, a bare symbol only counts when it is written in capitals ("TSLA", not "tsla")
+#and both need word boundaries on each side so "AMD" doesnt hit "AMDX" or "CAMD".
+#one letter symbols and ones that are also common capitalized words only count as cashtags.
+
+COMMON_WORDS = {
+    'A', 'I', 'AI', 'ALL', 'AM', 'AN', 'ANY', 'ARE', 'AT', 'BE', 'BIG', 'BY', 'CAN', 'CEO', 'DD', 'EPS', 'FOR', 'GO', 'HAS',
+    'IT', 'IPO', 'JUST', 'LOVE', 'NEW', 'NOW', 'ON', 'ONE', 'OR', 'OUT', 'PM', 'RH', 'SEE', 'SO', 'TV', 'UK', 'US', 'USA', 'YOLO',
+}
+
+#uppercase ascii only, unlike str.upper() this never changes the length so match offsets line up with the original text.
+_ASCII_UPPER = str.maketrans('abcdefghijklmnopqrstuvwxyz', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+class TickerMatcher:
+    def __init__(self, tickers):
+        self.tickers = sorted({ticker.upper().lstrip('$') for ticker in tickers if ticker.strip('$ ')})
+        self._goto = [{}] #state -> {char: next state}
+        self._fail = [0]
+        self._out = [[]] #state -> [(pattern length, ticker, cashtag only)]
+        for ticker in self.tickers:
+            self._add('$' + ticker, ticker, True)
+            self._add(ticker, ticker, len(ticker) == 1 or ticker in COMMON_WORDS)
+        self._build()
+
+    def _add(self, pattern, ticker, cashtag_only):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append((len(pattern), ticker, pattern[0] == '$' or not cashtag_only))
+
+    #breadth first failure links, each state also inherits the outputs of its failure state.
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    #set of watched tickers mentioned in text.
+    def find(self, text):
+        found = set()
+        if not text or not self.tickers:
+            return found
+        upper = text.translate(_ASCII_UPPER)
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        length = len(upper)
+        for end, char in enumerate(upper):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for size, ticker, allowed in out[state]:
+                if not allowed or ticker in found:
+                    continue
+                start = end - size + 1
+                if start > 0 and (_is_word_char(text[start - 1]) or (text[start] != '$' and text[start - 1] == '$')):
+                    continue
+                if end + 1 < length and _is_word_char(text[end + 1]):
+                    continue
+                if text[start] != '$' and text[start:end + 1] != upper[start:end + 1]:
+                    continue #bare symbol written in lower/mixed case
+                found.add(ticker)
+        return found
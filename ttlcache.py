@@ -0,0 +1,37 @@
+import threading
+import time
+from collections import OrderedDict
+
+#small thread safe TTL cache with a size bound, least recently used entries go first.
+#ttl=None on the cache makes it a plain LRU (entries only leave when evicted).
+class TTLCache:
+    def __init__(self, maxsize=128, ttl=600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    #returns default on a miss or an expired entry.
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.data[key]
+                return default
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            ttl = self.ttl if ttl is None else ttl
+            self.data[key] = (float('inf') if ttl is None else time.monotonic() + ttl, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
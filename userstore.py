@@ -0,0 +1,217 @@
+import contextlib
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+import instrument
+
+#user accounts for the auth routes. connections come from a small bounded pool (SQLite file by default so it runs locally,
+#STOCKA_USER_DB=postgresql://... for postgres, psycopg2 only needed then) and every query is one of the constant
+#parameterized statements below: sqlite keeps them compiled in its per connection statement cache, on postgres they are
+#PREPAREd once per pooled connection. pbkdf2 hashing/verification runs on its own small thread pool (hashlib releases the
+#GIL while it works) so a login burst queues there instead of tying up the threads that serve /home.
+
+USER_DB = os.getenv('STOCKA_USER_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'users.db'))
+POOL_SIZE = int(os.getenv('STOCKA_USER_DB_POOL', '4'))
+POOL_TIMEOUT = 10 #seconds to wait for a free connection
+HASH_ITERATIONS = int(os.getenv('STOCKA_PBKDF2_ITERATIONS', '600000'))
+HASH_WORKERS = int(os.getenv('STOCKA_HASH_WORKERS', '2'))
+#every admitted hash job holds a request thread while it waits, so running + queued jobs are kept to half the web threads
+#(gunicorn.conf.py) and a login burst past that is refused right away instead of starving /home.
+WEB_THREADS = int(os.getenv('STOCKA_WEB_THREADS', '8'))
+MAX_HASH_QUEUE = int(os.getenv('STOCKA_HASH_QUEUE', max(0, WEB_THREADS // 2 - HASH_WORKERS)))
+HASH_TIMEOUT = 10
+
+SCHEMA = 'CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password TEXT NOT NULL)'
+
+#statement name -> (sqlite sql, postgres prepared statement)
+STATEMENTS = {
+    'get_password': ('SELECT username, password FROM users WHERE username = ?',
+                     'SELECT username, password FROM users WHERE username = $1'),
+    'insert_user': ('INSERT INTO users (username, password) VALUES (?, ?)',
+                    'INSERT INTO users (username, password) VALUES ($1, $2)'),
+    'set_password': ('UPDATE users SET password = ? WHERE username = ?',
+                     'UPDATE users SET password = $1 WHERE username = $2'),
+    'delete_user': ('DELETE FROM users WHERE username = ?',
+                    'DELETE FROM users WHERE username = $1'),
+}
+
+#no free connection or too many hash jobs waiting, the caller should ask the user to retry.
+class UserStoreBusy(Exception):
+    pass
+
+class SQLiteBackend:
+    IntegrityError = sqlite3.IntegrityError
+
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        #pooled connections move between request threads, one at a time
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute(SCHEMA)
+        connection.commit()
+        return connection
+
+    def execute(self, connection, name, params):
+        return connection.execute(STATEMENTS[name][0], params)
+
+class PostgresBackend:
+    def __init__(self, dsn):
+        import psycopg2
+        self.psycopg2 = psycopg2
+        self.IntegrityError = psycopg2.IntegrityError
+        self.dsn = dsn
+
+    def connect(self):
+        connection = self.psycopg2.connect(self.dsn)
+        with connection.cursor() as cur:
+            cur.execute(SCHEMA)
+            for name, (_, sql) in STATEMENTS.items():
+                cur.execute(f'PREPARE {name} AS {sql}')
+        connection.commit()
+        return connection
+
+    def execute(self, connection, name, params):
+        cur = connection.cursor()
+        cur.execute(f'EXECUTE {name} ({", ".join(["%s"] * len(params))})', params)
+        return cur
+
+def make_backend(url=USER_DB):
+    if url.startswith(('postgres://', 'postgresql://')):
+        return PostgresBackend(url)
+    return SQLiteBackend(url[len('sqlite:///'):] if url.startswith('sqlite:///') else url)
+
+#at most `size` open connections, created lazily. a broken connection is closed instead of going back in.
+class ConnectionPool:
+    def __init__(self, backend, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.backend = backend
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise UserStoreBusy('no free user database connection')
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self.backend.connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection, broken=False):
+        if broken:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        else:
+            self._idle.put(connection)
+        self._slots.release()
+
+    #with pool.transaction() as run: run('get_password', (username,)).fetchone()
+    #commits on success, rolls back and re-raises on errors.
+    @contextlib.contextmanager
+    def transaction(self):
+        connection = self.acquire()
+        broken = False
+        try:
+            yield lambda name, params: self.backend.execute(connection, name, params)
+            connection.commit()
+        except Exception:
+            try:
+                connection.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self.release(connection, broken)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(make_backend())
+        return _pool
+
+#HASHING: bounded pool + bounded queue, werkzeug hash format so existing hashes keep verifying.
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='stocka-hash')
+_hash_slots = threading.BoundedSemaphore(HASH_WORKERS + MAX_HASH_QUEUE)
+
+def _run_hash(fn, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise UserStoreBusy('too many password checks queued')
+    try:
+        future = _hash_executor.submit(instrument.follow(fn), *args)
+    except Exception:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    try:
+        return future.result(timeout=HASH_TIMEOUT)
+    except FutureTimeout:
+        raise UserStoreBusy('password check timed out') from None
+
+def hash_password(password, iterations=None):
+    return _run_hash(generate_password_hash, password, f'pbkdf2:sha256:{iterations or HASH_ITERATIONS}')
+
+def verify_password(hashed_password, password):
+    return _run_hash(check_password_hash, hashed_password, password)
+
+#False if the username is taken.
+def create_user(username, password):
+    hashed_password = hash_password(password)
+    pool = get_pool()
+    try:
+        with pool.transaction() as run:
+            run('insert_user', (username, hashed_password))
+    except pool.backend.IntegrityError:
+        return False
+    return True
+
+def _stored_password(username):
+    with get_pool().transaction() as run:
+        return run('get_password', (username,)).fetchone()
+
+#None if the user does not exist, otherwise whether the password matches.
+def check_password(username, password):
+    row = _stored_password(username)
+    if row is None:
+        return None
+    return verify_password(row[1], password)
+
+#None if the user does not exist, False on a wrong old password, True once updated.
+def change_password(username, old_password, new_password):
+    ok = check_password(username, old_password)
+    if not ok:
+        return ok
+    hashed_password = hash_password(new_password)
+    with get_pool().transaction() as run:
+        run('set_password', (hashed_password, username))
+    return True
+
+#None if the user does not exist, False on a wrong password, True once deleted.
+def delete_user(username, password):
+    ok = check_password(username, password)
+    if not ok:
+        return ok
+    with get_pool().transaction() as run:
+        run('delete_user', (username,))
+    return True
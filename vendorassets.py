@@ -0,0 +1,39 @@
+import os
+import sys
+import requests
+import sentiment
+import tickerindex
+
+#build step, `python vendorassets.py` once before deploying (readme): the browser libraries the templates load from
+#static/vendor/ instead of a public CDN (pinned versions), the VADER lexicon in sentiment.NLTK_DATA and the full
+#nasdaqtrader symbol list for tickerindex (the checked in data/symbols.txt is only a small seed of big names).
+#nothing here is fetched at runtime, a missing lexicon makes the warmup/first scoring fail.
+VENDOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'vendor')
+ASSETS = {
+    'chart.umd.min.js': 'https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js',
+}
+
+def vendored(name):
+    return os.path.exists(os.path.join(VENDOR_DIR, name))
+
+def download_assets(force=False):
+    os.makedirs(VENDOR_DIR, exist_ok=True)
+    for name, url in ASSETS.items():
+        if vendored(name) and not force:
+            continue
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        with open(os.path.join(VENDOR_DIR, name), 'wb') as f:
+            f.write(response.content)
+        print(f'{name}: {len(response.content)} bytes from {url}')
+    try:
+        if force:
+            raise LookupError
+        sentiment.ensure_lexicon()
+    except LookupError:
+        sentiment.download_lexicon()
+    #always refreshed, listings change daily
+    print(f'{tickerindex.refresh_symbols()} symbols written to {tickerindex.SYMBOLS_PATH}')
+
+if __name__ == '__main__':
+    download_assets(force='--force' in sys.argv[1:])
@@ -0,0 +1,31 @@
+import gc
+import time
+import marketdata
+import relevance
+import sentiment
+import tickerindex
+from plotcache import new_figure
+from vendorassets import vendored
+
+#load everything heavy once, up front. in a preforking server (gunicorn.conf.py) this runs in the master before the
+#workers fork so they all share the loaded lexicon/profiles/modules copy-on-write instead of each paying for them on
+#its first request. nothing here opens sockets, threads, processes or database connections, those must not cross a fork.
+
+def warmup():
+    started = time.perf_counter()
+    sentiment.get_analyzer() #VADER lexicon
+    from langdetect.detector_factory import init_factory
+    init_factory() #langdetect language profiles, otherwise loaded by the first detect()
+    if not marketdata.INGEST_ONLY:
+        marketdata._yfinance() #the web tier never calls yahoo in ingest only mode
+    if not vendored('chart.umd.min.js'):
+        new_figure(figsize=(1, 1)) #matplotlib + Agg, only used for the server side plot fallback (app.SERVER_PLOTS)
+    tickerindex.load()
+    if relevance.ENABLED:
+        relevance.get_classifier()
+    gc.collect()
+    gc.freeze() #keep the GC from touching (and so copying) the shared pages in the workers
+    return time.perf_counter() - started
+
+if __name__ == '__main__':
+    print(f'warm in {warmup():.2f}s')